@@ -0,0 +1,224 @@
+"""
+Django settings for QuizRaveAPI project.
+
+Generated by 'django-admin startproject' using Django 5.2.5.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.2/ref/settings/
+"""
+import importlib.util
+import os
+from pathlib import Path
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = 'django-insecure-l$0-_21t65y0l0d=#!h6r__)a)rj=7&*%s0#wz(1t@#if4j6!r'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = ['localhost', '127.0.0.1', '[::1]']
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'rest_framework',
+    'rest_framework.authtoken',
+    'rest_framework_simplejwt',
+    'quiz',
+    
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'quiz.middleware.CompressionMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'QuizRaveAPI.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'QuizRaveAPI.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.2/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.2/howto/static-files/
+
+STATIC_URL = 'static/'
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+LOGIN_URL = 'login'
+LOGIN_REDIRECT_URL = 'home'
+LOGOUT_REDIRECT_URL = 'home'
+
+# REST Framework configuration
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PERMISSION_CLASSES':[
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.TokenAuthentication',
+        'rest_framework_simplejwt.authentication.JWTAuthentication',
+    ],
+}
+
+# MessagePack responses and request bodies for mobile clients (pip install msgpack)
+if importlib.util.find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'quiz.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(1, 'quiz.renderers.MessagePackParser')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'answer_buffer': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'answer_buffer',
+    },
+}
+
+# Write-behind buffer for answers to in-progress attempts (quiz/answer_buffer.py).
+# Point QUIZ_ANSWER_BUFFER_CACHE at a shared backend (Redis, Memcached) in production.
+QUIZ_BUFFER_ANSWERS = False
+QUIZ_ANSWER_BUFFER_CACHE = 'answer_buffer'
+QUIZ_ANSWER_BUFFER_CHECKPOINT = 60  # seconds between checkpoints to UserResponse
+
+# Attempts on quizzes without a time limit expire after this many minutes (None keeps them open)
+QUIZ_ATTEMPT_MAX_DURATION = 24 * 60
+
+# Response compression (quiz/middleware.py); brotli and zstd are used when installed
+QUIZ_COMPRESSION_MIN_SIZE = 1024  # bytes
+QUIZ_COMPRESSION_CACHE = 'default'
+
+# Append-only attempt event log (quiz/events.py), written in batches after responses are sent
+QUIZ_EVENT_LOG = True
+QUIZ_EVENT_BATCH_SIZE = 500
+QUIZ_EVENT_FLUSH_INTERVAL = 5  # seconds
+QUIZ_EVENT_MAX_BUFFERED = 100000  # events kept while writes fail, the oldest dropped beyond this
+
+# Background jobs (quiz/jobs.py), run with `python manage.py run_workers`
+QUIZ_JOB_RETRY_DELAY = 10  # seconds before the first retry, doubled for each further attempt
+QUIZ_JOB_MAX_RETRY_DELAY = 60 * 60
+QUIZ_JOB_TIMEOUT = 60 * 60  # seconds before a running job whose worker died is picked up again
+
+# Bulk user provisioning (quiz/provisioning.py)
+QUIZ_PROVISION_MAX_ROWS = 10000  # users per request
+QUIZ_PROVISION_POOL_THRESHOLD = 32  # larger API batches are queued as a job, hashed in a process pool
+
+# Published quiz versions (quiz/versions.py); their content never changes, so it may be cached for good
+QUIZ_VERSION_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+QUIZ_VERSION_CACHE_SIZE = 256  # snapshots kept in memory per process
+
+# Attempt archival (quiz/archive.py), run with `python manage.py archive_attempts`
+QUIZ_ARCHIVE_ROOT = BASE_DIR / 'archive'
+QUIZ_ARCHIVE_AFTER_DAYS = 365
+
+# Public quiz catalog (quiz/catalog.py), served from an in-process snapshot
+QUIZ_CATALOG_REFRESH_INTERVAL = 30  # seconds before the snapshot is rebuilt in the background
+QUIZ_CATALOG_MAX_AGE = 60  # seconds shared caches may keep a catalog page
+QUIZ_CATALOG_BACKGROUND_REFRESH = True
+
+# Live quiz results over Server-Sent Events (quiz/live.py); served by the ASGI application only
+QUIZ_LIVE_POLL_INTERVAL = 2  # seconds between reads of the attempt event log for other processes' changes
+QUIZ_LIVE_KEEPALIVE = 15  # seconds of silence before a keepalive comment is sent
+
+# Sliding-window throttling per process (quiz/throttling.py); rejected requests never reach the database.
+# 'user' limits apply to requests sending credentials, 'ip' limits to every request.
+QUIZ_THROTTLE_RATES = {
+    'login': {'ip': '20/min'},
+    'register': {'ip': '10/min'},
+    'start_quiz_attempt': {'user': '30/min', 'ip': '300/min'},
+    'submit_answer': {'user': '120/min', 'ip': '1200/min'},
+}
+QUIZ_THROTTLE_NUM_PROXIES = 0  # proxies in front of the project that append to X-Forwarded-For
+QUIZ_THROTTLE_MAX_CLIENTS = 100000  # clients tracked per rate before the idle ones are dropped
@@ -0,0 +1,40 @@
+"""
+Settings for API workers.
+
+Serves the token-authenticated API only: the admin, sessions, messages,
+CSRF, clickjacking protection, templates and static files are dropped, so
+each request runs three middleware instead of eight and a worker starts
+without loading them. Run the admin as a separate deployment on
+``QuizRaveAPI.settings``.
+
+    DJANGO_SETTINGS_MODULE=QuizRaveAPI.settings_api gunicorn QuizRaveAPI.wsgi
+
+Compare the two profiles with ``python manage.py benchmark_settings``.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS
+    if app not in ['django.contrib.admin', 'django.contrib.sessions', 'django.contrib.messages', 'django.contrib.staticfiles']
+]
+
+# Requests authenticate with tokens, which need neither sessions nor CSRF protection
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'quiz.middleware.CompressionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'QuizRaveAPI.urls_api'
+
+TEMPLATES = []
+
+# The browsable API needs templates and sessions
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': [
+        renderer for renderer in REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES']
+        if renderer != 'rest_framework.renderers.BrowsableAPIRenderer'
+    ],
+}
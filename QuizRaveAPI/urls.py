@@ -15,14 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
-from quiz import views
-from rest_framework_simplejwt.views import (TokenObtainPairView,TokenRefreshView,)
+from django.urls import path
+
+from . import urls_api
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/', include('quiz.urls')),
-    path('', views.home, name='home'), 
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    *urls_api.urlpatterns,
 ]
@@ -0,0 +1,14 @@
+"""
+URL configuration of API workers (``QuizRaveAPI.settings_api``): the API
+without the admin.
+"""
+from django.urls import path, include
+from quiz import views
+from rest_framework_simplejwt.views import (TokenObtainPairView,TokenRefreshView,)
+
+urlpatterns = [
+    path('api/', include('quiz.urls')),
+    path('', views.home, name='home'),
+    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+]
@@ -1,12 +1,76 @@
 from django.contrib import admin
-from .models import Quiz, Question, Answer, QuizAttempt, UserResponse
+from django.contrib.admin.options import IncorrectLookupParameters
+from .models import Quiz, Question, Answer, QuizAttempt, UserResponse, Job, QuizVersion, ArchivedAttempt
+from .pagination import EstimatedCountPaginator
+from . import search
+
+
+class IDListFilter(admin.SimpleListFilter):
+    """
+    Filter on the id of a related object typed into the sidebar.
+
+    Listing the related objects as choices, as ``RelatedOnlyFieldListFilter``
+    does, reads the whole child table on every changelist load.
+    """
+    template = 'admin/quiz/id_filter.html'
+    field_path = None
+
+    def lookups(self, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        if not self.value().isdigit():
+            raise IncorrectLookupParameters(f'{self.title} must be a number')
+        return queryset.filter(**{self.field_path: self.value()})
+
+    def choices(self, changelist):
+        yield {
+            'parameter_name': self.parameter_name,
+            'value': self.value(),
+            # The other filters, search and ordering, which the form would otherwise drop
+            'params': [(name, value) for name, values in changelist.filter_params.items() if name != self.parameter_name for value in values],
+            'clear_query_string': changelist.get_query_string(remove=[self.parameter_name]),
+        }
+
+
+def id_filter(field_path, title):
+    return type(f'{field_path.title().replace("_", "")}IDListFilter', (IDListFilter,), {
+        'field_path': field_path, 'parameter_name': field_path, 'title': title,
+    })
+
 
 @admin.register(Quiz)
 class QuizAdmin(admin.ModelAdmin):
      list_display = ['title', 'creator', 'total_questions', 'total_points', 'is_active', 'created_at']
-     list_filter = ['is_active', 'created_at', 'creator']
+     list_filter = ['is_active', 'created_at', id_filter('creator', 'creator id')]
+     list_select_related = ['creator']
      search_fields = ['title', 'description']
      readonly_fields = ['created_at', 'updated_at']
+     autocomplete_fields = ['creator']
+     paginator = EstimatedCountPaginator
+     show_full_result_count = False
+
+     def get_queryset(self, request):
+          return super().get_queryset(request).with_totals()
+
+     @admin.display(description='Total questions', ordering='question_count')
+     def total_questions(self, obj):
+          return obj.question_count
+
+     @admin.display(description='Total points', ordering='point_total')
+     def total_points(self, obj):
+          return obj.point_total or 0
+
+     def get_search_results(self, request, queryset, search_term):
+          # Use the full-text index instead of LIKE '%term%' scans
+          if not search_term:
+               return queryset, False
+          return search.filter_queryset(queryset, search_term), False
 
 class AnswerInline(admin.TabularInline):
      model = Answer
@@ -16,22 +80,75 @@ class AnswerInline(admin.TabularInline):
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
     list_display = ['__str__', 'question_type', 'points', 'order']
-    list_filter = ['question_type', 'quiz']
+    list_filter = ['question_type', id_filter('quiz', 'quiz id')]
+    list_select_related = ['quiz']
+    autocomplete_fields = ['quiz']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     inlines = [AnswerInline]
 
 @admin.register(Answer)
 class AnswerAdmin(admin.ModelAdmin):
     list_display = ['question', 'answer_text', 'is_correct']
-    list_filter = ['is_correct', 'question__quiz']
+    list_filter = ['is_correct', id_filter('question__quiz', 'quiz id')]
+    list_select_related = ['question__quiz']
+    raw_id_fields = ['question']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(QuizAttempt)
 class QuizAttemptAdmin(admin.ModelAdmin):
     list_display = ['user', 'quiz', 'score', 'total_points', 'percentage_score', 'started_at', 'is_completed']
-    list_filter = ['completed_at', 'quiz']
+    list_filter = ['completed_at', id_filter('quiz', 'quiz id')]
+    list_select_related = ['user', 'quiz']
+    raw_id_fields = ['user']
+    autocomplete_fields = ['quiz']
     readonly_fields = ['started_at', 'percentage_score']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(UserResponse)
 class UserResponseAdmin(admin.ModelAdmin):
     list_display = ['attempt', 'question', 'selected_answer', 'is_correct', 'answered_at']
     list_filter = ['is_correct', 'question__question_type']
-    readonly_fields = ['answered_at']
\ No newline at end of file
+    list_select_related = ['attempt__user', 'attempt__quiz', 'question__quiz', 'selected_answer__question__quiz']
+    raw_id_fields = ['attempt', 'question', 'selected_answer']
+    readonly_fields = ['answered_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['task', 'status', 'attempts', 'progress', 'run_at', 'created_by', 'finished_at']
+    list_filter = ['status', 'task']
+    list_select_related = ['created_by']
+    raw_id_fields = ['created_by']
+    readonly_fields = ['attempts', 'progress', 'progress_message', 'result', 'error', 'locked_by', 'locked_at', 'created_at', 'finished_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+@admin.register(QuizVersion)
+class QuizVersionAdmin(admin.ModelAdmin):
+    list_display = ['quiz', 'number', 'digest', 'created_at']
+    list_filter = [id_filter('quiz', 'quiz id')]
+    list_select_related = ['quiz']
+    autocomplete_fields = ['quiz']
+    # Versions are immutable snapshots
+    readonly_fields = ['quiz', 'number', 'content_version', 'digest', 'created_at']
+    exclude = ['content']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedAttempt)
+class ArchivedAttemptAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'quiz', 'score', 'total_points', 'completed_at', 'archive']
+    list_filter = [id_filter('quiz', 'quiz id')]
+    list_select_related = ['user', 'quiz']
+    raw_id_fields = ['user']
+    autocomplete_fields = ['quiz']
+    readonly_fields = ['archive', 'offset', 'archived_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,207 @@
+"""
+Item analysis for a quiz's completed attempts.
+
+A quiz's responses are fetched once and laid out as an attempt-by-question
+matrix, and every statistic is computed with NumPy array operations:
+
+- difficulty: the share of attempts that answered the question correctly
+  (the classical p-value);
+- discrimination: the point-biserial correlation between answering the
+  question correctly and the score on the rest of the quiz;
+- distractors: how often each answer was selected;
+- time to answer: seconds since the attempt's previous answer, or since the
+  attempt started for its first answer.
+
+A question an attempt left unanswered, or an answer not graded, counts as
+incorrect. On quizzes with a question pool only answered questions count,
+since an attempt only sees its drawn questions.
+
+Reports are cached until another attempt on the quiz completes or its content
+changes. NumPy is optional (pip install numpy), and only imported by the
+first report, so processes that never build one don't pay for it.
+"""
+import importlib.util
+import warnings
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, Max
+
+from .models import Answer, QuizAttempt, UserResponse
+
+np = None
+
+
+def is_available():
+    return np is not None or importlib.util.find_spec('numpy') is not None
+
+
+def _import_numpy():
+    global np
+    if np is None:
+        if not is_available():
+            raise ImproperlyConfigured('Item analysis needs numpy (pip install numpy)')
+        import numpy
+        np = numpy
+
+
+def _cache_key(quiz):
+    completed = quiz.attempts.filter(completed_at__isnull=False).aggregate(count=Count('id'), last=Max('completed_at'))
+    last = completed['last'].timestamp() if completed['last'] else 0
+    return f"quiz:{quiz.pk}:analysis:{quiz.content_version}:{completed['count']}:{last}"
+
+
+def item_analysis(quiz):
+    """Return the item-analysis report for ``quiz``."""
+    _import_numpy()
+    key = _cache_key(quiz)
+    report = cache.get(key)
+    if report is None:
+        report = build_report(quiz, *_load(quiz))
+        cache.set(key, report, getattr(settings, 'QUIZ_ANALYSIS_CACHE_TIMEOUT', 24 * 60 * 60))
+    return report
+
+
+def _columns(rows, width):
+    return list(zip(*rows)) if rows else [()] * width
+
+
+def _timestamps(values):
+    return np.fromiter((value.timestamp() for value in values), dtype=np.float64, count=len(values))
+
+
+def _load(quiz):
+    """Fetch the quiz's questions, answers, completed attempts and their responses as arrays."""
+    question_ids, points = _columns(list(quiz.questions.order_by('order', 'id').values_list('id', 'points')), 2)
+    questions = {'id': np.array(question_ids, dtype=np.int64), 'points': np.array(points, dtype=np.float64)}
+
+    answer_rows = list(Answer.objects.filter(question__quiz=quiz).order_by('question_id', 'order', 'id').values_list('id', 'question_id', 'answer_text', 'is_correct'))
+    answer_ids, answer_questions, answer_texts, answer_correct = _columns(answer_rows, 4)
+    answers = {
+        'id': np.array(answer_ids, dtype=np.int64),
+        'question': np.array(answer_questions, dtype=np.int64),
+        'text': answer_texts,
+        'is_correct': answer_correct,
+    }
+
+    attempt_ids, started = _columns(list(QuizAttempt.objects.filter(quiz=quiz, completed_at__isnull=False).order_by('id').values_list('id', 'started_at')), 2)
+    attempts = {'id': np.array(attempt_ids, dtype=np.int64), 'started': _timestamps(started)}
+
+    rows = list(
+        UserResponse.objects.filter(attempt__quiz=quiz, attempt__completed_at__isnull=False)
+        .values_list('attempt_id', 'question_id', 'selected_answer_id', 'is_correct', 'answered_at')
+    )
+    attempt, question, selected, correct, answered = _columns(rows, 5)
+    responses = {
+        'attempt': np.array(attempt, dtype=np.int64),
+        'question': np.array(question, dtype=np.int64),
+        # None (no answer selected) becomes NaN
+        'selected': np.array(selected, dtype=np.float64),
+        # None (ungraded) would be NaN, which spreads through every total; it counts as incorrect
+        'correct': np.nan_to_num(np.array(correct, dtype=np.float32), nan=0.0),
+        'answered': _timestamps(answered),
+    }
+    return questions, answers, attempts, responses
+
+
+def _positions(ids, values):
+    """Return the index in ``ids`` of each of ``values``."""
+    order = np.argsort(ids, kind='stable')
+    return order[np.searchsorted(ids[order], values)]
+
+
+def _optional(values):
+    return [None if np.isnan(value) else round(float(value), 4) for value in values]
+
+
+def _difficulty_and_discrimination(correct, presented, points):
+    # Pearson correlation of each item with the rest score (total minus the item),
+    # expanded so that only matrix-vector products over the attempt matrix are needed.
+    # ``presented`` is None when every attempt saw every question.
+    totals = correct @ points
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if presented is None:
+            n = np.full(correct.shape[1], float(correct.shape[0]))
+            sum_t, sum_tt = totals.sum(), (totals ** 2).sum()
+        else:
+            n = presented.sum(axis=0, dtype=np.float64)
+            sum_t, sum_tt = presented.T @ totals, presented.T @ totals ** 2
+        mean_c = correct.sum(axis=0, dtype=np.float64) / n
+        mean_t = sum_t / n
+        var_t = sum_tt / n - mean_t ** 2
+        cov_ct = (correct.T @ totals) / n - mean_c * mean_t
+        var_c = mean_c * (1 - mean_c)
+
+        cov_cr = cov_ct - points * var_c
+        var_r = np.clip(var_t - 2 * points * cov_ct + points ** 2 * var_c, 0, None)
+        denominator = np.sqrt(var_c * var_r)
+        discrimination = np.where(denominator > 1e-12, cov_cr / denominator, np.nan)
+    return n, mean_c, discrimination, totals
+
+
+def _time_to_answer(rows, cols, answered, started, shape):
+    # Seconds since the attempt started, laid out like the correctness matrix (NaN = unanswered)
+    times = np.full(shape, np.nan, dtype=np.float32)
+    times[rows, cols] = answered - started[rows]
+
+    # Each answer's time minus the attempt's previous answer, from one sort per attempt row
+    order = np.argsort(times, axis=1)
+    elapsed = np.take_along_axis(times, order, axis=1)
+    elapsed[:, 1:] -= np.take_along_axis(times, order[:, :-1], axis=1)
+    np.put_along_axis(times, order, np.clip(elapsed, 0, None), axis=1)
+
+    with warnings.catch_warnings():
+        # Questions nobody answered have all-NaN columns
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmean(times, axis=0), np.nanmedian(times, axis=0)
+
+
+def build_report(quiz, questions, answers, attempts, responses):
+    _import_numpy()
+    question_count, attempt_count = len(questions['id']), len(attempts['id'])
+    rows = _positions(attempts['id'], responses['attempt'])
+    cols = _positions(questions['id'], responses['question'])
+
+    correct = np.zeros((attempt_count, question_count), dtype=np.float32)
+    correct[rows, cols] = responses['correct']
+    presented = None
+    if quiz.question_pool_size:
+        presented = np.zeros_like(correct)
+        presented[rows, cols] = 1
+
+    n, difficulty, discrimination, totals = _difficulty_and_discrimination(correct, presented, questions['points'])
+    mean_time, median_time = _time_to_answer(rows, cols, responses['answered'], attempts['started'], correct.shape)
+
+    selected = responses['selected'][~np.isnan(responses['selected'])].astype(np.int64)
+    answer_counts = np.bincount(_positions(answers['id'], selected), minlength=len(answers['id']))
+    answer_cols = _positions(questions['id'], answers['question'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        answer_share = answer_counts / n[answer_cols]
+
+    distractors = [[] for _ in range(question_count)]
+    for answer_id, column, text, is_correct, count, share in zip(
+        answers['id'].tolist(), answer_cols.tolist(), answers['text'], answers['is_correct'],
+        answer_counts.tolist(), _optional(answer_share),
+    ):
+        distractors[column].append({'answer_id': answer_id, 'answer_text': text, 'is_correct': is_correct, 'count': count, 'share': share})
+
+    report_questions = []
+    for column, (question_id, presented_count, p, r, mean, median) in enumerate(zip(
+        questions['id'].tolist(), n.tolist(), _optional(difficulty), _optional(discrimination), _optional(mean_time), _optional(median_time),
+    )):
+        report_questions.append({
+            'question_id': question_id,
+            'attempts': int(presented_count),
+            'difficulty': p,
+            'discrimination': r,
+            'time_to_answer': {'mean_seconds': mean, 'median_seconds': median},
+            'answers': distractors[column],
+        })
+
+    return {
+        'quiz_id': quiz.pk,
+        'attempts': attempt_count,
+        'mean_score': round(float(totals.mean()), 4) if attempt_count else None,
+        'questions': report_questions,
+    }
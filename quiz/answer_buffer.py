@@ -0,0 +1,138 @@
+"""
+Write-behind buffer for answers to in-progress quiz attempts.
+
+When ``QUIZ_BUFFER_ANSWERS`` is enabled, ``submit_answer`` keeps answers in a
+Django cache backend instead of writing a ``UserResponse`` row on every call.
+Buffered answers are written to ``UserResponse`` with one bulk upsert when the
+attempt is completed, or at a periodic checkpoint.
+
+Each answer is stored under its own ``(attempt, question)`` key, so concurrent
+submissions for the same attempt never overwrite each other. A buffered answer
+has no ``UserResponse`` row yet, so ``submit_answer`` returns a
+``response_id`` of ``null`` for it. Use a shared,
+persistent backend (file-based, database, Redis or Memcached) in production;
+the in-memory backend does not survive worker restarts.
+"""
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import Question, UserResponse
+
+
+def is_enabled():
+    return getattr(settings, 'QUIZ_BUFFER_ANSWERS', False)
+
+
+def _cache():
+    return caches[getattr(settings, 'QUIZ_ANSWER_BUFFER_CACHE', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'QUIZ_ANSWER_BUFFER_TIMEOUT', 7 * 24 * 60 * 60)
+
+
+def _answer_key(attempt_id, question_id):
+    return f'quiz:answer-buffer:{attempt_id}:{question_id}'
+
+
+def _checkpoint_key(attempt_id):
+    return f'quiz:answer-buffer:{attempt_id}:checkpoint'
+
+
+def buffer_answer(attempt, question, selected_answer=None, text_answer=''):
+    """Store an answer for ``attempt`` and checkpoint it if the interval elapsed."""
+    cache = _cache()
+    answer_id = selected_answer.id if selected_answer else None
+    cache.set(_answer_key(attempt.id, question.id), (answer_id, text_answer, timezone.now()), _timeout())
+
+    interval = getattr(settings, 'QUIZ_ANSWER_BUFFER_CHECKPOINT', 60)
+    now = time.time()
+    last_checkpoint = cache.get(_checkpoint_key(attempt.id))
+    if last_checkpoint is None:
+        cache.add(_checkpoint_key(attempt.id), now, _timeout())
+    elif interval is not None and now - last_checkpoint >= interval:
+        cache.set(_checkpoint_key(attempt.id), now, _timeout())
+        flush(attempt)
+
+
+def _load(keys):
+    """Return ``{cache key: UserResponse}`` for the buffered answers under ``keys``, a dict of ``(attempt, question)``."""
+    buffered = _cache().get_many(list(keys))
+    if not buffered:
+        return {}
+
+    # Questions come with their answers prefetched, so no extra query is needed here
+    answers = {answer.id: answer for _, question in keys.values() for answer in question.answers.all()}
+    responses = {}
+    for key, (answer_id, text_answer, answered_at) in buffered.items():
+        attempt, question = keys[key]
+        response = UserResponse(
+            attempt=attempt,
+            question=question,
+            selected_answer=answers.get(answer_id),
+            text_answer=text_answer,
+            answered_at=answered_at,
+        )
+        response.grade()
+        responses[key] = response
+    return responses
+
+
+def _buffered_responses(attempt, questions):
+    return _load({_answer_key(attempt.id, question.id): (attempt, question) for question in questions})
+
+
+def buffered_responses(attempts):
+    """Return ``{attempt id: [UserResponse]}`` for the buffered answers of ``attempts``, in one query and one cache read."""
+    questions = defaultdict(list)
+    for question in Question.objects.filter(quiz_id__in={attempt.quiz_id for attempt in attempts}).prefetch_related('answers'):
+        questions[question.quiz_id].append(question)
+    responses = defaultdict(list)
+    keys = {_answer_key(attempt.id, question.id): (attempt, question) for attempt in attempts for question in questions[attempt.quiz_id]}
+    for response in _load(keys).values():
+        responses[response.attempt_id].append(response)
+    return responses
+
+
+def flush(attempt, clear=False):
+    """
+    Write the buffered answers of ``attempt`` to ``UserResponse`` in one bulk upsert.
+
+    Checkpoints leave the buffer in place, since the student may still change
+    an answer while the flush runs. Pass ``clear=True`` once the attempt no
+    longer accepts answers. Returns the number of responses written.
+    """
+    questions = Question.objects.filter(quiz_id=attempt.quiz_id).prefetch_related('answers')
+    responses = _buffered_responses(attempt, questions)
+    if responses:
+        UserResponse.objects.bulk_create(
+            list(responses.values()),
+            update_conflicts=True,
+            unique_fields=['attempt', 'question'],
+            # Stamped when the answer was last changed, not when a checkpoint first wrote it
+            update_fields=['selected_answer', 'text_answer', 'is_correct', 'answered_at'],
+        )
+    if clear:
+        _cache().delete_many(list(responses) + [_checkpoint_key(attempt.id)])
+    return len(responses)
+
+
+def merge_responses(attempt, responses, buffered=None):
+    """
+    Return ``responses`` with any answers still in the buffer laid over them.
+
+    ``buffered`` is the attempt's list from ``buffered_responses()``, when it
+    was read along with other attempts'.
+    """
+    if buffered is None:
+        buffered = buffered_responses([attempt])[attempt.id]
+    buffered = {response.question_id: response for response in buffered}
+    if not buffered:
+        return responses
+    merged = [response for response in responses if response.question_id not in buffered]
+    merged.extend(buffered.values())
+    return sorted(merged, key=lambda response: response.question.order)
@@ -0,0 +1,270 @@
+"""
+Archival of old completed attempts out of the hot tables.
+
+``archive_attempts()`` moves completed attempts older than a cutoff, with
+their responses, into gzip-compressed NDJSON files under
+``QUIZ_ARCHIVE_ROOT``, one file per quiz and month of completion
+(``quiz-<id>/<YYYY-MM>.ndjson.gz``). Each chunk is appended to its file as a
+separate gzip member, and every attempt leaves an ``ArchivedAttempt`` summary
+row pointing at its member. Loading an archived attempt therefore reads and
+decompresses one chunk, not the whole file. ``restore()`` puts archived
+attempts back into ``QuizAttempt`` and ``UserResponse`` with their original
+ids.
+
+Archive files are append-only, and each append holds an exclusive ``flock``
+on the file where it is available, so concurrent archivers do not interleave
+their members. An attempt that is restored and archived
+again is written a second time, and its summary row points at the newer copy.
+"""
+import base64
+import gzip
+import json
+import os
+import zlib
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .models import Answer, ArchivedAttempt, Question, Quiz, QuizAttempt, QuizVersion, UserResponse
+
+RESPONSE_FIELDS = ['id', 'question_id', 'selected_answer_id', 'text_answer', 'is_correct', 'answered_at']
+
+
+def root():
+    return Path(getattr(settings, 'QUIZ_ARCHIVE_ROOT', settings.BASE_DIR / 'archive'))
+
+
+def archive_path(quiz_id, completed_at):
+    return f'quiz-{quiz_id}/{completed_at:%Y-%m}.ndjson.gz'
+
+
+def _timestamp(value):
+    return value.isoformat() if value else None
+
+
+def _record(attempt, quiz_title, responses):
+    return {
+        'id': attempt.id,
+        'user_id': attempt.user_id,
+        'quiz_id': attempt.quiz_id,
+        'quiz_title': quiz_title,
+        'version_id': attempt.version_id,
+        'started_at': _timestamp(attempt.started_at),
+        'deadline': _timestamp(attempt.deadline),
+        'completed_at': _timestamp(attempt.completed_at),
+        'score': attempt.score,
+        'total_points': attempt.total_points,
+        'question_ids': base64.b64encode(bytes(attempt.question_ids)).decode() if attempt.question_ids is not None else None,
+        'shuffle_seed': attempt.shuffle_seed,
+        'responses': [
+            {
+                **{field: response[field] for field in RESPONSE_FIELDS},
+                'answered_at': _timestamp(response['answered_at']),
+                # Kept so an archived attempt reads the same after the quiz is edited
+                'question_text': response['question__question_text'],
+                'points': response['question__points'],
+                'answer_text': response['selected_answer__answer_text'],
+            }
+            for response in responses
+        ],
+    }
+
+
+def _append(path, records):
+    """Append ``records`` to the archive at ``path`` as one gzip member and return the member's offset."""
+    full_path = root() / path
+    full_path.parent.mkdir(parents=True, exist_ok=True)
+    data = b''.join(json.dumps(record, separators=(',', ':')).encode() + b'\n' for record in records)
+    with open(full_path, 'ab') as archive:
+        if fcntl is not None:
+            # Held until the file is closed, so no other append lands between the seek and the write
+            fcntl.flock(archive.fileno(), fcntl.LOCK_EX)
+        offset = archive.seek(0, os.SEEK_END)
+        archive.write(gzip.compress(data))
+        archive.flush()
+        # On disk before the rows it replaces are deleted
+        os.fsync(archive.fileno())
+    return offset
+
+
+def _archive_chunk(attempt_ids):
+    with transaction.atomic():
+        attempts = list(QuizAttempt.objects.select_for_update().filter(pk__in=attempt_ids, completed_at__isnull=False).order_by('id'))
+        if not attempts:
+            return 0
+        ids = [attempt.id for attempt in attempts]
+        titles = dict(Quiz.objects.filter(id__in={attempt.quiz_id for attempt in attempts}).values_list('id', 'title'))
+        responses = defaultdict(list)
+        rows = UserResponse.objects.filter(attempt_id__in=ids).order_by('question__order', 'id').values(
+            'attempt_id', *RESPONSE_FIELDS, 'question__question_text', 'question__points', 'selected_answer__answer_text',
+        )
+        for response in rows:
+            responses[response['attempt_id']].append(response)
+
+        files = defaultdict(list)
+        for attempt in attempts:
+            files[archive_path(attempt.quiz_id, attempt.completed_at)].append(attempt)
+
+        summaries = []
+        for path, file_attempts in files.items():
+            offset = _append(path, [_record(attempt, titles[attempt.quiz_id], responses[attempt.id]) for attempt in file_attempts])
+            summaries.extend(
+                ArchivedAttempt(
+                    id=attempt.id, user_id=attempt.user_id, quiz_id=attempt.quiz_id,
+                    started_at=attempt.started_at, completed_at=attempt.completed_at,
+                    score=attempt.score, total_points=attempt.total_points,
+                    archive=path, offset=offset,
+                )
+                for attempt in file_attempts
+            )
+        ArchivedAttempt.objects.bulk_create(summaries)
+        UserResponse.objects.filter(attempt_id__in=ids).delete()
+        QuizAttempt.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_attempts(before, chunk_size=500, quiz=None, progress=None):
+    """
+    Archive attempts completed before ``before``, ``chunk_size`` at a time.
+
+    Each chunk is archived in its own transaction. ``progress(archived)`` is
+    called after each chunk when given. Returns the number of attempts archived.
+    """
+    attempts = QuizAttempt.objects.filter(completed_at__lt=before)
+    if quiz is not None:
+        attempts = attempts.filter(quiz=quiz)
+    archived = 0
+    last_id = 0
+    while True:
+        chunk = list(attempts.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not chunk:
+            return archived
+        archived += _archive_chunk(chunk)
+        last_id = chunk[-1]
+        if progress:
+            progress(archived)
+
+
+def _read_member(path, offset):
+    """Return the records in the gzip member of the archive at ``path`` that starts at ``offset``."""
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    data = []
+    with open(root() / path, 'rb') as archive:
+        archive.seek(offset)
+        # A decompressor stops at the end of its member, so later chunks are never read
+        while not decompressor.eof:
+            block = archive.read(64 * 1024)
+            if not block:
+                break
+            data.append(decompressor.decompress(block))
+    return [json.loads(line) for line in b''.join(data).splitlines() if line]
+
+
+def load(summary):
+    """Return the archived record of an ``ArchivedAttempt``."""
+    for record in _read_member(summary.archive, summary.offset):
+        if record['id'] == summary.id:
+            return record
+    raise LookupError(f'Attempt {summary.id} is missing from {summary.archive}')
+
+
+def representation(record):
+    """Return an archived record in the shape of ``QuizAttemptSerializer``."""
+    score, total_points = record['score'], record['total_points']
+    return {
+        'id': record['id'],
+        'quiz': {'id': record['quiz_id'], 'title': record['quiz_title']},
+        'started_at': record['started_at'],
+        'deadline': record['deadline'],
+        'completed_at': record['completed_at'],
+        'score': score,
+        'total_points': total_points,
+        'percentage_score': round(score / total_points * 100, 2) if score is not None and total_points else 0,
+        'question_ids': _decode_question_ids(record),
+        'responses': [
+            {
+                'id': response['id'],
+                'question': {'id': response['question_id'], 'question_text': response['question_text'], 'points': response['points']},
+                'selected_answer': {'id': response['selected_answer_id'], 'answer_text': response['answer_text']} if response['selected_answer_id'] else None,
+                'text_answer': response['text_answer'],
+                'is_correct': response['is_correct'],
+                'answered_at': response['answered_at'],
+            }
+            for response in record['responses']
+        ],
+        'archived': True,
+    }
+
+
+def _decode_question_ids(record):
+    if record['question_ids'] is None:
+        return None
+    from .pools import decode_ids
+    return decode_ids(base64.b64decode(record['question_ids']))
+
+
+def restore(summaries):
+    """
+    Move archived attempts back into ``QuizAttempt`` and ``UserResponse`` with their original ids.
+
+    Responses to questions deleted since archiving are dropped, as deleting
+    the question would have deleted them. Returns the number of attempts restored.
+    """
+    members = defaultdict(list)
+    for summary in summaries:
+        members[(summary.archive, summary.offset)].append(summary.id)
+    records = []
+    for (path, offset), ids in members.items():
+        wanted = set(ids)
+        records.extend(record for record in _read_member(path, offset) if record['id'] in wanted)
+    if not records:
+        return 0
+
+    responses = [response for record in records for response in record['responses']]
+    questions = set(Question.objects.filter(id__in={response['question_id'] for response in responses}).values_list('id', flat=True))
+    answers = set(Answer.objects.filter(id__in={response['selected_answer_id'] for response in responses if response['selected_answer_id']}).values_list('id', flat=True))
+    versions = set(QuizVersion.objects.filter(id__in={record['version_id'] for record in records if record['version_id']}).values_list('id', flat=True))
+
+    attempts = [
+        QuizAttempt(
+            id=record['id'], user_id=record['user_id'], quiz_id=record['quiz_id'],
+            version_id=record['version_id'] if record['version_id'] in versions else None,
+            started_at=parse_datetime(record['started_at']),
+            deadline=parse_datetime(record['deadline']) if record['deadline'] else None,
+            completed_at=parse_datetime(record['completed_at']),
+            score=record['score'], total_points=record['total_points'],
+            question_ids=base64.b64decode(record['question_ids']) if record['question_ids'] is not None else None,
+            shuffle_seed=record['shuffle_seed'],
+        )
+        for record in records
+    ]
+    with transaction.atomic():
+        QuizAttempt.objects.bulk_create(attempts)
+        # bulk_create overwrites auto_now_add fields with the current time
+        for attempt, record in zip(attempts, records):
+            attempt.started_at = parse_datetime(record['started_at'])
+        QuizAttempt.objects.bulk_update(attempts, ['started_at'])
+        UserResponse.objects.bulk_create(
+            UserResponse(
+                attempt_id=record['id'],
+                question_id=response['question_id'],
+                selected_answer_id=response['selected_answer_id'] if response['selected_answer_id'] in answers else None,
+                text_answer=response['text_answer'],
+                is_correct=response['is_correct'],
+                answered_at=parse_datetime(response['answered_at']),
+                id=response['id'],
+            )
+            for record in records
+            for response in record['responses']
+            if response['question_id'] in questions
+        )
+        ArchivedAttempt.objects.filter(pk__in=[record['id'] for record in records]).delete()
+    return len(records)
@@ -0,0 +1,145 @@
+"""
+The public quiz catalog, served from an in-process snapshot.
+
+The snapshot holds every active quiz rendered to JSON once, newest first,
+together with the title ordering, so a catalog request only filters and
+joins pre-rendered bytes and never queries the database. Snapshots are
+rebuilt after ``QUIZ_CATALOG_REFRESH_INTERVAL`` seconds, or as soon as
+``invalidate()`` is called by the quiz change signals. The rebuild runs in
+a background thread while requests keep getting the previous snapshot; only
+the first request of a process waits for one.
+
+Each process has its own snapshot. Other processes pick up changes on
+their next interval refresh.
+"""
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.renderers import JSONRenderer
+
+from .models import Quiz
+from .serializers import CatalogQuizSerializer
+
+logger = logging.getLogger(__name__)
+
+ORDERINGS = ['-created_at', 'created_at', 'title', '-title']
+
+_renderer = JSONRenderer()
+_lock = threading.Lock()
+_catalog = None
+_stale = False
+_refreshing = False
+
+
+class Entry:
+    __slots__ = ['id', 'creator', 'text', 'time_limit', 'body']
+
+    def __init__(self, quiz):
+        self.id = quiz.id
+        self.creator = quiz.creator.username
+        # What ``search`` matches against
+        self.text = f'{quiz.title}\n{quiz.description}'.casefold()
+        self.time_limit = quiz.time_limit
+        self.body = _renderer.render(CatalogQuizSerializer(quiz).data)
+
+
+class Catalog:
+    """An immutable snapshot of the active quizzes."""
+    __slots__ = ['entries', 'orders', 'etag', 'built_at']
+
+    def __init__(self, quizzes):
+        self.entries = tuple(Entry(quiz) for quiz in quizzes)
+        newest = tuple(range(len(self.entries)))
+        by_title = tuple(sorted(newest, key=lambda index: (quizzes[index].title.casefold(), quizzes[index].id)))
+        self.orders = {
+            '-created_at': newest,
+            'created_at': newest[::-1],
+            'title': by_title,
+            '-title': by_title[::-1],
+        }
+        self.etag = hashlib.sha1(b'\n'.join(entry.body for entry in self.entries)).hexdigest()
+        self.built_at = time.monotonic()
+
+    def select(self, search=None, creator=None, max_time_limit=None, ordering='-created_at'):
+        """Return the matching entries in ``ordering``."""
+        entries = (self.entries[index] for index in self.orders[ordering])
+        if search:
+            search = search.casefold()
+            entries = (entry for entry in entries if search in entry.text)
+        if creator:
+            entries = (entry for entry in entries if entry.creator == creator)
+        if max_time_limit is not None:
+            entries = (entry for entry in entries if entry.time_limit is not None and entry.time_limit <= max_time_limit)
+        return list(entries)
+
+
+def build():
+    quizzes = list(
+        Quiz.objects.filter(is_active=True)
+        .select_related('creator')
+        .with_totals()
+        .order_by('-created_at', '-id')
+    )
+    return Catalog(quizzes)
+
+
+def refresh():
+    """Rebuild the snapshot now and return it."""
+    global _catalog, _stale
+    # Cleared first, so a change made while building triggers another refresh
+    _stale = False
+    catalog = build()
+    _catalog = catalog
+    return catalog
+
+
+def _refresh_in_background():
+    global _refreshing, _stale
+    try:
+        refresh()
+    except Exception:
+        _stale = True
+        logger.exception('Refreshing the quiz catalog failed')
+    finally:
+        _refreshing = False
+        # The thread's own connections, which would otherwise stay open
+        connections.close_all()
+
+
+def _schedule_refresh():
+    global _refreshing
+    if not getattr(settings, 'QUIZ_CATALOG_BACKGROUND_REFRESH', True):
+        refresh()
+        return
+    with _lock:
+        if _refreshing:
+            return
+        _refreshing = True
+    threading.Thread(target=_refresh_in_background, name='quiz-catalog-refresh', daemon=True).start()
+
+
+def get():
+    """Return the current snapshot, scheduling a refresh when it is due."""
+    catalog = _catalog
+    if catalog is None:
+        with _lock:
+            catalog = _catalog or refresh()
+    elif _stale or time.monotonic() - catalog.built_at > getattr(settings, 'QUIZ_CATALOG_REFRESH_INTERVAL', 30):
+        _schedule_refresh()
+        # Still the previous snapshot when refreshing in the background
+        catalog = _catalog
+    return catalog
+
+
+def invalidate():
+    global _stale
+    _stale = True
+
+
+def reset():
+    global _catalog, _stale, _refreshing
+    _catalog, _stale, _refreshing = None, False, False
@@ -0,0 +1,203 @@
+"""
+Append-only attempt event log.
+
+Views record events into an in-process buffer instead of writing them. The
+buffer is written with one bulk ``INSERT`` once it holds
+``QUIZ_EVENT_BATCH_SIZE`` events or its oldest event is
+``QUIZ_EVENT_FLUSH_INTERVAL`` seconds old. That check runs on
+``request_finished``, after the response has gone out, so recording an event
+adds no write to the request. Whatever is left is flushed when the process
+exits.
+
+A batch that fails to write is logged and put back in the buffer, to be
+retried once ``QUIZ_EVENT_FLUSH_INTERVAL`` has passed. The buffer keeps at
+most ``QUIZ_EVENT_MAX_BUFFERED`` events, dropping the oldest beyond that.
+
+Payloads are packed as unsigned varints (see ``AttemptEvent``), and
+``replay()`` folds a stream of events back into per-quiz aggregates.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .models import AttemptEvent
+
+logger = logging.getLogger(__name__)
+
+_buffer = []
+_oldest = None
+_retry_at = 0
+_lock = threading.Lock()
+
+
+def is_enabled():
+    return getattr(settings, 'QUIZ_EVENT_LOG', True)
+
+
+def _pack(values, tail=b''):
+    data = bytearray()
+    for value in values:
+        while value >= 0x80:
+            data.append((value & 0x7F) | 0x80)
+            value >>= 7
+        data.append(value)
+    return bytes(data) + tail
+
+
+def _unpack(data, count):
+    """Return ``count`` varints from ``data`` and the bytes that follow them."""
+    data = bytes(data)
+    values, value, shift, position = [], 0, 0, 0
+    while len(values) < count:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value = shift = 0
+    return values, data[position:]
+
+
+def encode_started(quiz_id, user_id):
+    return _pack((quiz_id, user_id))
+
+
+def decode_started(payload):
+    (quiz_id, user_id), _ = _unpack(payload, 2)
+    return quiz_id, user_id
+
+
+def encode_answer(question_id, answer_id=None, text_answer=''):
+    # 0 stands for "no answer selected", so answer ids are stored off by one
+    return _pack((question_id, answer_id + 1 if answer_id else 0), text_answer.encode())
+
+
+def decode_answer(payload):
+    (question_id, answer_id), text = _unpack(payload, 2)
+    return question_id, answer_id - 1 if answer_id else None, text.decode()
+
+
+def record(kind, attempt_id, payload=b''):
+    """Buffer one event; it is written by the next ``flush()``."""
+    global _oldest
+    if not is_enabled():
+        return
+    event = AttemptEvent(attempt_id=attempt_id, kind=kind, payload=payload, created_at=timezone.now())
+    with _lock:
+        if not _buffer:
+            _oldest = time.monotonic()
+        _buffer.append(event)
+
+
+def started(attempt):
+    record(AttemptEvent.STARTED, attempt.id, encode_started(attempt.quiz_id, attempt.user_id))
+
+
+def answered(attempt, question, selected_answer=None, text_answer=''):
+    record(AttemptEvent.ANSWERED, attempt.id, encode_answer(question.id, selected_answer.id if selected_answer else None, text_answer))
+
+
+def completed(attempt_ids):
+    for attempt_id in attempt_ids:
+        record(AttemptEvent.COMPLETED, attempt_id)
+
+
+def pending():
+    return len(_buffer)
+
+
+def _take():
+    global _buffer, _oldest, _retry_at
+    with _lock:
+        batch, _buffer, _oldest, _retry_at = _buffer, [], None, 0
+    return batch
+
+
+def _restore(batch):
+    """Put a batch that failed to write back in front of the events buffered since."""
+    global _buffer, _oldest, _retry_at
+    limit = getattr(settings, 'QUIZ_EVENT_MAX_BUFFERED', 100000)
+    with _lock:
+        _buffer = batch + _buffer
+        if len(_buffer) > limit:
+            logger.error('Dropping %d attempt events over QUIZ_EVENT_MAX_BUFFERED', len(_buffer) - limit)
+            del _buffer[:len(_buffer) - limit]
+        _oldest = time.monotonic()
+        # Retried after the flush interval, not by the next request to finish
+        _retry_at = _oldest + getattr(settings, 'QUIZ_EVENT_FLUSH_INTERVAL', 5)
+
+
+def flush():
+    """Write every buffered event, returning how many were written; a batch that fails is kept for a retry."""
+    batch = _take()
+    if not batch:
+        return 0
+    try:
+        # All or nothing, so a retried batch is never written twice
+        with transaction.atomic():
+            AttemptEvent.objects.bulk_create(batch, batch_size=getattr(settings, 'QUIZ_EVENT_BATCH_SIZE', 500))
+    except DatabaseError:
+        logger.exception('Writing %d attempt events failed', len(batch))
+        _restore(batch)
+        return 0
+    return len(batch)
+
+
+def discard():
+    """Drop buffered events without writing them."""
+    return len(_take())
+
+
+def flush_if_due(**kwargs):
+    oldest = _oldest
+    if oldest is None or time.monotonic() < _retry_at:
+        return 0
+    if len(_buffer) >= getattr(settings, 'QUIZ_EVENT_BATCH_SIZE', 500) or time.monotonic() - oldest >= getattr(settings, 'QUIZ_EVENT_FLUSH_INTERVAL', 5):
+        return flush()
+    return 0
+
+
+def replay(events):
+    """
+    Fold ``events``, in the order they happened (``created_at``), into aggregates per quiz.
+
+    Returns ``{quiz_id: {...}}`` with attempts started and completed, answers
+    submitted and changed, and the mean attempt duration in seconds.
+    Events of attempts whose STARTED event is not in ``events`` are skipped.
+    """
+    quizzes = defaultdict(lambda: {'started': 0, 'completed': 0, 'answers': 0, 'changed_answers': 0, 'total_seconds': 0.0})
+    attempts = {}
+    for event in events:
+        if event.kind == AttemptEvent.STARTED:
+            quiz_id, _ = decode_started(event.payload)
+            attempts[event.attempt_id] = (quiz_id, event.created_at, set())
+            quizzes[quiz_id]['started'] += 1
+            continue
+
+        attempt = attempts.get(event.attempt_id)
+        if attempt is None:
+            continue
+        quiz_id, started_at, answered = attempt
+        stats = quizzes[quiz_id]
+        if event.kind == AttemptEvent.ANSWERED:
+            question_id, _, _ = decode_answer(event.payload)
+            stats['answers'] += 1
+            if question_id in answered:
+                stats['changed_answers'] += 1
+            answered.add(question_id)
+        elif event.kind == AttemptEvent.COMPLETED:
+            stats['completed'] += 1
+            stats['total_seconds'] += (event.created_at - started_at).total_seconds()
+            del attempts[event.attempt_id]
+
+    for stats in quizzes.values():
+        total = stats.pop('total_seconds')
+        stats['mean_duration_seconds'] = round(total / stats['completed'], 2) if stats['completed'] else None
+    return dict(quizzes)
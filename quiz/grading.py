@@ -0,0 +1,127 @@
+"""
+Short answer grading.
+
+A short answer question's accepted answers are its ``Answer`` rows marked
+``is_correct``. Each question compiles into a ``ShortAnswerMatcher``: a set of
+normalized accepted answers, their numeric values and an optional bounded
+edit distance. A response that is a number is only compared with the accepted
+numbers, within ``numeric_tolerance``, and any other response only with the
+accepted answers that are not numbers. Compiled matchers are cached by content, so editing an accepted
+answer or a rule simply compiles a new matcher.
+"""
+import re
+import string
+import unicodedata
+from functools import lru_cache
+
+_PUNCTUATION = str.maketrans('', '', string.punctuation)
+_WHITESPACE = re.compile(r'\s+')
+# Commas only as thousands separators, so 1,5 is not read as 15
+_NUMBER = re.compile(r'[+-]?(?:\d{1,3}(?:,\d{3})+|\d+)?(?:\.\d+)?(?:[eE][+-]?\d+)?')
+# Absorbs float rounding, so 3.13 is within 0.01 of 3.14
+_EPSILON = 1e-9
+
+
+def normalize(text, case_sensitive=False, ignore_punctuation=True):
+    text = unicodedata.normalize('NFKC', text)
+    if not case_sensitive:
+        text = text.casefold()
+    if ignore_punctuation:
+        text = text.translate(_PUNCTUATION)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def parse_number(text):
+    text = unicodedata.normalize('NFKC', text).strip()
+    if not _NUMBER.fullmatch(text) or not any(char.isdigit() for char in text):
+        return None
+    return float(text.replace(',', ''))
+
+
+def within_edit_distance(a, b, limit):
+    """Return whether the Levenshtein distance between ``a`` and ``b`` is at most ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+
+    # Only cells within ``limit`` of the diagonal can stay under the limit
+    too_far = limit + 1
+    previous = [min(j, too_far) for j in range(len(b) + 1)]
+    for i, char in enumerate(a, 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [too_far] * (len(b) + 1)
+        current[0] = min(i, too_far)
+        for j in range(low, high + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != b[j - 1]),
+                too_far,
+            )
+        if min(current[low - 1:high + 1]) > limit:
+            return False
+        previous = current
+    return previous[len(b)] <= limit
+
+
+class ShortAnswerMatcher:
+    __slots__ = ['case_sensitive', 'ignore_punctuation', 'exact', 'numbers', 'numeric_tolerance', 'fuzzy', 'max_edit_distance']
+
+    def __init__(self, accepted, case_sensitive=False, ignore_punctuation=True, numeric_tolerance=None, max_edit_distance=0):
+        self.case_sensitive = case_sensitive
+        self.ignore_punctuation = ignore_punctuation
+        numbers = {text: parse_number(text) for text in accepted}
+        # Numbers are never matched as text, where punctuation stripping would turn -3.14 into 314
+        self.exact = frozenset(normalize(text, case_sensitive, ignore_punctuation) for text, number in numbers.items() if number is None)
+        self.numeric_tolerance = numeric_tolerance
+        self.numbers = tuple(number for number in numbers.values() if number is not None)
+        self.max_edit_distance = max_edit_distance
+        self.fuzzy = tuple(sorted(self.exact)) if max_edit_distance else ()
+
+    def matches(self, text):
+        number = parse_number(text)
+        if number is not None:
+            tolerance = (self.numeric_tolerance or 0) + _EPSILON
+            return any(abs(number - accepted) <= tolerance for accepted in self.numbers)
+
+        normalized = normalize(text, self.case_sensitive, self.ignore_punctuation)
+        if normalized in self.exact:
+            return True
+        return any(within_edit_distance(normalized, accepted, self.max_edit_distance) for accepted in self.fuzzy)
+
+
+@lru_cache(maxsize=4096)
+def _compile(accepted, case_sensitive, ignore_punctuation, numeric_tolerance, max_edit_distance):
+    return ShortAnswerMatcher(accepted, case_sensitive, ignore_punctuation, numeric_tolerance, max_edit_distance)
+
+
+def matcher_for(question):
+    """
+    Return the compiled matcher for a short answer question, or ``None`` if it has no accepted answers.
+
+    Uses prefetched ``answers`` when available.
+    """
+    return compile_matcher(
+        [answer.answer_text for answer in question.answers.all() if answer.is_correct],
+        question.case_sensitive,
+        question.ignore_punctuation,
+        question.numeric_tolerance,
+        question.max_edit_distance,
+    )
+
+
+def compile_matcher(accepted, case_sensitive=False, ignore_punctuation=True, numeric_tolerance=None, max_edit_distance=0):
+    """Return the compiled matcher for the ``accepted`` answer texts, or ``None`` if there are none."""
+    accepted = tuple(sorted(accepted))
+    if not accepted:
+        return None
+    return _compile(accepted, case_sensitive, ignore_punctuation, numeric_tolerance, max_edit_distance)
+
+
+def grade_short_answer(question, text):
+    """Return whether ``text`` is accepted, or ``None`` when the question has nothing to grade against."""
+    matcher = matcher_for(question)
+    if matcher is None:
+        return None
+    return matcher.matches(text)
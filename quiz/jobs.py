@@ -0,0 +1,190 @@
+"""
+Background jobs without an external broker.
+
+Jobs are rows in the ``Job`` table. ``enqueue()`` adds one, and workers started
+by ``manage.py run_workers`` claim due jobs and run the registered task:
+
+- on PostgreSQL (and other backends with ``SELECT ... FOR UPDATE SKIP LOCKED``)
+  a worker locks a batch of due jobs, skipping rows other workers hold, and
+  marks them running in the same transaction;
+- on SQLite a worker picks candidates and claims each one with an ``UPDATE``
+  conditional on the state it read, so exactly one worker wins each job.
+
+A failing job is retried with exponential backoff until ``max_attempts`` is
+reached. Jobs whose worker died are picked up again once they have been
+running for ``QUIZ_JOB_TIMEOUT`` seconds, and fail instead if that was their
+last attempt, as a job that kills its worker would otherwise run forever. Tasks receive their ``Job`` and
+report progress with ``job.report()``, which the job status endpoint shows.
+"""
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import provisioning, search
+from .analysis import item_analysis
+from .models import Job, Quiz
+from .scoring import expire_attempts, regrade_quiz
+
+_tasks = {}
+
+
+def task(name):
+    """Register ``func(job, **kwargs)`` as the task ``name``."""
+    def register(func):
+        _tasks[name] = func
+        return func
+    return register
+
+
+def enqueue(task_name, user=None, delay=0, max_attempts=3, **kwargs):
+    if task_name not in _tasks:
+        raise KeyError(f'Unknown task {task_name!r}')
+    return Job.objects.create(
+        task=task_name,
+        kwargs=kwargs,
+        created_by=user,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a job that has failed ``attempts`` times."""
+    base = getattr(settings, 'QUIZ_JOB_RETRY_DELAY', 10)
+    delay = min(base * 2 ** (attempts - 1), getattr(settings, 'QUIZ_JOB_MAX_RETRY_DELAY', 60 * 60))
+    # Jitter spreads out retries of jobs that failed together
+    return delay * random.uniform(0.5, 1)
+
+
+def _stale(now):
+    return Q(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=getattr(settings, 'QUIZ_JOB_TIMEOUT', 60 * 60)))
+
+
+def _due(now):
+    return Job.objects.filter(Q(status=Job.PENDING, run_at__lte=now) | (_stale(now) & Q(attempts__lt=F('max_attempts'))))
+
+
+def fail_stale(now=None):
+    """Fail the jobs whose worker died on their last attempt, returning how many there were."""
+    now = now or timezone.now()
+    timeout = getattr(settings, 'QUIZ_JOB_TIMEOUT', 60 * 60)
+    return Job.objects.filter(_stale(now), attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, locked_by='', locked_at=None,
+        error=f'The worker stopped responding: the job was still running after {timeout} seconds on its last attempt',
+    )
+
+
+def claim(worker, limit=1):
+    """Claim up to ``limit`` due jobs for ``worker`` and return them."""
+    now = timezone.now()
+    fail_stale(now)
+    claimed = {'status': Job.RUNNING, 'locked_by': worker, 'locked_at': now, 'attempts': F('attempts') + 1}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(_due(now).select_for_update(skip_locked=True).order_by('run_at', 'id').values_list('id', flat=True)[:limit])
+            Job.objects.filter(id__in=ids).update(**claimed)
+    else:
+        ids = []
+        for job_id, status, locked_at in _due(now).order_by('run_at', 'id').values_list('id', 'status', 'locked_at')[:limit * 4]:
+            # Compare-and-set on the state we read; a competing worker changes it first or not at all
+            if Job.objects.filter(id=job_id, status=status, locked_at=locked_at).update(**claimed):
+                ids.append(job_id)
+                if len(ids) == limit:
+                    break
+    return list(Job.objects.filter(id__in=ids).order_by('run_at', 'id'))
+
+
+def run(job):
+    """Run a claimed job, recording its result or scheduling a retry."""
+    try:
+        result = _tasks[job.task](job, **job.kwargs)
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.status = Job.SUCCEEDED
+        job.result = result
+        job.progress = 1
+        job.error = ''
+        job.finished_at = timezone.now()
+    job.locked_by, job.locked_at = '', None
+    Job.objects.filter(id=job.id).update(
+        status=job.status, run_at=job.run_at, result=job.result, progress=job.progress, error=job.error,
+        finished_at=job.finished_at, locked_by='', locked_at=None,
+    )
+    return job
+
+
+def work(stop=None, poll_interval=1.0, once=False, batch_size=1):
+    """
+    Claim and run jobs until ``stop`` is set.
+
+    With ``once`` the worker returns as soon as no job is due. Returns the
+    number of jobs run.
+    """
+    stop = stop or threading.Event()
+    name = worker_name()
+    ran = 0
+    while not stop.is_set():
+        close_old_connections()
+        jobs = claim(name, limit=batch_size)
+        for job in jobs:
+            run(job)
+            ran += 1
+        if not jobs:
+            if once:
+                break
+            stop.wait(poll_interval)
+    close_old_connections()
+    return ran
+
+
+@task('regrade_quiz')
+def regrade_quiz_task(job, quiz_id, chunk_size=1000):
+    quiz = Quiz.objects.get(id=quiz_id)
+    regraded, rescored = regrade_quiz(quiz, chunk_size=chunk_size, progress=lambda done, total: job.report(done, total, 'Rescoring attempts'))
+    return {'responses_regraded': regraded, 'attempts_rescored': rescored}
+
+
+@task('expire_attempts')
+def expire_attempts_task(job, batch_size=500):
+    return {'expired': expire_attempts(batch_size=batch_size)}
+
+
+@task('rebuild_search_index')
+def rebuild_search_index_task(job):
+    search.rebuild()
+
+
+@task('item_analysis')
+def item_analysis_task(job, quiz_id):
+    # Warms the cached report so the analysis endpoint answers immediately
+    report = item_analysis(Quiz.objects.get(id=quiz_id))
+    return {'attempts': report['attempts']}
+
+
+@task('provision_users')
+def provision_users_task(job, rows):
+    # The rows hold passwords, so they are not kept once read; a retry would have nothing to run
+    Job.objects.filter(id=job.id).update(kwargs={})
+    results = provisioning.provision_users(rows)
+    created = sum(result['status'] == 'created' for result in results)
+    return {'created': created, 'failed': len(results) - created, 'results': results}
@@ -0,0 +1,204 @@
+"""
+Live results of a quiz, streamed to its creator with Server-Sent Events.
+
+Each process runs at most one publisher thread, and only while someone is
+watching. The publisher recomputes a watched quiz's results (see
+``results()``) once per change and hands the same dict to every subscriber
+of that quiz, so N creators watching cost one query loop, not N polling
+clients. It learns about changes in two ways:
+
+* Views in this process call ``notify()`` once their transaction commits,
+  which wakes the publisher straight away.
+* Every ``QUIZ_LIVE_POLL_INTERVAL`` seconds it reads the ``AttemptEvent``
+  rows added since its cursor, which covers attempts handled by other
+  processes and by commands such as ``expire_attempts``. Events are written
+  in batches (see ``events.py``), so these arrive up to
+  ``QUIZ_EVENT_FLUSH_INTERVAL`` seconds late.
+
+A subscriber only keeps the latest results, so a slow client skips
+intermediate updates instead of queueing them.
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Max, Q, Sum
+
+from .models import AttemptEvent, QuizAttempt, UserResponse
+
+logger = logging.getLogger(__name__)
+
+RECENT_COMPLETIONS = 10
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_subscriptions = defaultdict(set)
+_dirty = set()
+_cursor = None
+_running = False
+
+
+class Subscription:
+    """One client's stream of a quiz's results; create it on the event loop that reads it."""
+
+    def __init__(self, quiz_id):
+        self.quiz_id = quiz_id
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self._latest = None
+
+    def _set(self, data):
+        self._latest = data
+        self._ready.set()
+
+    def publish(self, data):
+        """Called from the publisher thread."""
+        try:
+            self._loop.call_soon_threadsafe(self._set, data)
+        except RuntimeError:
+            # The client's event loop has closed
+            pass
+
+    async def get(self):
+        """Wait for results newer than the last ones returned."""
+        await self._ready.wait()
+        self._ready.clear()
+        return self._latest
+
+
+def results(quiz_id):
+    """Return the live results of a quiz as a JSON-serialisable dict, in three queries."""
+    attempts = QuizAttempt.objects.filter(quiz_id=quiz_id)
+    done = Q(completed_at__isnull=False)
+    totals = attempts.aggregate(
+        started=Count('id'),
+        completed=Count('id', filter=done),
+        score=Sum('score', filter=done),
+        total_points=Sum('total_points', filter=done),
+    )
+    answers = UserResponse.objects.filter(attempt__quiz_id=quiz_id, attempt__completed_at__isnull=True).count()
+    recent = attempts.filter(done).select_related('user').order_by('-completed_at', '-id')[:RECENT_COMPLETIONS]
+    return {
+        'quiz': quiz_id,
+        'started': totals['started'],
+        'in_progress': totals['started'] - totals['completed'],
+        'completed': totals['completed'],
+        'answers': answers,
+        'average_percentage': round(totals['score'] / totals['total_points'] * 100, 2) if totals['total_points'] else 0,
+        'recent': [
+            {
+                'attempt': attempt.id,
+                'user': attempt.user.username,
+                'score': attempt.score,
+                'total_points': attempt.total_points,
+                'percentage': attempt.percentage_score,
+                'completed_at': attempt.completed_at.isoformat(),
+            }
+            for attempt in recent
+        ],
+    }
+
+
+def is_watched(quiz_id):
+    return bool(_subscriptions.get(quiz_id))
+
+
+def _mark(quiz_id):
+    with _lock:
+        _dirty.add(quiz_id)
+    _wake.set()
+
+
+def notify(quiz_id):
+    """Push fresh results of ``quiz_id`` to its watchers once the current transaction commits."""
+    if is_watched(quiz_id):
+        transaction.on_commit(lambda: _mark(quiz_id))
+
+
+def subscribe(quiz_id):
+    """Return a new ``Subscription`` to ``quiz_id``, starting the publisher if needed."""
+    global _running
+    subscription = Subscription(quiz_id)
+    with _lock:
+        _subscriptions[quiz_id].add(subscription)
+        start = not _running
+        _running = True
+    if start:
+        _start_publisher()
+    return subscription
+
+
+def unsubscribe(subscription):
+    with _lock:
+        watchers = _subscriptions.get(subscription.quiz_id)
+        if watchers is not None:
+            watchers.discard(subscription)
+            if not watchers:
+                del _subscriptions[subscription.quiz_id]
+    # Lets an idle publisher notice and stop
+    _wake.set()
+
+
+def _changed_quizzes(watched):
+    """Return the watched quizzes with events since the cursor, moving the cursor on."""
+    global _cursor
+    latest = AttemptEvent.objects.aggregate(latest=Max('id'))['latest'] or 0
+    if _cursor is None or latest <= _cursor:
+        _cursor = latest
+        return set()
+    attempt_ids = AttemptEvent.objects.filter(id__gt=_cursor, id__lte=latest).values('attempt_id')
+    _cursor = latest
+    return set(QuizAttempt.objects.filter(id__in=attempt_ids, quiz_id__in=watched).values_list('quiz_id', flat=True).distinct())
+
+
+def publish_changes():
+    """Publish fresh results of every watched quiz that changed; returns their ids."""
+    with _lock:
+        watched = {quiz_id: set(watchers) for quiz_id, watchers in _subscriptions.items()}
+        changed = _dirty & watched.keys()
+        _dirty.clear()
+    if not watched:
+        return set()
+    changed |= _changed_quizzes(list(watched))
+    for quiz_id in changed:
+        data = results(quiz_id)
+        for subscription in watched[quiz_id]:
+            subscription.publish(data)
+    return changed
+
+
+def _start_publisher():
+    threading.Thread(target=_run, name='quiz-live-results', daemon=True).start()
+
+
+def _run():
+    global _running, _cursor
+    try:
+        while True:
+            with _lock:
+                if not _subscriptions:
+                    # Stopped under the lock, so a new subscriber starts a fresh publisher
+                    _running = False
+                    _cursor = None
+                    return
+            # Cleared first, so a notify() during publishing wakes the next round
+            _wake.clear()
+            try:
+                publish_changes()
+            except Exception:
+                logger.exception('Publishing live quiz results failed')
+            _wake.wait(getattr(settings, 'QUIZ_LIVE_POLL_INTERVAL', 2))
+    finally:
+        connections.close_all()
+
+
+def reset():
+    global _cursor, _running
+    with _lock:
+        _subscriptions.clear()
+        _dirty.clear()
+        _cursor, _running = None, False
+    _wake.set()
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from quiz import archive
+from quiz.models import QuizAttempt
+
+
+class Command(BaseCommand):
+    help = 'Move old completed attempts and their responses into compressed archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Archive attempts completed more than this many days ago (default: QUIZ_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--quiz', type=int, default=None, help='Only archive attempts on this quiz')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Attempts archived per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the attempts that would be archived')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else getattr(settings, 'QUIZ_ARCHIVE_AFTER_DAYS', 365)
+        before = timezone.now() - timedelta(days=days)
+
+        if options['dry_run']:
+            attempts = QuizAttempt.objects.filter(completed_at__lt=before)
+            if options['quiz']:
+                attempts = attempts.filter(quiz_id=options['quiz'])
+            self.stdout.write(f'{attempts.count()} attempts completed before {before:%Y-%m-%d} would be archived')
+            return
+
+        archived = archive.archive_attempts(
+            before,
+            chunk_size=options['chunk_size'],
+            quiz=options['quiz'],
+            progress=lambda archived: self.stdout.write(f'{archived} attempts archived'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} attempts to {archive.root()}'))
@@ -0,0 +1,85 @@
+import gzip
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from quiz.models import Answer, Question, Quiz, QuizAttempt, UserResponse
+from quiz.renderers import MessagePackRenderer, msgpack
+from quiz.serializers import QuizAttemptSerializer, QuizDetailSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare JSON and MessagePack payload sizes and encode/decode times on a large quiz and attempt history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=200)
+        parser.add_argument('--answers', type=int, default=4, help='Answers per question')
+        parser.add_argument('--attempts', type=int, default=50, help='Completed attempts in the history')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if msgpack is None:
+            raise CommandError('msgpack is not installed (pip install msgpack)')
+
+        # The sample data only lives inside this transaction
+        with transaction.atomic():
+            payloads = self.build_payloads(options)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'payload':<18}{'format':<10}{'bytes':>10}{'gzip':>10}{'encode ms':>12}{'decode ms':>12}")
+        for name, data in payloads:
+            for fmt, encode, decode in self.formats():
+                encoded = encode(data)
+                encode_ms = self.time(lambda: encode(data), options['repeat'])
+                decode_ms = self.time(lambda: decode(encoded), options['repeat'])
+                self.stdout.write(f'{name:<18}{fmt:<10}{len(encoded):>10}{len(gzip.compress(encoded)):>10}{encode_ms:>12.2f}{decode_ms:>12.2f}')
+
+    def formats(self):
+        json_renderer, msgpack_renderer = JSONRenderer(), MessagePackRenderer()
+        return [
+            ('json', json_renderer.render, json.loads),
+            ('msgpack', msgpack_renderer.render, lambda data: msgpack.unpackb(data, raw=False)),
+        ]
+
+    def time(self, func, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) * 1000 / repeat
+
+    def build_payloads(self, options):
+        creator = User.objects.create_user(username='benchmark-creator')
+        student = User.objects.create_user(username='benchmark-student')
+        quiz = Quiz.objects.create(title='Benchmark quiz', description='Generated by benchmark_formats ' * 5, creator=creator)
+
+        questions = Question.objects.bulk_create(
+            Question(quiz=quiz, question_text=f'Benchmark question {order} ' * 4, points=order % 5 + 1, order=order)
+            for order in range(1, options['questions'] + 1)
+        )
+        answers = Answer.objects.bulk_create(
+            Answer(question=question, answer_text=f'Option {order} for question {question.order}', is_correct=order == 1, order=order)
+            for question in questions
+            for order in range(1, options['answers'] + 1)
+        )
+        first_answers = answers[::options['answers']]
+
+        attempts = QuizAttempt.objects.bulk_create(
+            QuizAttempt(user=student, quiz=quiz, completed_at=timezone.now(), score=0, total_points=0)
+            for _ in range(options['attempts'])
+        )
+        UserResponse.objects.bulk_create(
+            UserResponse(attempt=attempt, question=question, selected_answer=answer, is_correct=True)
+            for attempt in attempts
+            for question, answer in zip(questions, first_answers)
+        )
+
+        history = QuizAttempt.objects.filter(user=student).select_related('user', 'quiz__creator')
+        return [
+            ('quiz detail', QuizDetailSerializer(quiz).data),
+            ('attempt history', QuizAttemptSerializer(history, many=True).data),
+        ]
@@ -0,0 +1,106 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter per profile, so nothing is imported or set up beforehand
+PROBE = '''
+import io, json, sys, time
+started = time.perf_counter()
+import django
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+django.setup()
+handler = WSGIHandler()
+setup = time.perf_counter()
+
+path, requests = sys.argv[1], int(sys.argv[2])
+environ = {
+    'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': path, 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+    'HTTP_HOST': 'localhost', 'HTTP_ACCEPT': 'application/json',
+    'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+}
+statuses = []
+
+def request():
+    response = handler({**environ, 'wsgi.input': io.BytesIO()}, lambda status, headers: statuses.append(status))
+    b''.join(response)
+    response.close()
+
+request()
+first = time.perf_counter()
+for _ in range(requests):
+    request()
+done = time.perf_counter()
+print(json.dumps({
+    'apps': len(settings.INSTALLED_APPS),
+    'middleware': len(settings.MIDDLEWARE),
+    'status': statuses[0],
+    'setup_ms': (setup - started) * 1000,
+    'startup_ms': (first - started) * 1000,
+    'request_us': (done - first) * 1e6 / requests if requests else 0,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare settings profiles: each one is started in a fresh process, which times Django setup, its first '
+        'response (cold start) and the mean time of further requests through its middleware.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('profiles', nargs='*', default=['QuizRaveAPI.settings', 'QuizRaveAPI.settings_api'], help='Settings modules, the first one being the baseline')
+        parser.add_argument('--path', default='/', help='Path requested (default: the plain-text home page, so the timing is mostly middleware)')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests timed per process after the first')
+        parser.add_argument('--runs', type=int, default=5, help='Processes per profile; the median is reported')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1 or options['requests'] < 1:
+            raise CommandError('--runs and --requests must be at least 1')
+        results = {profile: self.measure(profile, options) for profile in options['profiles']}
+
+        self.stdout.write(f"{'profile':<30}{'apps':>6}{'middleware':>12}{'setup ms':>10}{'startup ms':>12}{'us/request':>12}")
+        for profile, result in results.items():
+            self.stdout.write(
+                f"{profile:<30}{result['apps']:>6}{result['middleware']:>12}{result['setup_ms']:>10.1f}"
+                f"{result['startup_ms']:>12.1f}{result['request_us']:>12.1f}"
+            )
+        baseline = results[options['profiles'][0]]
+        for profile, result in list(results.items())[1:]:
+            self.stdout.write(self.style.SUCCESS(
+                f"{profile}: startup {self.change(baseline['startup_ms'], result['startup_ms'])}, "
+                f"per request {self.change(baseline['request_us'], result['request_us'])} against {options['profiles'][0]}"
+            ))
+
+    def measure(self, profile, options):
+        """Return the median measurements of ``options['runs']`` fresh processes running ``profile``."""
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': profile,
+            # The same import path as this process, wherever the project lives
+            'PYTHONPATH': os.pathsep.join(entry for entry in sys.path if entry),
+        }
+        runs = []
+        for _ in range(options['runs']):
+            process = subprocess.run(
+                [sys.executable, '-c', PROBE, options['path'], str(options['requests'])],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if process.returncode:
+                raise CommandError(f'{profile} failed:\n{process.stderr.strip()}')
+            runs.append(json.loads(process.stdout.splitlines()[-1]))
+        if runs[0]['status'][0] not in '23':
+            self.stderr.write(f"{profile} answered {options['path']} with {runs[0]['status']}")
+        return {
+            key: statistics.median(run[key] for run in runs) if isinstance(runs[0][key], float) else runs[0][key]
+            for key in runs[0]
+        }
+
+    def change(self, before, after):
+        return f'{(after - before) / before:+.0%}' if before else 'n/a'
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz import scoring
+
+
+class Command(BaseCommand):
+    help = 'Score and complete every in-progress attempt whose deadline has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping instead of exiting after one pass')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds between sweeps with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            expired = scoring.expire_attempts(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Expired {expired} attempts'))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from quiz import answer_buffer
+from quiz.models import QuizAttempt
+
+
+class Command(BaseCommand):
+    help = 'Checkpoint buffered answers of in-progress attempts to UserResponse (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not answer_buffer.is_enabled():
+            self.stdout.write('QUIZ_BUFFER_ANSWERS is disabled, nothing to flush')
+            return
+
+        attempts = QuizAttempt.objects.filter(completed_at__isnull=True).only('id', 'quiz_id', 'version')
+        flushed = 0
+        for attempt in attempts.iterator(chunk_size=options['batch_size']):
+            flushed += answer_buffer.flush(attempt)
+
+        self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} buffered answers'))
@@ -0,0 +1,282 @@
+import http.client
+import importlib.util
+import json
+import random
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.signals import got_request_exception
+from django.db import DatabaseError
+from django.urls import reverse
+
+from quiz import events, throttling, versions
+from quiz.models import Answer, AttemptEvent, Question, Quiz, QuizAttempt
+from quiz.provisioning import provision_users
+
+PASSWORD = 'loadtest-password'
+
+# Stages of a journey, keyed by the url_name of their endpoint
+STAGES = {
+    'register': 'register',
+    'login': 'login',
+    'start-quiz': 'start',
+    'submit-answer': 'answer',
+    'complete-quiz': 'complete',
+}
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LoadTestServer(ThreadedWSGIServer):
+    # Room for every client connecting at once instead of the default of 10
+    request_queue_size = 1024
+
+
+def serve_wsgi(port):
+    """Serve the project on ``port`` in a background thread; returns ``(port, stop)``."""
+    from django.core.wsgi import get_wsgi_application
+
+    server = LoadTestServer(('127.0.0.1', port), QuietHandler)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, name='loadtest-wsgi', daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        server.server_close()
+    return server.server_port, stop
+
+
+def serve_asgi(port):
+    """Serve the project with uvicorn on ``port`` in a background thread; returns ``(port, stop)``."""
+    if importlib.util.find_spec('uvicorn') is None:
+        raise CommandError('uvicorn is not installed (pip install uvicorn)')
+    import uvicorn
+    from django.core.asgi import get_asgi_application
+
+    server = uvicorn.Server(uvicorn.Config(
+        get_asgi_application(), host='127.0.0.1', port=port, log_level='warning', lifespan='off', backlog=1024,
+    ))
+    thread = threading.Thread(target=server.run, name='loadtest-asgi', daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise CommandError('The ASGI server failed to start')
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+    return server.servers[0].sockets[0].getsockname()[1], stop
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Recorder:
+    """Latencies, errors and lock errors per stage, shared by the client threads and the server."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {stage: [] for stage in STAGES.values()}
+        self.errors = {stage: 0 for stage in STAGES.values()}
+        self.locked = {stage: 0 for stage in STAGES.values()}
+        self.failures = {}
+
+    def request(self, stage, seconds, failure=None):
+        with self._lock:
+            self.latencies[stage].append(seconds)
+            if failure:
+                self.errors[stage] += 1
+                self.failures[(stage, failure)] = self.failures.get((stage, failure), 0) + 1
+
+    def server_exception(self, sender, request=None, **kwargs):
+        # Called while the server handles the exception, so it is still current
+        error = sys.exc_info()[1]
+        match = getattr(request, 'resolver_match', None)
+        stage = STAGES.get(match.url_name) if match else None
+        if stage and isinstance(error, DatabaseError) and 'lock' in str(error).lower():
+            with self._lock:
+                self.locked[stage] += 1
+
+    def report(self, duration):
+        rows = []
+        for stage, latencies in self.latencies.items():
+            if not latencies:
+                continue
+            ordered = sorted(latencies)
+            rows.append({
+                'stage': stage,
+                'requests': len(ordered),
+                'errors': self.errors[stage],
+                'lock_errors': self.locked[stage],
+                'throughput': len(ordered) / duration if duration else 0,
+                'p50_ms': percentile(ordered, 0.5) * 1000,
+                'p90_ms': percentile(ordered, 0.9) * 1000,
+                'p99_ms': percentile(ordered, 0.99) * 1000,
+                'max_ms': ordered[-1] * 1000,
+            })
+        return rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve the project on a local port and drive concurrent exam journeys against it: register or log in, '
+        'start an attempt, answer every question with think time, complete. Reports throughput, latency percentiles '
+        'and error and lock-contention rates per stage.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Journeys to run, one generated student each')
+        parser.add_argument('--concurrency', type=int, default=None, help='Journeys in flight at once (default: all of them)')
+        parser.add_argument('--questions', type=int, default=10, help='Questions in the generated quiz')
+        parser.add_argument('--think-time', type=float, default=1.0, help='Mean seconds before each answer and the completion, exponentially distributed')
+        parser.add_argument('--ramp-up', type=float, default=0.0, help='Seconds over which journey starts are spread')
+        parser.add_argument('--login', action='store_true', help='Create the students beforehand and log in instead of registering')
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi', help='asgi needs uvicorn')
+        parser.add_argument('--port', type=int, default=0, help='Port to serve on (default: any free port)')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds before a request is abandoned')
+        parser.add_argument('--keep-data', action='store_true', help='Keep the generated quiz, students and attempts')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['questions'] < 1:
+            raise CommandError('--users and --questions must be at least 1')
+        self.options = options
+        self.prefix = f'loadtest-{secrets.token_hex(3)}'
+        self.recorder = Recorder()
+
+        self.quiz = self.create_quiz(options['questions'])
+        try:
+            if options['login']:
+                provision_users([{'username': f'{self.prefix}-{index}', 'password': PASSWORD} for index in range(options['users'])])
+            serve = serve_asgi if options['server'] == 'asgi' else serve_wsgi
+            port, stop = serve(options['port'])
+            got_request_exception.connect(self.recorder.server_exception)
+            try:
+                self.port = port
+                started = time.perf_counter()
+                # Every journey comes from this address; the per-user limits still apply
+                with throttling.exempt('127.0.0.1'), ThreadPoolExecutor(max_workers=options['concurrency'] or options['users']) as pool:
+                    completed = sum(pool.map(self.journey, range(options['users'])))
+                duration = time.perf_counter() - started
+            finally:
+                got_request_exception.disconnect(self.recorder.server_exception)
+                stop()
+        finally:
+            if not options['keep_data']:
+                self.delete_data()
+
+        self.write_report(self.recorder.report(duration), completed, duration)
+
+    def create_quiz(self, question_count):
+        creator = User.objects.create_user(username=f'{self.prefix}-creator')
+        quiz = Quiz.objects.create(
+            title=f'Load test {self.prefix}', description='Generated by loadtest', creator=creator, max_attempts=1,
+        )
+        questions = Question.objects.bulk_create(
+            Question(quiz=quiz, question_text=f'Load test question {order}', points=1, order=order)
+            for order in range(1, question_count + 1)
+        )
+        Answer.objects.bulk_create(
+            Answer(question=question, answer_text=f'Option {order}', is_correct=order == 1, order=order)
+            for question in questions
+            for order in range(1, 5)
+        )
+        # Published up front, as a real exam would be, so starts don't all race to publish it
+        quiz.refresh_from_db()
+        versions.publish(quiz)
+        return quiz
+
+    def delete_data(self):
+        # Events written by the server threads that have not been flushed yet
+        events.flush()
+        attempt_ids = list(QuizAttempt.objects.filter(quiz=self.quiz).values_list('id', flat=True))
+        AttemptEvent.objects.filter(attempt_id__in=attempt_ids).delete()
+        User.objects.filter(username__startswith=f'{self.prefix}-').delete()
+
+    def call(self, stage, path, body=None, token=None):
+        """POST ``body`` to ``path`` and return the decoded response, or ``None`` when the request failed."""
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        # A connection per request, so connection setup is part of the latency as for a browser
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=self.options['timeout'])
+        started = time.perf_counter()
+        try:
+            connection.request('POST', path, body=json.dumps(body or {}), headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException) as error:
+            self.recorder.request(stage, time.perf_counter() - started, type(error).__name__)
+            return None
+        finally:
+            connection.close()
+        self.recorder.request(stage, time.perf_counter() - started, None if response.status < 400 else f'HTTP {response.status}')
+        return json.loads(content) if response.status < 400 else None
+
+    def think(self, rng):
+        if self.options['think_time'] > 0:
+            time.sleep(rng.expovariate(1 / self.options['think_time']))
+
+    def journey(self, index):
+        """Run one student's exam; returns whether it was completed."""
+        rng = random.Random()
+        if self.options['ramp_up']:
+            time.sleep(self.options['ramp_up'] * index / self.options['users'])
+
+        username = f'{self.prefix}-{index}'
+        if self.options['login']:
+            data = self.call('login', reverse('login'), {'username': username, 'password': PASSWORD})
+        else:
+            data = self.call('register', reverse('register'), {'username': username, 'email': f'{username}@example.com', 'password': PASSWORD})
+        if data is None:
+            return False
+        token = data['token']
+
+        data = self.call('start', reverse('start-quiz', args=[self.quiz.id]), token=token)
+        if data is None:
+            return False
+        submit_url = reverse('submit-answer', args=[data['attempt_id']])
+        for question in data['quiz']['questions']:
+            self.think(rng)
+            self.call('answer', submit_url, {'question_id': question['id'], 'answer_id': rng.choice(question['answers'])['id']}, token=token)
+
+        self.think(rng)
+        return self.call('complete', reverse('complete-quiz', args=[data['attempt_id']]), token=token) is not None
+
+    def write_report(self, rows, completed, duration):
+        if self.options['json']:
+            failures = [{'stage': stage, 'failure': failure, 'count': count} for (stage, failure), count in self.recorder.failures.items()]
+            self.stdout.write(json.dumps({
+                'server': self.options['server'], 'journeys': self.options['users'], 'completed': completed,
+                'duration': duration, 'stages': rows, 'failures': failures,
+            }, indent=2))
+            return
+
+        self.stdout.write(f"{'stage':<10}{'requests':>10}{'errors':>9}{'locks':>9}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['stage']:<10}{row['requests']:>10}"
+                f"{row['errors'] / row['requests']:>9.1%}{row['lock_errors'] / row['requests']:>9.1%}{row['throughput']:>10.1f}"
+                f"{row['p50_ms']:>10.1f}{row['p90_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}"
+            )
+        for (stage, failure), count in sorted(self.recorder.failures.items(), key=lambda item: -item[1]):
+            self.stderr.write(f'{stage}: {failure} x{count}')
+        style = self.style.SUCCESS if completed == self.options['users'] else self.style.WARNING
+        self.stdout.write(style(
+            f"{completed} of {self.options['users']} journeys completed in {duration:.1f}s "
+            f"({completed / duration:.1f}/s) on {self.options['server'].upper()}"
+        ))
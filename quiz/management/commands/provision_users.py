@@ -0,0 +1,44 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.provisioning import FIELDS, provision_users
+
+
+class Command(BaseCommand):
+    help = 'Create users and API tokens from a CSV file with a username,email,password,first_name,last_name header'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='CSV file to read, or - for stdin')
+        parser.add_argument('--workers', type=int, default=None, help='Processes hashing passwords (default: all cores)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT')
+        parser.add_argument('--output', help='Write per-row results, including tokens and generated passwords, to this CSV file')
+
+    def handle(self, *args, **options):
+        try:
+            source = sys.stdin if options['csv_file'] == '-' else open(options['csv_file'], newline='', encoding='utf-8-sig')
+        except OSError as error:
+            raise CommandError(error)
+        with source:
+            reader = csv.DictReader(source)
+            if 'username' not in (reader.fieldnames or []):
+                raise CommandError('The CSV file needs a username column')
+            rows = [{field: row.get(field) or '' for field in FIELDS} for row in reader]
+
+        results = provision_users(rows, workers=options['workers'], batch_size=options['batch_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                writer = csv.writer(output)
+                writer.writerow(['row', 'username', 'status', 'id', 'token', 'password', 'errors'])
+                for result in results:
+                    errors = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in result.get('errors', {}).items())
+                    writer.writerow([result['row'], result['username'], result['status'], result.get('id', ''), result.get('token', ''), result.get('password', ''), errors])
+
+        created = sum(result['status'] == 'created' for result in results)
+        for result in results:
+            if result['status'] == 'error':
+                # Row numbers count the header, as in a spreadsheet
+                self.stderr.write(f"Row {result['row'] + 2} ({result['username']}): {result['errors']}")
+        self.stdout.write(self.style.SUCCESS(f'Created {created} users, {len(results) - created} rows failed'))
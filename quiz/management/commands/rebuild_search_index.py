@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from quiz import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of quizzes and their questions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write('Full-text search is not supported on this database, nothing to rebuild')
+            return
+        search.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz import scoring
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    help = 'Re-mark responses against the current answer key and rescore completed attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int)
+        parser.add_argument('--all', action='store_true', help='Regrade every quiz')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Attempts rescored per transaction')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            quizzes = Quiz.objects.all()
+        elif options['quiz_ids']:
+            quizzes = Quiz.objects.filter(id__in=options['quiz_ids'])
+        else:
+            raise CommandError('Pass one or more quiz ids, or --all')
+
+        for quiz in quizzes.iterator():
+            regraded, rescored = scoring.regrade_quiz(quiz, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'{quiz}: {regraded} responses regraded, {rescored} attempts rescored'))
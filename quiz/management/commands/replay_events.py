@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from quiz import events
+from quiz.models import AttemptEvent
+
+
+class Command(BaseCommand):
+    help = 'Replay the attempt event log into per-quiz aggregates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help='Only report these quizzes')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Events read per query')
+        parser.add_argument('--json', action='store_true', help='Print the aggregates as JSON')
+
+    def handle(self, *args, **options):
+        # Each process buffers its events and flushes them later, so ids don't follow the order events happened in
+        log = AttemptEvent.objects.order_by('created_at', 'id').only('attempt_id', 'kind', 'payload', 'created_at')
+        aggregates = events.replay(log.iterator(chunk_size=options['chunk_size']))
+        if options['quiz_ids']:
+            aggregates = {quiz_id: stats for quiz_id, stats in aggregates.items() if quiz_id in options['quiz_ids']}
+
+        if options['json']:
+            self.stdout.write(json.dumps(aggregates, indent=2))
+            return
+
+        self.stdout.write(f"{'quiz':>8}{'started':>10}{'completed':>11}{'answers':>10}{'changed':>10}{'mean secs':>12}")
+        for quiz_id, stats in sorted(aggregates.items()):
+            duration = '-' if stats['mean_duration_seconds'] is None else f"{stats['mean_duration_seconds']:.1f}"
+            self.stdout.write(f"{quiz_id:>8}{stats['started']:>10}{stats['completed']:>11}{stats['answers']:>10}{stats['changed_answers']:>10}{duration:>12}")
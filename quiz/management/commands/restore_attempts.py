@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz import archive
+from quiz.models import ArchivedAttempt
+
+
+class Command(BaseCommand):
+    help = 'Move archived attempts back into the attempt and response tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('attempt_ids', nargs='*', type=int)
+        parser.add_argument('--quiz', type=int, default=None, help='Restore the archived attempts on this quiz')
+        parser.add_argument('--user', type=int, default=None, help='Restore the archived attempts of this user id')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Attempts restored per transaction')
+
+    def handle(self, *args, **options):
+        summaries = ArchivedAttempt.objects.order_by('pk')
+        if options['attempt_ids']:
+            summaries = summaries.filter(pk__in=options['attempt_ids'])
+        if options['quiz']:
+            summaries = summaries.filter(quiz_id=options['quiz'])
+        if options['user']:
+            summaries = summaries.filter(user_id=options['user'])
+        if not (options['attempt_ids'] or options['quiz'] or options['user']):
+            raise CommandError('Pass attempt ids, --quiz or --user')
+
+        restored = 0
+        while True:
+            # Restored summaries are deleted, so each pass takes the next chunk
+            chunk = list(summaries[:options['chunk_size']])
+            if not chunk:
+                break
+            count = archive.restore(chunk)
+            if not count:
+                raise CommandError(f'Attempts {[summary.id for summary in chunk]} are missing from their archive files')
+            restored += count
+        self.stdout.write(self.style.SUCCESS(f'Restored {restored} attempts'))
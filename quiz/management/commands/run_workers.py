@@ -0,0 +1,78 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+
+def _run_threads(threads, stop, options):
+    # Imported here so that spawned worker processes can set Django up first
+    from quiz import jobs
+
+    counts = []
+
+    def target():
+        counts.append(jobs.work(stop, poll_interval=options['poll_interval'], once=options['once'], batch_size=options['batch_size']))
+
+    pool = [threading.Thread(target=target, name=f'quiz-worker-{n}', daemon=True) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(counts)
+
+
+def _stop_on_signals(stop):
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop.set())
+
+
+def _process_main(threads, options):
+    import django
+    django.setup()
+
+    stop = threading.Event()
+    _stop_on_signals(stop)
+    _run_threads(threads, stop, options)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the job table with a pool of worker threads and processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Worker threads per process')
+        parser.add_argument('--processes', type=int, default=0, help='Worker processes; 0 runs the threads in this process')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when no job is due')
+        parser.add_argument('--batch-size', type=int, default=1, help='Jobs each worker claims at a time')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of polling')
+
+    def handle(self, *args, **options):
+        threads = max(options['threads'], 1)
+        worker_options = {key: options[key] for key in ('poll_interval', 'batch_size', 'once')}
+        stop = threading.Event()
+        _stop_on_signals(stop)
+
+        if not options['processes']:
+            ran = _run_threads(threads, stop, worker_options)
+            self.stdout.write(self.style.SUCCESS(f'Ran {ran} jobs'))
+            return
+
+        from django.db import connections
+        # Children must open their own database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_process_main, args=(threads, worker_options), name=f'quiz-workers-{n}')
+            for n in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f'Started {len(processes)} worker processes with {threads} threads each')
+
+        while any(process.is_alive() for process in processes):
+            if stop.wait(1):
+                for process in processes:
+                    process.terminate()  # SIGTERM: children finish their current job, then exit
+                break
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
@@ -0,0 +1,154 @@
+"""
+Size-aware response compression.
+
+``CompressionMiddleware`` compresses responses above ``QUIZ_COMPRESSION_MIN_SIZE``
+bytes with the best encoding the client accepts: brotli or zstd when the
+``brotli`` / ``zstandard`` packages are installed, otherwise gzip. Responses that
+carry an ETag (such as the take-quiz paper) are compressed once per ETag and
+encoding, and later requests are served from ``QUIZ_COMPRESSION_CACHE``.
+
+Compression ratio and CPU time are collected per encoding and exposed through
+``compression_stats()``, and each compressed response gets a ``Server-Timing``
+entry.
+"""
+import gzip
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/msgpack', 'application/javascript', 'application/xml')
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _encoders():
+    # In order of preference when the client accepts several equally
+    encoders = {}
+    if brotli is not None:
+        encoders['br'] = lambda data: brotli.compress(data, quality=5)
+    if zstandard is not None:
+        encoders['zstd'] = lambda data: zstandard.ZstdCompressor(level=3).compress(data)
+    encoders['gzip'] = lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+    return encoders
+
+
+ENCODERS = _encoders()
+
+
+def parse_accept_encoding(header):
+    """Return ``{coding: q}`` for an ``Accept-Encoding`` header."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in ENCODERS:
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _record(encoding, size, compressed_size, cpu_seconds, cache_hit):
+    with _stats_lock:
+        stats = _stats.setdefault(encoding, {'responses': 0, 'cache_hits': 0, 'bytes_in': 0, 'bytes_out': 0, 'cpu_seconds': 0.0})
+        stats['responses'] += 1
+        stats['cache_hits'] += cache_hit
+        stats['bytes_in'] += size
+        stats['bytes_out'] += compressed_size
+        stats['cpu_seconds'] += cpu_seconds
+
+
+def compression_stats():
+    """Return per-encoding counters with the overall compression ratio."""
+    with _stats_lock:
+        stats = {encoding: dict(values) for encoding, values in _stats.items()}
+    for values in stats.values():
+        values['ratio'] = round(values['bytes_in'] / values['bytes_out'], 2) if values['bytes_out'] else None
+    return stats
+
+
+class CompressionMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < getattr(settings, 'QUIZ_COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        etag = response.get('ETag')
+        cache = caches[getattr(settings, 'QUIZ_COMPRESSION_CACHE', 'default')]
+        key = None
+        if etag:
+            # ETags are only unique per resource, so two URLs may send the same one; with the host,
+            # as bodies may hold absolute links
+            resource = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+            key = f"quiz:compressed:{encoding}:{response['Content-Type']}:{resource}:{etag}"
+
+        start = time.thread_time()
+        compressed = cache.get(key) if key else None
+        cache_hit = compressed is not None
+        if compressed is None:
+            compressed = ENCODERS[encoding](response.content)
+            if key:
+                cache.set(key, compressed, getattr(settings, 'QUIZ_COMPRESSION_CACHE_TIMEOUT', 24 * 60 * 60))
+        cpu_seconds = time.thread_time() - start
+
+        if len(compressed) >= len(response.content):
+            return response
+
+        _record(encoding, len(response.content), len(compressed), cpu_seconds, cache_hit)
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        description = f'{encoding} cached' if cache_hit else encoding
+        response['Server-Timing'] = f'compress;dur={cpu_seconds * 1000:.3f};desc="{description}"'
+        if etag and not etag.startswith('W/'):
+            # The compressed body is a different representation than the one the strong ETag names
+            response['ETag'] = 'W/' + etag
+        return response
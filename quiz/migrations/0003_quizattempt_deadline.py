@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:13
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_open_attempt_deadlines(apps, schema_editor):
+    QuizAttempt = apps.get_model('quiz', 'QuizAttempt')
+    default_minutes = getattr(settings, 'QUIZ_ATTEMPT_MAX_DURATION', None)
+    attempts = QuizAttempt.objects.filter(completed_at__isnull=True).select_related('quiz')
+    for attempt in attempts.iterator():
+        minutes = attempt.quiz.time_limit or default_minutes
+        if minutes:
+            attempt.deadline = attempt.started_at + timedelta(minutes=minutes)
+            attempt.save(update_fields=['deadline'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0002_userresponse_answered_at_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='deadline',
+            field=models.DateTimeField(blank=True, help_text='Answers are rejected after this time', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('completed_at__isnull', True)), fields=['deadline'], name='quiz_attempt_open_deadline'),
+        ),
+        migrations.RunPython(set_open_attempt_deadlines, migrations.RunPython.noop),
+    ]
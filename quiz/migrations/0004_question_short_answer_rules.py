@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:15
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0003_quizattempt_deadline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='case_sensitive',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='ignore_punctuation',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='max_edit_distance',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Accept answers within this many typos', validators=[django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='numeric_tolerance',
+            field=models.FloatField(blank=True, help_text='Accept numbers within this distance of a numeric accepted answer', null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
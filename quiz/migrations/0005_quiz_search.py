@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute('CREATE VIRTUAL TABLE quiz_search USING fts5(title, description, questions)')
+        schema_editor.execute(
+            'INSERT INTO quiz_search (rowid, title, description, questions) '
+            'SELECT q.id, q.title, q.description, '
+            "COALESCE((SELECT group_concat(question_text, ' ') FROM quiz_question WHERE quiz_id = q.id), '') "
+            'FROM quiz_quiz q'
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE quiz_search ('
+            'quiz_id bigint PRIMARY KEY REFERENCES quiz_quiz (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute('CREATE INDEX quiz_search_document ON quiz_search USING gin (document)')
+        schema_editor.execute(
+            'INSERT INTO quiz_search (quiz_id, document) '
+            "SELECT q.id, setweight(to_tsvector('english', q.title), 'A') "
+            "|| setweight(to_tsvector('english', q.description), 'B') "
+            "|| setweight(to_tsvector('english', COALESCE((SELECT string_agg(question_text, ' ') FROM quiz_question WHERE quiz_id = q.id), '')), 'C') "
+            'FROM quiz_quiz q'
+        )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS quiz_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0004_question_short_answer_rules'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:19
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0005_quiz_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='question_pool_size',
+            field=models.PositiveIntegerField(blank=True, help_text='Number of questions drawn at random for each attempt (blank for all)', null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='question_ids',
+            field=models.BinaryField(blank=True, help_text="Questions drawn from the quiz's pool, encoded by pools.encode_ids", null=True),
+        ),
+    ]
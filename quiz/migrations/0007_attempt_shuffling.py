@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_question_pools'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='shuffle_answers',
+            field=models.BooleanField(default=False, help_text='Show answers in a different order for each attempt'),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='shuffle_questions',
+            field=models.BooleanField(default=False, help_text='Show questions in a different order for each attempt'),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='shuffle_seed',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text="Seed for this attempt's question and answer order", null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Now
+
+
+def complete_duplicate_open_attempts(apps, schema_editor):
+    # Keep each user's newest open attempt per quiz and score the older ones as they stand
+    QuizAttempt = apps.get_model('quiz', 'QuizAttempt')
+    Question = apps.get_model('quiz', 'Question')
+    UserResponse = apps.get_model('quiz', 'UserResponse')
+
+    duplicates = (
+        QuizAttempt.objects.filter(completed_at__isnull=True)
+        .values('user_id', 'quiz_id')
+        .annotate(count=models.Count('id'), newest=models.Max('id'))
+        .filter(count__gt=1)
+    )
+    for group in duplicates.iterator():
+        older = QuizAttempt.objects.filter(user_id=group['user_id'], quiz_id=group['quiz_id'], completed_at__isnull=True, id__lt=group['newest'])
+        total_points = Question.objects.filter(quiz_id=group['quiz_id']).aggregate(total=models.Sum('points'))['total'] or 0
+        for attempt in older:
+            score = UserResponse.objects.filter(attempt=attempt, is_correct=True).aggregate(total=models.Sum('question__points'))['total'] or 0
+            QuizAttempt.objects.filter(pk=attempt.pk).update(completed_at=Now(), score=score, total_points=total_points)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0009_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(complete_duplicate_open_attempts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='quizattempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('completed_at__isnull', True)), fields=('user', 'quiz'), name='quiz_attempt_one_open'),
+        ),
+    ]
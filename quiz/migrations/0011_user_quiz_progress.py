@@ -0,0 +1,73 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Cast
+
+
+def backfill_progress(apps, schema_editor):
+    QuizAttempt = apps.get_model('quiz', 'QuizAttempt')
+    UserQuizProgress = apps.get_model('quiz', 'UserQuizProgress')
+
+    completed = models.Q(completed_at__isnull=False)
+    percentage = models.Case(
+        models.When(total_points__gt=0, then=Cast('score', models.FloatField()) * 100 / models.F('total_points')),
+        output_field=models.FloatField(),
+    )
+    stats = (
+        QuizAttempt.objects.order_by()
+        .values('user_id', 'quiz_id')
+        .annotate(
+            completed_count=models.Count('id', filter=completed),
+            top_score=models.Max('score', filter=completed),
+            top_percentage=models.Max(percentage, filter=completed),
+            last_completed=models.Max('completed_at'),
+            open_attempt=models.Max('id', filter=models.Q(completed_at__isnull=True)),
+        )
+    )
+    UserQuizProgress.objects.bulk_create(
+        (
+            UserQuizProgress(
+                user_id=row['user_id'],
+                quiz_id=row['quiz_id'],
+                attempts_completed=row['completed_count'],
+                best_score=row['top_score'],
+                best_percentage=round(row['top_percentage'], 2) if row['top_percentage'] is not None else None,
+                last_completed_at=row['last_completed'],
+                in_progress_id=row['open_attempt'],
+            )
+            for row in stats.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0010_one_open_attempt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserQuizProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts_completed', models.PositiveIntegerField(default=0)),
+                ('best_score', models.PositiveIntegerField(blank=True, null=True)),
+                ('best_percentage', models.FloatField(blank=True, null=True)),
+                ('last_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('in_progress', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='quiz.quizattempt')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='quiz.quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-updated_at'], name='quiz_progress_recent')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'quiz'), name='quiz_progress_user_quiz')],
+            },
+        ),
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_user_quiz_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('content_version', models.BigIntegerField()),
+                ('digest', models.CharField(max_length=64)),
+                ('content', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='quiz.quiz')),
+            ],
+            options={
+                'ordering': ['quiz', 'number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='published_version',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='quiz.quizversion'),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='version',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='attempts', to='quiz.quizversion'),
+        ),
+        migrations.AddConstraint(
+            model_name='quizversion',
+            constraint=models.UniqueConstraint(fields=('quiz', 'number'), name='quiz_version_number'),
+        ),
+    ]
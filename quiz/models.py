@@ -1,6 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from .grading import grade_short_answer
+
+class QuizQuerySet(models.QuerySet):
+    def with_totals(self):
+        # Read by total_questions and total_points instead of querying per quiz
+        queryset = self.annotate(question_count=models.Count('questions'), point_total=models.Sum('questions__points'))
+        # Meta.ordering is not applied to GROUP BY queries
+        return queryset if queryset.query.order_by else queryset.order_by(*self.model._meta.ordering)
+
 
 class Quiz(models.Model):
     #When a complete quiz is created by a user
@@ -12,6 +26,12 @@ class Quiz(models.Model):
     is_active = models.BooleanField(default=True)
     time_limit = models.PositiveIntegerField(null=True, blank=True, help_text="Time limit in minutes")
     max_attempts = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
+    question_pool_size = models.PositiveIntegerField(null=True, blank=True, validators=[MinValueValidator(1)], help_text="Number of questions drawn at random for each attempt (blank for all)")
+    shuffle_questions = models.BooleanField(default=False, help_text="Show questions in a different order for each attempt")
+    shuffle_answers = models.BooleanField(default=False, help_text="Show answers in a different order for each attempt")
+    published_version = models.ForeignKey('QuizVersion', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+')
+
+    objects = QuizQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
@@ -19,13 +39,22 @@ class Quiz(models.Model):
 
     def __str__(self):
         return self.title
+
+    @property
+    def content_version(self):
+        # updated_at is also touched whenever a question or answer changes (see signals.py)
+        return int(self.updated_at.timestamp() * 1_000_000)
     
     @property
     def total_questions(self):
+        if hasattr(self, 'question_count'):
+            return self.question_count
         return self.questions.count()
     
     @property
     def total_points(self):
+        if hasattr(self, 'point_total'):
+            return self.point_total or 0
         return self.questions.aggregate( total=models.Sum('points'))['total'] or 0
 
 
@@ -43,6 +72,11 @@ class Question(models.Model):
     question_type = models.CharField(max_length=2, choices=QUESTION_TYPES, default='MC')
     points = models.PositiveIntegerField(default=1)
     order = models.PositiveIntegerField(default=1)
+    # Short answer grading rules; the accepted answers are the question's correct answers
+    case_sensitive = models.BooleanField(default=False)
+    ignore_punctuation = models.BooleanField(default=True)
+    numeric_tolerance = models.FloatField(null=True, blank=True, validators=[MinValueValidator(0)], help_text="Accept numbers within this distance of a numeric accepted answer")
+    max_edit_distance = models.PositiveSmallIntegerField(default=0, validators=[MaxValueValidator(5)], help_text="Accept answers within this many typos")
 
     class Meta:
         ordering = ['order']
@@ -69,24 +103,80 @@ class Answer(models.Model):
     def __str__(self):
         return f"{self.question} - {self.answer_text[:30]}{'...' if len(self.answer_text) > 30 else ''}"
 
+class QuizVersion(models.Model):
+    """
+    An immutable snapshot of a quiz's questions and answers; see ``versions.py``.
+
+    ``content`` is the zlib-compressed JSON tree and ``digest`` its SHA-256, so
+    equal content always has the same digest. ``content_version`` is the
+    quiz's ``content_version`` the snapshot was taken at.
+    """
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='versions')
+    number = models.PositiveIntegerField()
+    content_version = models.BigIntegerField()
+    digest = models.CharField(max_length=64)
+    content = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['quiz', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'number'], name='quiz_version_number'),
+        ]
+
+    def __str__(self):
+        return f"{self.quiz.title} v{self.number}"
+
 class QuizAttempt(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_attempts')
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='attempts')
+    # Content the attempt is shown and graded against; attempts from before versioning have none
+    version = models.ForeignKey(QuizVersion, on_delete=models.RESTRICT, null=True, blank=True, editable=False, related_name='attempts')
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     score = models.PositiveIntegerField(null=True, blank=True)
     total_points = models.PositiveIntegerField(null=True, blank=True)
+    deadline = models.DateTimeField(null=True, blank=True, help_text="Answers are rejected after this time")
+    question_ids = models.BinaryField(null=True, blank=True, editable=False, help_text="Questions drawn from the quiz's pool, encoded by pools.encode_ids")
+    shuffle_seed = models.PositiveIntegerField(null=True, blank=True, editable=False, help_text="Seed for this attempt's question and answer order")
 
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            # Lets the expiry sweeper find overdue attempts without scanning completed ones
+            models.Index(fields=['deadline'], condition=models.Q(completed_at__isnull=True), name='quiz_attempt_open_deadline'),
+        ]
+        constraints = [
+            # At most one attempt in progress per user and quiz, even under concurrent starts
+            models.UniqueConstraint(fields=['user', 'quiz'], condition=models.Q(completed_at__isnull=True), name='quiz_attempt_one_open'),
+        ]
 
     def __str__(self):
         status = "Completed" if self.completed_at else "In Progress"
         return f"{self.user.username} - {self.quiz.title} ({status})"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.deadline is None:
+            # Quizzes without a time limit still expire after QUIZ_ATTEMPT_MAX_DURATION so abandoned attempts get closed
+            minutes = self.quiz.time_limit or getattr(settings, 'QUIZ_ATTEMPT_MAX_DURATION', None)
+            if minutes:
+                self.deadline = (self.started_at or timezone.now()) + timedelta(minutes=minutes)
+        super().save(*args, **kwargs)
     
     @property
     def is_completed(self):
         return self.completed_at is not None
+
+    @property
+    def drawn_question_ids(self):
+        if self.question_ids is None:
+            return None
+        from .pools import decode_ids
+        return decode_ids(self.question_ids)
+
+    @property
+    def is_expired(self):
+        return self.deadline is not None and timezone.now() >= self.deadline
     
     @property
     def percentage_score(self):
@@ -99,7 +189,7 @@ class UserResponse(models.Model):
     attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name='responses')
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     selected_answer = models.ForeignKey(Answer, on_delete=models.CASCADE, null=True, blank=True)
-    answered_at = models.DateTimeField(auto_now_add=True)
+    answered_at = models.DateTimeField(default=timezone.now)
     text_answer = models.TextField(blank=True)  # For short answer questions
     is_correct = models.BooleanField(null=True)  # Calculated field
 
@@ -111,11 +201,160 @@ class UserResponse(models.Model):
     
     def save(self, *args, **kwargs):
         # Automatically calculate if answer is correct
-        if self.question.question_type in ['MC', 'TF'] and self.selected_answer:
-            self.is_correct = self.selected_answer.is_correct
+        self.grade()
         super().save(*args, **kwargs)
-    
+
+    def grade(self):
+        # Also used for unsaved responses that are written with bulk_create
+        if self.attempt.version_id:
+            # Marked against the attempt's snapshot, never the live answer key
+            from .versions import load
+            self.is_correct = load(self.attempt.version_id).grade(self.question_id, self.selected_answer_id, self.text_answer)
+        elif self.question.question_type in ['MC', 'TF'] and self.selected_answer:
+            self.is_correct = self.selected_answer.is_correct
+        elif self.question.question_type == 'SA':
+            self.is_correct = grade_short_answer(self.question, self.text_answer)
+        return self.is_correct
+
 
 
+class ArchivedAttempt(models.Model):
+    """
+    What is left in the database of a completed attempt moved to an archive file; see ``archive.py``.
+
+    The primary key is the attempt's own id. The full attempt and its
+    responses are the NDJSON record in the gzip member starting at ``offset``
+    in ``archive``, a path relative to ``QUIZ_ARCHIVE_ROOT``.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_attempts')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='archived_attempts')
+    started_at = models.DateTimeField()
+    completed_at = models.DateTimeField()
+    score = models.PositiveIntegerField(null=True, blank=True)
+    total_points = models.PositiveIntegerField(null=True, blank=True)
+    archive = models.CharField(max_length=200)
+    offset = models.BigIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['user', '-started_at'], name='quiz_archived_user_recent'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.quiz.title} (Archived)"
 
+    @property
+    def percentage_score(self):
+        if self.score is not None and self.total_points:
+            return round((self.score / self.total_points) * 100, 2)
+        return 0
+
+
+class UserQuizProgress(models.Model):
+    """
+    One row per user and quiz summarising their attempts; see ``progress.py``.
+
+    Kept up to date in the same transaction that starts or completes an
+    attempt, so limits and "best score" views never count attempts.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_progress')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='progress')
+    attempts_completed = models.PositiveIntegerField(default=0)
+    in_progress = models.ForeignKey(QuizAttempt, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    best_score = models.PositiveIntegerField(null=True, blank=True)
+    best_percentage = models.FloatField(null=True, blank=True)
+    last_completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'quiz'], name='quiz_progress_user_quiz'),
+        ]
+        indexes = [
+            # "My quizzes" listings, most recently active first
+            models.Index(fields=['user', '-updated_at'], name='quiz_progress_recent'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.quiz.title} ({self.attempts_completed} completed)"
+
+    @property
+    def attempts_left(self):
+        return max(self.quiz.max_attempts - self.attempts_completed, 0)
+
+class AttemptEvent(models.Model):
+    """
+    Append-only log of what happened during attempts; see ``events.py``.
+
+    ``payload`` is packed by ``events.py``: the quiz and user for STARTED, the
+    question, selected answer and text for ANSWERED, and nothing for COMPLETED.
+    A second ANSWERED event for the same question is a changed answer.
+    """
+    STARTED = 1
+    ANSWERED = 2
+    COMPLETED = 3
+    KINDS = [
+        (STARTED, 'Started'),
+        (ANSWERED, 'Answered'),
+        (COMPLETED, 'Completed'),
+    ]
+
+    # No FK constraint, so events outlive their attempts and inserts skip the check
+    attempt = models.ForeignKey(QuizAttempt, on_delete=models.DO_NOTHING, db_constraint=False, related_name='events')
+    kind = models.PositiveSmallIntegerField(choices=KINDS)
+    payload = models.BinaryField(blank=True, default=b'')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - attempt {self.attempt_id} at {self.created_at}"
+
+
+class Job(models.Model):
+    """A unit of background work, claimed and run by ``manage.py run_workers``; see ``jobs.py``."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+
+    progress = models.FloatField(default=0)  # 0 to 1
+    progress_message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers only ever look for due pending jobs
+            models.Index(fields=['run_at'], condition=models.Q(status='pending'), name='quiz_job_due'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
 
+    def report(self, done, total=None, message=''):
+        """Record progress as ``done`` out of ``total``, or as a 0-1 fraction without ``total``."""
+        self.progress = min(done / total, 1) if total else done
+        self.progress_message = message[:200]
+        Job.objects.filter(pk=self.pk).update(progress=self.progress, progress_message=self.progress_message)
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+
+
+class QuizPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin paginator that avoids ``COUNT(*)`` over whole tables.
+
+    For an unfiltered changelist on PostgreSQL the planner's row estimate is
+    used once it exceeds ``QUIZ_ADMIN_EXACT_COUNT_LIMIT``; filtered lists and
+    other databases are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = self._estimate()
+        if estimate is not None and estimate > getattr(settings, 'QUIZ_ADMIN_EXACT_COUNT_LIMIT', 10000):
+            return estimate
+        return super().count
+
+    def _estimate(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where or query.distinct:
+            return None
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [self.object_list.model._meta.db_table])
+            row = cursor.fetchone()
+        # reltuples is -1 for tables that have never been analyzed
+        return row[0] if row and row[0] >= 0 else None
@@ -0,0 +1,152 @@
+"""
+The question paper a student sees when taking a quiz.
+
+A paper lists the quiz's questions and answers without revealing which
+answers are correct. It is rendered to JSON once per quiz content version and
+cached as byte fragments (the quiz header, each question and each answer), so
+serving a paper only joins cached bytes. That holds for every attempt: the
+fragments are narrowed to the attempt's drawn questions (see ``pools.py``)
+and, when the quiz asks for it, shuffled. Shuffling is derived from
+``QuizAttempt.shuffle_seed``, so no per-attempt ordering is stored and
+reloading an attempt always reproduces the same order.
+
+Attempts on a published version (see ``versions.py``) get the version's
+paper instead, rendered from its snapshot and cached by content digest
+without a timeout, since a version never changes.
+"""
+import random
+import secrets
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from .serializers import AnswerSerializer, QuizTakeSerializer, TakeQuestionSerializer
+from .versions import load as load_version
+
+_renderer = JSONRenderer()
+_local = OrderedDict()
+_lock = threading.Lock()
+
+
+class PaperContent:
+    """The rendered fragments of one quiz content version."""
+    __slots__ = ['head', 'questions']
+
+    def __init__(self, head, questions):
+        # ``head`` is the quiz object without its closing brace; each question is
+        # ``(id, points, head, answers)`` with the question's head ending in ``"answers":[``
+        self.head = head
+        self.questions = questions
+
+
+def new_seed():
+    return secrets.randbits(31)
+
+
+def _answers_random(seed, question_id):
+    # Independent of which other questions were drawn or how they were shuffled
+    return random.Random(seed * 1_000_003 + question_id)
+
+
+def _render_content(quiz):
+    head = _renderer.render(QuizTakeSerializer(quiz).data)[:-1]
+    questions = []
+    for question in quiz.questions.prefetch_related('answers'):
+        data = TakeQuestionSerializer(question).data
+        answers = tuple(_renderer.render(answer) for answer in data.pop('answers'))
+        question_head = _renderer.render(data)[:-1] + b',"answers":['
+        questions.append((question.id, question.points, question_head, answers))
+    return PaperContent(head, tuple(questions))
+
+
+def _render_snapshot(snapshot):
+    # Same fields and layout as the serializers produce for live content
+    head = _renderer.render({field: snapshot.quiz[field] for field in QuizTakeSerializer.Meta.fields})[:-1]
+    question_fields = [field for field in TakeQuestionSerializer.Meta.fields if field != 'answers']
+    questions = []
+    for question in snapshot.questions.values():
+        answers = () if question['question_type'] == 'SA' else tuple(
+            _renderer.render({field: answer[field] for field in AnswerSerializer.Meta.fields}) for answer in question['answers']
+        )
+        question_head = _renderer.render({field: question[field] for field in question_fields})[:-1] + b',"answers":['
+        questions.append((question['id'], question['points'], question_head, answers))
+    return PaperContent(head, tuple(questions))
+
+
+def _cached(key, build, timeout):
+    paper = _local.get(key)
+    if paper is not None:
+        return paper
+
+    with _lock:
+        paper = _local.get(key) or cache.get(key)
+        if paper is None:
+            paper = build()
+            cache.set(key, paper, timeout)
+        _local[key] = paper
+        while len(_local) > getattr(settings, 'QUIZ_PAPER_LOCAL_CACHE_SIZE', 128):
+            _local.popitem(last=False)
+    return paper
+
+
+def content(quiz):
+    """Return the cached fragments of ``quiz``, rendering them at most once per content version."""
+    key = f'quiz:{quiz.pk}:paper:{quiz.content_version}'
+    return _cached(key, lambda: _render_content(quiz), getattr(settings, 'QUIZ_PAPER_CACHE_TIMEOUT', 24 * 60 * 60))
+
+
+def version_content(snapshot):
+    """Return the cached fragments of a published version's snapshot."""
+    return _cached(f'quiz-version:paper:{snapshot.digest}', lambda: _render_snapshot(snapshot), None)
+
+
+def render(quiz, attempt=None, snapshot=None):
+    """
+    Return the paper for ``quiz`` as JSON bytes, laid out for ``attempt`` when given.
+
+    The paper comes from ``snapshot``, or the attempt's version, when there is
+    one; ``quiz`` may then be ``None`` if there is no attempt.
+    """
+    if snapshot is None and attempt is not None and attempt.version_id:
+        snapshot = load_version(attempt.version_id)
+    paper = content(quiz) if snapshot is None else version_content(snapshot)
+    questions = list(paper.questions)
+
+    if attempt is not None:
+        drawn = attempt.drawn_question_ids
+        if drawn is not None:
+            drawn = set(drawn)
+            questions = [question for question in questions if question[0] in drawn]
+
+        seed = attempt.shuffle_seed
+        if seed is not None:
+            # From the attempt's version, so toggling them mid-attempt doesn't reorder its paper;
+            # versions published before the flags were snapshotted fall back to the quiz
+            flags = snapshot.quiz if snapshot is not None and 'shuffle_questions' in snapshot.quiz else vars(quiz)
+            # Shuffles start from the Question.order / Answer.order the fragments were rendered in
+            if flags['shuffle_questions']:
+                random.Random(seed).shuffle(questions)
+            if flags['shuffle_answers']:
+                shuffled = []
+                for question_id, points, question_head, answers in questions:
+                    answers = list(answers)
+                    _answers_random(seed, question_id).shuffle(answers)
+                    shuffled.append((question_id, points, question_head, answers))
+                questions = shuffled
+
+    body = b','.join(question_head + b','.join(answers) + b']}' for _, _, question_head, answers in questions)
+    totals = b',"total_questions":%d,"total_points":%d}' % (len(questions), sum(question[1] for question in questions))
+    return paper.head + b',"questions":[' + body + b']' + totals
+
+
+def envelope(data, paper, key='quiz'):
+    """Return ``data`` rendered to JSON with the pre-rendered ``paper`` bytes added under ``key``."""
+    return _renderer.render(data)[:-1] + b',"%s":' % key.encode() + paper + b'}'
+
+
+def clear_cache():
+    with _lock:
+        _local.clear()
@@ -14,7 +14,7 @@ class CanTakeQuiz(permissions.BasePermission):
     
     def has_object_permission(self, request, view, obj):
         # Check if user has exceeded max attempts
-        user_attempts = obj.attempts.filter( user=request.user, completed_at__isnull=False).count()
+        user_attempts = obj.progress.filter(user=request.user).values_list('attempts_completed', flat=True).first() or 0
         return user_attempts < obj.max_attempts
 
 class IsAttemptOwner(permissions.BasePermission):
@@ -0,0 +1,75 @@
+"""
+Random question pools.
+
+Quizzes with a ``question_pool_size`` draw that many questions at random for
+every attempt. The quiz's question ids are cached as a packed array keyed by
+the quiz's content version, so drawing a pool never touches the question table
+and costs O(pool size) in memory. The drawn ids are stored on the attempt as
+delta-encoded varints.
+"""
+import random
+from array import array
+
+from django.core.cache import cache
+
+_random = random.SystemRandom()
+
+
+def encode_ids(ids):
+    """Encode ids as sorted, delta-encoded unsigned varints."""
+    data = bytearray()
+    previous = 0
+    for value in sorted(ids):
+        delta = value - previous
+        previous = value
+        while delta >= 0x80:
+            data.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        data.append(delta)
+    return bytes(data)
+
+
+def decode_ids(data):
+    ids = []
+    value = shift = previous = 0
+    for byte in bytes(data):
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += value
+        ids.append(previous)
+        value = shift = 0
+    return ids
+
+
+def _cache_key(quiz):
+    return f'quiz:{quiz.pk}:question-ids:{quiz.content_version}'
+
+
+def question_ids(quiz):
+    """Return the ids of the quiz's questions, in quiz order, as an ``array``."""
+    key = _cache_key(quiz)
+    packed = cache.get(key)
+    if packed is not None:
+        return array('q', packed)
+    ids = array('q', quiz.questions.order_by('order').values_list('id', flat=True))
+    cache.set(key, ids.tobytes(), None)
+    return ids
+
+
+def draw(quiz, ids=None):
+    """
+    Draw the questions for a new attempt, returning their encoded ids.
+
+    ``ids`` are the question ids to draw from, by default the quiz's current
+    questions. Returns ``None`` when the quiz has no pool or the pool covers
+    every question, in which case the attempt uses the whole quiz.
+    """
+    if not quiz.question_pool_size:
+        return None
+    if ids is None:
+        ids = question_ids(quiz)
+    if quiz.question_pool_size >= len(ids):
+        return None
+    return encode_ids(_random.sample(ids, quiz.question_pool_size))
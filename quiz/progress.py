@@ -0,0 +1,123 @@
+"""
+Per-user, per-quiz progress summaries (``UserQuizProgress``).
+
+``lock()`` and ``record_completions()`` run inside the transactions that
+start and complete attempts and lock the rows they change, so the attempt
+limit is checked against one row instead of by counting attempts.
+``rebuild()`` recomputes rows from the attempts table, and the summaries of
+archived attempts, after scores change.
+"""
+from django.db.models import Case, Count, F, FloatField, Max, Q, When
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+from .models import ArchivedAttempt, QuizAttempt, UserQuizProgress
+
+
+def lock(user, quiz):
+    """Return the progress row of ``user`` on ``quiz``, locked for update and created if needed."""
+    progress, _ = UserQuizProgress.objects.select_for_update().get_or_create(user=user, quiz=quiz)
+    return progress
+
+
+def _percentage(score, total_points):
+    return round(score / total_points * 100, 2) if score is not None and total_points else None
+
+
+def _higher(current, value):
+    if value is None:
+        return current
+    return value if current is None else max(current, value)
+
+
+def record_completions(attempt_ids):
+    """Fold newly completed attempts into their users' progress rows."""
+    attempts = list(
+        QuizAttempt.objects.filter(pk__in=attempt_ids, completed_at__isnull=False)
+        .values('id', 'user_id', 'quiz_id', 'score', 'total_points', 'completed_at')
+    )
+    if not attempts:
+        return
+
+    pairs = Q()
+    for user_id, quiz_id in {(attempt['user_id'], attempt['quiz_id']) for attempt in attempts}:
+        pairs |= Q(user_id=user_id, quiz_id=quiz_id)
+    existing = {(progress.user_id, progress.quiz_id): progress for progress in UserQuizProgress.objects.select_for_update().filter(pairs)}
+    created = {}
+
+    now = timezone.now()
+    for attempt in attempts:
+        key = (attempt['user_id'], attempt['quiz_id'])
+        progress = existing.get(key) or created.setdefault(key, UserQuizProgress(user_id=key[0], quiz_id=key[1]))
+        progress.attempts_completed += 1
+        progress.best_score = _higher(progress.best_score, attempt['score'])
+        progress.best_percentage = _higher(progress.best_percentage, _percentage(attempt['score'], attempt['total_points']))
+        progress.last_completed_at = _higher(progress.last_completed_at, attempt['completed_at'])
+        if progress.in_progress_id == attempt['id']:
+            progress.in_progress_id = None
+        progress.updated_at = now
+
+    UserQuizProgress.objects.bulk_update(
+        existing.values(),
+        ['attempts_completed', 'best_score', 'best_percentage', 'last_completed_at', 'in_progress', 'updated_at'],
+    )
+    UserQuizProgress.objects.bulk_create(created.values())
+
+
+def rebuild(quiz=None, batch_size=1000):
+    """Recompute the progress rows of ``quiz`` (or of every quiz) from its attempts, archived ones included."""
+    attempts = QuizAttempt.objects.all() if quiz is None else QuizAttempt.objects.filter(quiz=quiz)
+    archived = ArchivedAttempt.objects.all() if quiz is None else ArchivedAttempt.objects.filter(quiz=quiz)
+    completed = Q(completed_at__isnull=False)
+    percentage = Case(
+        When(total_points__gt=0, then=Round(Cast('score', FloatField()) * 100 / F('total_points'), 2)),
+        output_field=FloatField(),
+    )
+    stats = (
+        attempts.order_by()
+        .values('user_id', 'quiz_id')
+        .annotate(
+            completed_count=Count('id', filter=completed),
+            top_score=Max('score', filter=completed),
+            top_percentage=Max(percentage, filter=completed),
+            last_completed=Max('completed_at'),
+            open_attempt=Max('id', filter=Q(completed_at__isnull=True)),
+        )
+    )
+    archived_stats = (
+        archived.order_by()
+        .values('user_id', 'quiz_id')
+        .annotate(
+            completed_count=Count('id'),
+            top_score=Max('score'),
+            top_percentage=Max(percentage),
+            last_completed=Max('completed_at'),
+        )
+    )
+
+    rows = {}
+    for row in archived_stats.iterator():
+        rows[row['user_id'], row['quiz_id']] = UserQuizProgress(
+            user_id=row['user_id'],
+            quiz_id=row['quiz_id'],
+            attempts_completed=row['completed_count'],
+            best_score=row['top_score'],
+            best_percentage=row['top_percentage'],
+            last_completed_at=row['last_completed'],
+        )
+    for row in stats.iterator():
+        progress = rows.setdefault((row['user_id'], row['quiz_id']), UserQuizProgress(user_id=row['user_id'], quiz_id=row['quiz_id']))
+        progress.attempts_completed += row['completed_count']
+        progress.best_score = _higher(progress.best_score, row['top_score'])
+        progress.best_percentage = _higher(progress.best_percentage, row['top_percentage'])
+        progress.last_completed_at = _higher(progress.last_completed_at, row['last_completed'])
+        progress.in_progress_id = row['open_attempt']
+
+    UserQuizProgress.objects.bulk_create(
+        rows.values(),
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user', 'quiz'],
+        update_fields=['attempts_completed', 'best_score', 'best_percentage', 'last_completed_at', 'in_progress', 'updated_at'],
+    )
+    return len(rows)
@@ -0,0 +1,122 @@
+"""
+Bulk creation of user accounts, e.g. a whole school at once.
+
+Password hashing dominates the cost of creating a user, so passwords are
+hashed in a process pool across all cores, and users and their API tokens are
+then inserted with ``bulk_create``. The pool is only used by the
+``provision_users`` command and the ``provision_users`` job, never inside a
+web request: the API hashes small batches inline and queues larger ones. Every input row gets a result in input
+order: the new user's id and token (plus the password when one was
+generated), or the reasons the row was rejected.
+"""
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from rest_framework.authtoken.models import Token
+
+from .serializers import ProvisionUserSerializer
+
+FIELDS = ['username', 'email', 'password', 'first_name', 'last_name']
+
+
+def _hash(password):
+    return make_password(password)
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash ``passwords`` with the default hasher, in a process pool for large batches."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < getattr(settings, 'QUIZ_PROVISION_POOL_THRESHOLD', 32):
+        return [_hash(password) for password in passwords]
+    # Spawned rather than forked, as forking a process with other threads (such as a threaded job worker)
+    # can copy locks they hold; spawned workers have to set Django up before hashing
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+        return list(pool.map(_hash, passwords, chunksize=max(len(passwords) // (workers * 4), 1)))
+
+
+def _validate(rows):
+    """Return ``(accepted rows as validated data, {row index: errors})``."""
+    accepted = []
+    errors = {}
+    seen = set()
+    for index, row in enumerate(rows):
+        serializer = ProvisionUserSerializer(data=row)
+        if not serializer.is_valid():
+            errors[index] = {field: [str(message) for message in messages] for field, messages in serializer.errors.items()}
+            continue
+        username = serializer.validated_data['username']
+        if username in seen:
+            errors[index] = {'username': ['Duplicate username in this batch.']}
+            continue
+        seen.add(username)
+        accepted.append((index, serializer.validated_data))
+
+    existing = set(User.objects.filter(username__in=seen).values_list('username', flat=True))
+    for index, row in accepted:
+        if row['username'] in existing:
+            errors[index] = {'username': ['Username already exists.']}
+    return [(index, row) for index, row in accepted if index not in errors], errors
+
+
+def provision_users(rows, workers=None, batch_size=1000):
+    """
+    Create a user and an auth token for each of ``rows``.
+
+    Each row is a dict with a ``username`` and optionally ``email``,
+    ``password``, ``first_name`` and ``last_name``; rows without a password
+    get a generated one. Returns one result dict per row, in input order.
+    """
+    results = [None] * len(rows)
+    accepted, errors = _validate(rows)
+
+    generated = {}
+    passwords = []
+    for index, row in accepted:
+        password = row.get('password', '')
+        if not password:
+            password = generated[index] = secrets.token_urlsafe(9)
+        passwords.append(password)
+    hashes = hash_passwords(passwords, workers=workers)
+
+    users = [
+        User(
+            username=row['username'],
+            email=User.objects.normalize_email(row.get('email', '')),
+            first_name=row.get('first_name', ''),
+            last_name=row.get('last_name', ''),
+            password=password_hash,
+        )
+        for (index, row), password_hash in zip(accepted, hashes)
+    ]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=batch_size)
+            if any(user.pk is None for user in users):
+                # Backends that can't return ids from a bulk insert
+                ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+                for user in users:
+                    user.pk = ids[user.username]
+            tokens = [Token(user=user, key=Token.generate_key()) for user in users]
+            Token.objects.bulk_create(tokens, batch_size=batch_size)
+    except IntegrityError:
+        # A username was taken concurrently; nothing was written, so report the batch as failed
+        for index, _ in accepted:
+            errors[index] = {'username': ['Could not create users, please retry.']}
+        accepted, users, tokens = [], [], []
+
+    for (index, row), user, token in zip(accepted, users, tokens):
+        result = {'row': index, 'username': user.username, 'status': 'created', 'id': user.pk, 'token': token.key}
+        if index in generated:
+            result['password'] = generated[index]
+        results[index] = result
+    for index, row_errors in errors.items():
+        results[index] = {'row': index, 'username': rows[index].get('username'), 'status': 'error', 'errors': row_errors}
+    return results
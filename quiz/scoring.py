@@ -0,0 +1,202 @@
+"""
+Set-based scoring of quiz attempts.
+
+Scores are computed by the database with one ``UPDATE`` per batch of attempts
+instead of loading every question and response into Python. Attempts on a
+published version are scored from the version's snapshot instead, so the
+live questions are never consulted for them.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import answer_buffer, events, progress as user_progress, versions
+from .grading import matcher_for
+from .models import Answer, Question, QuizAttempt, UserResponse
+
+
+def _score_expressions():
+    earned = (
+        UserResponse.objects.filter(attempt=OuterRef('pk'), is_correct=True)
+        .values('attempt')
+        .annotate(total=Sum('question__points'))
+        .values('total')
+    )
+    total = (
+        Question.objects.filter(quiz=OuterRef('quiz'))
+        .values('quiz')
+        .annotate(total=Sum('points'))
+        .values('total')
+    )
+    return {
+        'score': Coalesce(Subquery(earned), 0),
+        'total_points': Coalesce(Subquery(total), 0),
+    }
+
+
+def complete_attempts(attempt_ids, completed_at=None):
+    """
+    Score and complete the given in-progress attempts in bulk.
+
+    ``completed_at`` defaults to each attempt's deadline, which is what the
+    expiry sweeper wants. Attempts that are already completed are skipped, so
+    the return value is the number of attempts this call completed.
+    """
+    attempt_ids = list(attempt_ids)
+    if not attempt_ids:
+        return 0
+
+    if answer_buffer.is_enabled():
+        for attempt in QuizAttempt.objects.filter(pk__in=attempt_ids).only('id', 'quiz_id', 'version'):
+            answer_buffer.flush(attempt, clear=True)
+
+    with transaction.atomic():
+        open_attempts = dict(
+            QuizAttempt.objects.select_for_update()
+            .filter(pk__in=attempt_ids, completed_at__isnull=True)
+            .values_list('id', 'version_id')
+        )
+        open_ids = list(open_attempts)
+        versioned = [attempt_id for attempt_id, version_id in open_attempts.items() if version_id]
+        unversioned = [attempt_id for attempt_id, version_id in open_attempts.items() if not version_id]
+        completed = 0
+        if unversioned:
+            completed += QuizAttempt.objects.filter(pk__in=unversioned, completed_at__isnull=True).update(
+                completed_at=completed_at or F('deadline'),
+                **_score_expressions(),
+            )
+            _set_pool_totals(unversioned)
+        if versioned:
+            completed += QuizAttempt.objects.filter(pk__in=versioned, completed_at__isnull=True).update(completed_at=completed_at or F('deadline'))
+            _set_version_scores(versioned)
+        user_progress.record_completions(open_ids)
+        transaction.on_commit(lambda: events.completed(open_ids))
+    return completed
+
+
+def _set_version_scores(attempt_ids):
+    """Score attempts on a published version with its snapshot's points; returns how many were scored."""
+    attempts = list(QuizAttempt.objects.filter(pk__in=attempt_ids, version__isnull=False).only('id', 'version_id', 'question_ids'))
+    if not attempts:
+        return 0
+    correct = defaultdict(list)
+    responses = UserResponse.objects.filter(attempt__in=[attempt.id for attempt in attempts], is_correct=True)
+    for attempt_id, question_id in responses.values_list('attempt_id', 'question_id'):
+        correct[attempt_id].append(question_id)
+    for attempt in attempts:
+        snapshot = versions.load(attempt.version_id)
+        attempt.score = snapshot.points(correct[attempt.id])
+        attempt.total_points = snapshot.points(attempt.drawn_question_ids)
+    QuizAttempt.objects.bulk_update(attempts, ['score', 'total_points'])
+    return len(attempts)
+
+
+def _set_pool_totals(attempt_ids):
+    # Attempts that drew from a question pool are only out of their drawn questions' points
+    pooled = list(QuizAttempt.objects.filter(pk__in=attempt_ids, question_ids__isnull=False, version__isnull=True).only('id', 'quiz_id', 'question_ids'))
+    if not pooled:
+        return
+    points = dict(Question.objects.filter(quiz_id__in={attempt.quiz_id for attempt in pooled}).values_list('id', 'points'))
+    for attempt in pooled:
+        attempt.total_points = sum(points.get(question_id, 0) for question_id in attempt.drawn_question_ids)
+    QuizAttempt.objects.bulk_update(pooled, ['total_points'])
+
+
+def expire_attempts(batch_size=500, now=None):
+    """Complete every in-progress attempt past its deadline, ``batch_size`` at a time."""
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                QuizAttempt.objects.filter(completed_at__isnull=True, deadline__lte=now)
+                .order_by('deadline')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not batch:
+                return expired
+            expired += complete_attempts(batch)
+
+
+def regrade_quiz(quiz, chunk_size=1000, progress=None):
+    """
+    Re-mark every response to ``quiz`` against the current answer key, then rescore its completed attempts.
+
+    The current content is published first and completed attempts are moved
+    to that version, since it is the answer key they are now marked against,
+    and are then scored from its snapshot. Responses are re-marked and attempts
+    rescored ``chunk_size`` at a time, each chunk in its own short transaction,
+    so large quizzes never hold write locks for the whole run.
+    ``progress(done, total)`` is called after each chunk of attempts when
+    given. Returns a tuple of ``(responses regraded, attempts rescored)``.
+    """
+    version = versions.publish(quiz)
+    QuizAttempt.objects.filter(quiz=quiz, completed_at__isnull=False).exclude(version=version).update(version=version)
+
+    correct = Answer.objects.filter(pk=OuterRef('selected_answer')).values('is_correct')[:1]
+    response_ids = UserResponse.objects.filter(
+        question__quiz=quiz,
+        question__question_type__in=['MC', 'TF'],
+        selected_answer__isnull=False,
+    ).order_by('pk').values_list('pk', flat=True)
+    regraded = 0
+    last_id = 0
+    while True:
+        chunk = list(response_ids.filter(pk__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        regraded += UserResponse.objects.filter(pk__in=chunk).update(is_correct=Subquery(correct))
+        last_id = chunk[-1]
+    regraded += grade_short_answers(quiz)
+
+    attempt_ids = QuizAttempt.objects.filter(quiz=quiz, completed_at__isnull=False).order_by('pk').values_list('pk', flat=True)
+    total = attempt_ids.count() if progress else None
+    rescored = 0
+    last_id = 0
+    while True:
+        chunk = list(attempt_ids.filter(pk__gt=last_id)[:chunk_size])
+        if not chunk:
+            # Best scores may have changed
+            user_progress.rebuild(quiz)
+            return regraded, rescored
+        with transaction.atomic():
+            rescored += _set_version_scores(chunk)
+        last_id = chunk[-1]
+        if progress:
+            progress(rescored, total)
+
+
+def grade_short_answers(quiz, batch_size=500):
+    """
+    Grade every short answer response to ``quiz`` with the questions' compiled matchers.
+
+    Responses are streamed from the database and written back with one
+    ``UPDATE`` per outcome and batch. Returns the number of responses graded.
+    """
+    matchers = {question.id: matcher_for(question) for question in quiz.questions.filter(question_type='SA').prefetch_related('answers')}
+    if not matchers:
+        return 0
+
+    responses = UserResponse.objects.filter(question_id__in=list(matchers)).values_list('pk', 'question_id', 'text_answer')
+    graded = 0
+    outcomes = {True: [], False: [], None: []}
+
+    def write(is_correct, pks):
+        UserResponse.objects.filter(pk__in=pks).update(is_correct=is_correct)
+        pks.clear()
+
+    for pk, question_id, text_answer in responses.iterator(chunk_size=batch_size):
+        matcher = matchers[question_id]
+        is_correct = matcher.matches(text_answer) if matcher else None
+        outcomes[is_correct].append(pk)
+        graded += 1
+        if len(outcomes[is_correct]) >= batch_size:
+            write(is_correct, outcomes[is_correct])
+
+    for is_correct, pks in outcomes.items():
+        if pks:
+            write(is_correct, pks)
+    return graded
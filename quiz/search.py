@@ -0,0 +1,174 @@
+"""
+Full-text search over quiz titles, descriptions and question texts.
+
+The ``quiz_search`` table holds one document per quiz:
+
+* SQLite: an FTS5 virtual table whose ``rowid`` is the quiz id, ranked with bm25.
+* PostgreSQL: a table with a weighted ``tsvector`` and a GIN index, ranked with ``ts_rank_cd``.
+
+Other database backends fall back to ``icontains`` filtering. The table is kept
+in sync by the signal handlers in ``quiz/signals.py``; run
+``manage.py rebuild_search_index`` after bulk changes that bypass signals.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+
+from .models import Question, Quiz
+
+TABLE = 'quiz_search'
+_TOKEN = re.compile(r'\w+')
+
+
+def _connection():
+    return connections[router.db_for_write(Quiz)]
+
+
+def is_supported(connection=None):
+    return (connection or _connection()).vendor in ('sqlite', 'postgresql')
+
+
+def _config():
+    return getattr(settings, 'QUIZ_SEARCH_CONFIG', 'english')
+
+
+def _match_query(query):
+    # Quote every word so user input can never be parsed as FTS5 syntax
+    return ' '.join(f'"{token}"*' for token in _TOKEN.findall(query))
+
+
+def _match_sql(connection, query):
+    """Return ``(from_where_sql, params, rank_sql)`` selecting matching documents."""
+    if connection.vendor == 'sqlite':
+        return f'FROM {TABLE} WHERE {TABLE} MATCH %s', [_match_query(query)], 'rank'
+    return (
+        f'FROM {TABLE}, websearch_to_tsquery(%s, %s) AS search_query WHERE document @@ search_query',
+        [_config(), query],
+        'ts_rank_cd(document, search_query) DESC',
+    )
+
+
+def _id_column(connection):
+    return 'rowid' if connection.vendor == 'sqlite' else 'quiz_id'
+
+
+def index_quizzes(quiz_ids):
+    """(Re)build the search documents of the given quizzes."""
+    quiz_ids = list(quiz_ids)
+    connection = _connection()
+    if not quiz_ids or not is_supported(connection):
+        return
+
+    quizzes, questions = Quiz._meta.db_table, Question._meta.db_table
+    placeholders = ', '.join(['%s'] * len(quiz_ids))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', quiz_ids)
+            cursor.execute(
+                f'INSERT INTO {TABLE} (rowid, title, description, questions) '
+                f'SELECT q.id, q.title, q.description, '
+                f"COALESCE((SELECT group_concat(question_text, ' ') FROM {questions} WHERE quiz_id = q.id), '') "
+                f'FROM {quizzes} q WHERE q.id IN ({placeholders})',
+                quiz_ids,
+            )
+        else:
+            cursor.execute(
+                f'INSERT INTO {TABLE} (quiz_id, document) '
+                f"SELECT q.id, setweight(to_tsvector(%s, q.title), 'A') "
+                f"|| setweight(to_tsvector(%s, q.description), 'B') "
+                f"|| setweight(to_tsvector(%s, COALESCE((SELECT string_agg(question_text, ' ') FROM {questions} WHERE quiz_id = q.id), '')), 'C') "
+                f'FROM {quizzes} q WHERE q.id IN ({placeholders}) '
+                f'ON CONFLICT (quiz_id) DO UPDATE SET document = EXCLUDED.document',
+                [_config()] * 3 + quiz_ids,
+            )
+
+
+def remove_quizzes(quiz_ids):
+    quiz_ids = list(quiz_ids)
+    connection = _connection()
+    if not quiz_ids or not is_supported(connection):
+        return
+    placeholders = ', '.join(['%s'] * len(quiz_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE {_id_column(connection)} IN ({placeholders})', quiz_ids)
+
+
+def rebuild(batch_size=1000):
+    """Re-index every quiz, ``batch_size`` quizzes per statement."""
+    ids = Quiz.objects.order_by('pk').values_list('pk', flat=True)
+    last_id = 0
+    while True:
+        batch = list(ids.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        index_quizzes(batch)
+        last_id = batch[-1]
+
+
+def filter_queryset(queryset, query):
+    """Restrict ``queryset`` to quizzes matching ``query`` without ranking them (used by the admin)."""
+    connection = connections[queryset.db]
+    if not is_supported(connection):
+        return queryset.filter(title__icontains=query) | queryset.filter(description__icontains=query)
+    if not _TOKEN.search(query):
+        return queryset
+    from_where, params, _ = _match_sql(connection, query)
+    return queryset.filter(pk__in=RawSQL(f'SELECT {_id_column(connection)} {from_where}', params))
+
+
+class SearchResults:
+    """
+    Ranked search results that page in the database.
+
+    Implements the ``count()`` and slicing protocol expected by Django's
+    ``Paginator``, so only the requested page of quizzes is ever loaded.
+    """
+    ordered = True
+
+    def __init__(self, query, queryset):
+        self.queryset = queryset
+        self.connection = connections[queryset.db]
+        from_where, params, self.rank = _match_sql(self.connection, query)
+        base_sql, base_params = queryset.order_by().values('pk').query.get_compiler(using=queryset.db).as_sql()
+        self.id_column = _id_column(self.connection)
+        self.sql = f'{from_where} AND {self.id_column} IN ({base_sql})'
+        self.params = params + list(base_params)
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) {self.sql}', self.params)
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        limit = -1 if stop is None else max(stop - start, 0)
+        if self.connection.vendor == 'postgresql' and limit == -1:
+            limit = None
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {self.id_column} {self.sql} ORDER BY {self.rank}, {self.id_column} DESC LIMIT %s OFFSET %s',
+                self.params + [limit, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        quizzes = self.queryset.in_bulk(ids)
+        return [quizzes[pk] for pk in ids if pk in quizzes]
+
+
+def search_quizzes(query, queryset):
+    """Return ``queryset`` narrowed to ``query``, ranked by relevance when the database supports it."""
+    connection = connections[queryset.db]
+    if not is_supported(connection):
+        return filter_queryset(queryset, query)
+    if not _TOKEN.search(query):
+        return queryset
+    return SearchResults(query, queryset)
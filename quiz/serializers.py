@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Quiz, Question, Answer, QuizAttempt, UserResponse
+from django.db import transaction
+from django.utils import timezone
+from .models import Quiz, Question, Answer, QuizAttempt, UserResponse, Job, UserQuizProgress, ArchivedAttempt
+from . import answer_buffer
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -41,33 +44,53 @@ class QuestionSerializer(serializers.ModelSerializer):
         model = Question
         fields = ['id', 'question_text', 'question_type', 'points', 'answers']
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # A short answer question's answers are its accepted answers
+        if instance.question_type == 'SA':
+            data['answers'] = []
+        return data
+
 class QuestionCreateSerializer(serializers.ModelSerializer):
     answers = AnswerCreateSerializer(many=True, write_only=True)
 
     class Meta:
          model = Question
-         fields = ['id', 'question_text', 'question_type', 'points', 'order', 'answers']
+         fields = ['id', 'question_text', 'question_type', 'points', 'order', 'answers',
+                   'case_sensitive', 'ignore_punctuation', 'numeric_tolerance', 'max_edit_distance']
 
     def create(self, validated_data):
         answers_data = validated_data.pop('answers', [])
-        question = Question.objects.create(**validated_data)
-
-        for answer_data in answers_data:
-            Answer.objects.create(question=question, **answer_data)
+        with transaction.atomic():
+            question = Question.objects.create(**validated_data)
+            Answer.objects.bulk_create(Answer(question=question, **answer_data) for answer_data in answers_data)
+            if answers_data:
+                # bulk_create skips the per-answer signal that moves the quiz's content_version on
+                Quiz.objects.filter(pk=question.quiz_id).update(updated_at=timezone.now())
 
         return question
     
     def validate_answers(self, answers):
         if not answers:
             raise serializers.ValidationError("Questions must have at least one answer")
-        if len(answers) < 2:
-            raise serializers.ValidationError("Multiple choice questions need at least 2 answers")
-        
+        return answers
+
+    def validate(self, data):
+        answers = data.get('answers', [])
         correct_answers = [answer for answer in answers if answer.get('is_correct')]
+
+        # Short answer questions list their accepted answers as correct answers
+        if data.get('question_type', 'MC') == 'SA':
+            if not correct_answers:
+                raise serializers.ValidationError({'answers': "Short answer questions need at least one accepted answer"})
+            return data
+
+        if len(answers) < 2:
+            raise serializers.ValidationError({'answers': "Multiple choice questions need at least 2 answers"})
         if len(correct_answers) != 1:
-            raise serializers.ValidationError("Questions must have exactly one correct answer")
+            raise serializers.ValidationError({'answers': "Questions must have exactly one correct answer"})
         
-        return answers
+        return data
     
 class QuizListSerializer(serializers.ModelSerializer):
     creator = UserSerializer(read_only=True)
@@ -79,6 +102,21 @@ class QuizListSerializer(serializers.ModelSerializer):
          fields = ['id', 'title', 'description', 'creator', 'total_questions', 'total_points', 'time_limit', 'created_at', 'is_active']
 
 
+class CatalogQuizSerializer(serializers.ModelSerializer):
+    # Public: the creator's username only, and totals from queryset annotations (see catalog.py)
+    creator = serializers.CharField(source='creator.username', read_only=True)
+    total_questions = serializers.IntegerField(source='question_count', read_only=True)
+    total_points = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Quiz
+        fields = ['id', 'title', 'description', 'creator', 'total_questions', 'total_points', 'time_limit', 'max_attempts', 'question_pool_size', 'created_at']
+        read_only_fields = fields
+
+    def get_total_points(self, obj):
+        return obj.point_total or 0
+
+
 class QuizDetailSerializer(serializers.ModelSerializer):
     creator = UserSerializer(read_only=True)
     questions = QuestionSerializer(many=True, read_only=True)
@@ -87,12 +125,35 @@ class QuizDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Quiz
-        fields = ['id', 'title', 'description', 'creator', 'questions', 'total_questions', 'total_points','time_limit', 'max_attempts', 'created_at','updated_at', 'is_active']
+        fields = ['id', 'title', 'description', 'creator', 'questions', 'total_questions', 'total_points','time_limit', 'max_attempts', 'question_pool_size', 'shuffle_questions', 'shuffle_answers', 'created_at','updated_at', 'is_active']
+
+class TakeQuestionSerializer(serializers.ModelSerializer):
+    # Student-facing: answers never include is_correct
+    answers = AnswerSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = ['id', 'question_text', 'question_type', 'points', 'order', 'answers']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # A short answer question's answers are its accepted answers
+        if instance.question_type == 'SA':
+            data['answers'] = []
+        return data
+
+
+class QuizTakeSerializer(serializers.ModelSerializer):
+    # Quiz fields of the paper; questions and totals are added by papers.render
+    class Meta:
+        model = Quiz
+        fields = ['id', 'title', 'description', 'time_limit', 'max_attempts', 'question_pool_size']
+
 
 class QuizCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Quiz
-        fields = ['title', 'description', 'time_limit', 'max_attempts']
+        fields = ['title', 'description', 'time_limit', 'max_attempts', 'question_pool_size', 'shuffle_questions', 'shuffle_answers']
     
     def create(self, validated_data):
         validated_data['creator'] = self.context['request'].user
@@ -107,6 +168,28 @@ class UserResponseSerializer(serializers.ModelSerializer):
         fields = ['id', 'question', 'selected_answer', 'text_answer', 'is_correct', 'answered_at']
 
 
+class StrictCharField(serializers.CharField):
+    """A ``CharField`` that rejects numbers instead of converting them to strings."""
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        return super().to_internal_value(data)
+
+
+def _user_field_max_length(name):
+    return User._meta.get_field(name).max_length
+
+
+class ProvisionUserSerializer(serializers.Serializer):
+    """One row of a bulk provisioning request; usernames are checked against the database in bulk."""
+    username = StrictCharField(max_length=_user_field_max_length('username'), validators=User._meta.get_field('username').validators)
+    email = serializers.EmailField(required=False, allow_blank=True, max_length=_user_field_max_length('email'))
+    password = StrictCharField(required=False, allow_blank=True, max_length=4096, trim_whitespace=False)
+    first_name = StrictCharField(required=False, allow_blank=True, max_length=_user_field_max_length('first_name'))
+    last_name = StrictCharField(required=False, allow_blank=True, max_length=_user_field_max_length('last_name'))
+
+
 class SubmitAnswerSerializer(serializers.Serializer):
     question_id = serializers.IntegerField()
     answer_id = serializers.IntegerField(required=False)
@@ -117,18 +200,31 @@ class SubmitAnswerSerializer(serializers.Serializer):
         answer_id = data.get('answer_id')
         text_answer = data.get('text_answer')
 
-        try:
-            question = Question.objects.get(id=question_id)
-        except Question.DoesNotExist:
-            raise serializers.ValidationError("Question does not exist")
+        # Batch submissions pass the attempt's questions, with answers prefetched, in the context
+        questions = self.context.get('questions')
+        if questions is not None:
+            question = questions.get(question_id)
+            if question is None:
+                raise serializers.ValidationError("Question is not part of this attempt")
+        else:
+            try:
+                question = Question.objects.get(id=question_id)
+            except Question.DoesNotExist:
+                raise serializers.ValidationError("Question does not exist")
         if question.question_type in ['MC', 'TF']:
             if not answer_id:
                 raise serializers.ValidationError("Answer ID is required for multiple choice questions")
-            try:
-                answer = Answer.objects.get(id=answer_id, question=question)
+            if questions is not None:
+                answer = next((answer for answer in question.answers.all() if answer.id == answer_id), None)
+                if answer is None:
+                    raise serializers.ValidationError("Invalid answer for this question")
                 data['answer'] = answer
-            except Answer.DoesNotExist:
-                raise serializers.ValidationError("Invalid answer for this question")
+            else:
+                try:
+                    answer = Answer.objects.get(id=answer_id, question=question)
+                    data['answer'] = answer
+                except Answer.DoesNotExist:
+                    raise serializers.ValidationError("Invalid answer for this question")
         
         elif question.question_type == 'SA':
             if not text_answer:
@@ -136,18 +232,67 @@ class SubmitAnswerSerializer(serializers.Serializer):
         
         data['question'] = question
         return data
+class QuizAttemptListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        attempts = list(data.all() if hasattr(data, 'all') else data)
+        if answer_buffer.is_enabled():
+            # The buffered answers of every in-progress attempt in one cache read, not one per attempt
+            in_progress = [attempt for attempt in attempts if not attempt.completed_at]
+            self.child.context['buffered_responses'] = answer_buffer.buffered_responses(in_progress) if in_progress else {}
+        return super().to_representation(attempts)
+
+
 class QuizAttemptSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     quiz = QuizListSerializer(read_only=True)
-    responses = UserResponseSerializer(many=True, read_only=True)
+    responses = serializers.SerializerMethodField()
     percentage_score = serializers.ReadOnlyField()
+    question_ids = serializers.ReadOnlyField(source='drawn_question_ids')
 
     class Meta:
         model = QuizAttempt
-        fields = ['id', 'user', 'quiz', 'started_at', 'completed_at','score', 'total_points', 'percentage_score', 'responses']
-        
+        fields = ['id', 'user', 'quiz', 'started_at', 'deadline', 'completed_at','score', 'total_points', 'percentage_score', 'question_ids', 'responses']
+        list_serializer_class = QuizAttemptListSerializer
 
-    
+    def get_responses(self, obj):
+        responses = list(obj.responses.all())
+        # Answers to in-progress attempts may still be in the write-behind buffer
+        if answer_buffer.is_enabled() and not obj.completed_at:
+            buffered = self.context.get('buffered_responses')
+            responses = answer_buffer.merge_responses(obj, responses, None if buffered is None else buffered.get(obj.id, []))
+        return UserResponseSerializer(responses, many=True).data
+
+
+class ArchivedAttemptSerializer(serializers.ModelSerializer):
+    # The full attempt is only read from its archive file on the detail endpoint
+    quiz_title = serializers.CharField(source='quiz.title', read_only=True)
+    percentage_score = serializers.ReadOnlyField()
+    archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedAttempt
+        fields = ['id', 'quiz', 'quiz_title', 'started_at', 'completed_at', 'score', 'total_points', 'percentage_score', 'archived']
+        read_only_fields = fields
 
+    def get_archived(self, obj):
+        return True
 
-    
\ No newline at end of file
+
+class UserQuizProgressSerializer(serializers.ModelSerializer):
+    quiz_title = serializers.CharField(source='quiz.title', read_only=True)
+    max_attempts = serializers.IntegerField(source='quiz.max_attempts', read_only=True)
+    attempts_left = serializers.ReadOnlyField()
+    in_progress_attempt = serializers.PrimaryKeyRelatedField(source='in_progress', read_only=True)
+
+    class Meta:
+        model = UserQuizProgress
+        fields = ['quiz', 'quiz_title', 'attempts_completed', 'max_attempts', 'attempts_left', 'in_progress_attempt', 'best_score', 'best_percentage', 'last_completed_at']
+        read_only_fields = fields
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'task', 'status', 'attempts', 'max_attempts', 'progress', 'progress_message', 'result', 'run_at', 'created_at', 'finished_at']
+        read_only_fields = fields
@@ -0,0 +1,70 @@
+import atexit
+
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import catalog, events, search
+from .models import Answer, Question, Quiz
+
+
+def _deleted_with(origin, model):
+    """Whether a delete started from ``model``, an instance or a queryset, and cascaded to the current row."""
+    return (origin.model if isinstance(origin, QuerySet) else type(origin)) is model
+
+
+@receiver(post_save, sender=Quiz)
+def index_saved_quiz(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_quizzes([instance.pk])
+
+
+@receiver(post_delete, sender=Quiz)
+def unindex_deleted_quiz(sender, instance, **kwargs):
+    search.remove_quizzes([instance.pk])
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def reindex_question_quiz(sender, instance, raw=False, origin=None, **kwargs):
+    # A deleted quiz's document is removed once, not rebuilt per question
+    if not raw and not _deleted_with(origin, Quiz):
+        search.index_quizzes([instance.quiz_id])
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def touch_question_quiz(sender, instance, raw=False, origin=None, **kwargs):
+    # Moves Quiz.content_version forward so cached quiz content is rebuilt
+    if not raw and not _deleted_with(origin, Quiz):
+        Quiz.objects.filter(pk=instance.quiz_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def touch_answer_quiz(sender, instance, raw=False, origin=None, **kwargs):
+    # Answers deleted with their question or quiz are covered by the question's own touch
+    if not raw and not _deleted_with(origin, Quiz) and not _deleted_with(origin, Question):
+        Quiz.objects.filter(questions=instance.question_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def refresh_catalog(sender, instance, raw=False, **kwargs):
+    # After commit, so the refresh sees the change
+    if not raw:
+        transaction.on_commit(catalog.invalidate)
+
+
+@receiver(request_finished)
+def flush_attempt_events(sender, **kwargs):
+    # Runs once the response has been sent, so batches are never written on the request path
+    events.flush_if_due()
+
+
+atexit.register(events.flush)
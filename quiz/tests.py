@@ -1,12 +1,12 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from datetime import timedelta
-from .models import Quiz, Question, Answer, QuizAttempt, UserAnswer
+from .models import Quiz, Question, Answer, QuizAttempt, UserResponse
 
 
 class QuizAPITestCase(APITestCase):
@@ -543,6 +543,2034 @@ class QuizPerformanceTests(QuizAPITestCase):
             for answer in question['answers']:
                 self.assertNotIn('is_correct', answer)
 
+
+
+class AttemptAPITestCase(APITestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='creator', email='creator@example.com', password='testpass123')
+        self.student = User.objects.create_user(username='student', email='student@example.com', password='testpass123')
+
+        self.quiz = Quiz.objects.create(title='Attempt Quiz', description='Scoring tests', creator=self.creator, time_limit=30, max_attempts=3)
+        self.question1 = Question.objects.create(quiz=self.quiz, question_text='What is 2 + 2?', question_type='MC', points=10, order=1)
+        self.question2 = Question.objects.create(quiz=self.quiz, question_text='The sky is blue?', question_type='TF', points=5, order=2)
+
+        self.wrong1 = Answer.objects.create(question=self.question1, answer_text='3', is_correct=False, order=1)
+        self.right1 = Answer.objects.create(question=self.question1, answer_text='4', is_correct=True, order=2)
+        self.right2 = Answer.objects.create(question=self.question2, answer_text='True', is_correct=True, order=1)
+        self.wrong2 = Answer.objects.create(question=self.question2, answer_text='False', is_correct=False, order=2)
+
+        self.client.force_authenticate(self.student)
+        # Buffered events must not outlive the test's transaction
+        from . import events, versions
+        self.addCleanup(events.discard)
+        # Version ids are reused once each test's transaction is rolled back
+        self.addCleanup(versions.clear_cache)
+        from . import throttling
+        self.addCleanup(throttling.reset)
+
+    def start(self, quiz=None):
+        response = self.client.post(reverse('start-quiz', args=[(quiz or self.quiz).id]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()['attempt_id']
+
+    def submit(self, attempt_id, question, answer):
+        url = reverse('submit-answer', args=[attempt_id])
+        return self.client.post(url, {'question_id': question.id, 'answer_id': answer.id}, format='json')
+
+    def complete(self, attempt_id):
+        return self.client.post(reverse('complete-quiz', args=[attempt_id]))
+
+
+@override_settings(QUIZ_BUFFER_ANSWERS=True, QUIZ_ANSWER_BUFFER_CACHE='default')
+class AnswerBufferTests(AttemptAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_answers_are_buffered_until_completion(self):
+        attempt_id = self.start()
+        self.submit(attempt_id, self.question1, self.wrong1)
+        response = self.submit(attempt_id, self.question1, self.right1)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.submit(attempt_id, self.question2, self.wrong2)
+
+        self.assertFalse(UserResponse.objects.filter(attempt_id=attempt_id).exists())
+
+        response = self.complete(attempt_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['score'], 10)
+        self.assertEqual(response.data['total_points'], 15)
+        self.assertEqual(UserResponse.objects.filter(attempt_id=attempt_id).count(), 2)
+
+    def test_attempt_detail_shows_buffered_answers(self):
+        attempt_id = self.start()
+        self.submit(attempt_id, self.question2, self.right2)
+
+        response = self.client.get(reverse('attempt-detail', args=[attempt_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['responses']), 1)
+        self.assertEqual(response.data['responses'][0]['selected_answer']['id'], self.right2.id)
+        self.assertTrue(response.data['responses'][0]['is_correct'])
+
+    @override_settings(QUIZ_ANSWER_BUFFER_CHECKPOINT=0)
+    def test_checkpoint_flushes_without_clearing_buffer(self):
+        attempt_id = self.start()
+        self.submit(attempt_id, self.question1, self.right1)
+        self.submit(attempt_id, self.question2, self.right2)
+
+        self.assertEqual(UserResponse.objects.filter(attempt_id=attempt_id).count(), 2)
+        self.assertEqual(self.complete(attempt_id).data['score'], 15)
+
+    @override_settings(QUIZ_ANSWER_BUFFER_CHECKPOINT=0)
+    def test_checkpoint_updates_answer_time(self):
+        attempt_id = self.start()
+        self.submit(attempt_id, self.question1, self.wrong1)
+        self.submit(attempt_id, self.question2, self.right2)
+        earlier = timezone.now() - timedelta(hours=1)
+        UserResponse.objects.filter(attempt_id=attempt_id).update(answered_at=earlier)
+
+        self.submit(attempt_id, self.question1, self.right1)
+        changed = UserResponse.objects.get(attempt_id=attempt_id, question=self.question1)
+        self.assertEqual(changed.selected_answer, self.right1)
+        self.assertGreater(changed.answered_at, earlier)
+
+    def test_attempt_list_reads_buffer_once(self):
+        from unittest import mock
+        from django.core.cache import cache
+        self.submit(self.start(), self.question1, self.right1)
+        other_quiz = Quiz.objects.create(title='Other Quiz', creator=self.creator)
+        other_question = Question.objects.create(quiz=other_quiz, question_text='Sure?', question_type='TF', points=1, order=1)
+        other_answer = Answer.objects.create(question=other_question, answer_text='Yes', is_correct=True)
+        self.submit(self.start(other_quiz), other_question, other_answer)
+
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            response = self.client.get(reverse('my-attempts'))
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual([len(attempt['responses']) for attempt in response.data], [1, 1])
+
+
+class AttemptDeadlineTests(AttemptAPITestCase):
+
+    def expire(self, attempt_id):
+        QuizAttempt.objects.filter(id=attempt_id).update(deadline=timezone.now() - timedelta(minutes=5))
+
+    def test_deadline_set_from_time_limit(self):
+        attempt = QuizAttempt.objects.get(id=self.start())
+        self.assertAlmostEqual((attempt.deadline - attempt.started_at).total_seconds(), 30 * 60, delta=5)
+
+    def test_time_limit_exceeded(self):
+        attempt_id = self.start()
+        self.submit(attempt_id, self.question1, self.right1)
+        self.expire(attempt_id)
+
+        response = self.submit(attempt_id, self.question2, self.right2)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Time limit exceeded', str(response.data))
+
+        attempt = QuizAttempt.objects.get(id=attempt_id)
+        self.assertEqual(attempt.completed_at, attempt.deadline)
+        self.assertEqual(attempt.score, 10)
+
+    def test_expired_attempt_does_not_block_new_start(self):
+        attempt_id = self.start()
+        self.expire(attempt_id)
+
+        self.assertNotEqual(self.start(), attempt_id)
+        self.assertTrue(QuizAttempt.objects.get(id=attempt_id).is_completed)
+
+    def test_expired_attempt_that_cannot_be_closed_gives_up(self):
+        from unittest import mock
+        attempt_id = self.start()
+        self.expire(attempt_id)
+
+        with mock.patch('quiz.scoring.complete_attempts') as complete_attempts:
+            response = self.client.post(reverse('start-quiz', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(complete_attempts.call_count, 3)
+        self.assertEqual(QuizAttempt.objects.filter(quiz=self.quiz).count(), 1)
+
+    def test_expire_attempts_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        expired_id = self.start()
+        self.submit(expired_id, self.question2, self.right2)
+        self.expire(expired_id)
+        other_quiz = Quiz.objects.create(title='Open Quiz', creator=self.creator, time_limit=30)
+        open_id = self.start(other_quiz)
+
+        call_command('expire_attempts', '--batch-size', '1', stdout=StringIO())
+
+        expired = QuizAttempt.objects.get(id=expired_id)
+        self.assertEqual((expired.score, expired.total_points), (5, 15))
+        self.assertFalse(QuizAttempt.objects.get(id=open_id).is_completed)
+
+
+class RegradeTests(AttemptAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        attempt_id = self.start()
+        self.submit(attempt_id, self.question1, self.wrong1)
+        self.submit(attempt_id, self.question2, self.right2)
+        self.complete(attempt_id)
+        self.attempt = QuizAttempt.objects.get(id=attempt_id)
+
+        # The creator fixes the answer key: "3" is now the accepted answer
+        Answer.objects.filter(id=self.wrong1.id).update(is_correct=True)
+        Answer.objects.filter(id=self.right1.id).update(is_correct=False)
+
+    def test_regrade_updates_responses_and_scores(self):
+        self.assertEqual(self.attempt.score, 5)
+
+        self.client.force_authenticate(self.creator)
+        response = self.client.post(reverse('regrade-quiz', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['responses_regraded'], 2)
+        self.assertEqual(response.data['attempts_rescored'], 1)
+
+        self.attempt.refresh_from_db()
+        self.assertEqual((self.attempt.score, self.attempt.total_points), (15, 15))
+        self.assertTrue(UserResponse.objects.get(attempt=self.attempt, question=self.question1).is_correct)
+
+    def test_regrade_requires_creator(self):
+        response = self.client.post(reverse('regrade-quiz', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_regrade_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        call_command('regrade', str(self.quiz.id), '--chunk-size', '1', stdout=StringIO())
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.score, 15)
+
+    def test_responses_are_regraded_in_chunks(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .scoring import regrade_quiz
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(regrade_quiz(self.quiz, chunk_size=1), (2, 1))
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "quiz_userresponse"')]
+        self.assertEqual(len(updates), 2)
+        self.assertTrue(UserResponse.objects.get(attempt=self.attempt, question=self.question1).is_correct)
+
+
+class ShortAnswerMatcherTests(TestCase):
+
+    def test_normalization_rules(self):
+        from .grading import ShortAnswerMatcher
+
+        matcher = ShortAnswerMatcher(['New York City'])
+        self.assertTrue(matcher.matches('  new   york city!'))
+        self.assertFalse(matcher.matches('New York'))
+
+        strict = ShortAnswerMatcher(['Paris'], case_sensitive=True, ignore_punctuation=False)
+        self.assertTrue(strict.matches('Paris'))
+        self.assertFalse(strict.matches('paris'))
+        self.assertFalse(strict.matches('Paris.'))
+
+    def test_numeric_tolerance(self):
+        from .grading import ShortAnswerMatcher
+
+        matcher = ShortAnswerMatcher(['3.14'], numeric_tolerance=0.01)
+        self.assertTrue(matcher.matches('3.1416'))
+        self.assertTrue(matcher.matches('3.13'))
+        self.assertFalse(matcher.matches('3.2'))
+
+    def test_numbers_are_not_matched_as_text(self):
+        from .grading import ShortAnswerMatcher, parse_number
+
+        pi = ShortAnswerMatcher(['3.14'], numeric_tolerance=0.01)
+        self.assertFalse(pi.matches('314'))
+        self.assertFalse(pi.matches('-3.14'))
+        self.assertFalse(pi.matches('3,14'))
+        self.assertFalse(ShortAnswerMatcher(['3.14']).matches('314'))
+
+        negative = ShortAnswerMatcher(['-5'])
+        self.assertTrue(negative.matches(' -5 '))
+        self.assertFalse(negative.matches('5'))
+        self.assertFalse(ShortAnswerMatcher(['5']).matches('-5'))
+
+        self.assertIsNone(parse_number('1,5'))
+        self.assertEqual(parse_number('1,500.5'), 1500.5)
+        self.assertIsNone(parse_number('nan'))
+
+    def test_bounded_edit_distance(self):
+        from .grading import ShortAnswerMatcher, within_edit_distance
+
+        self.assertTrue(within_edit_distance('kitten', 'sitting', 3))
+        self.assertFalse(within_edit_distance('kitten', 'sitting', 2))
+        self.assertTrue(within_edit_distance('', 'ab', 2))
+
+        matcher = ShortAnswerMatcher(['photosynthesis'], max_edit_distance=2)
+        self.assertTrue(matcher.matches('photosynthesys'))
+        self.assertFalse(matcher.matches('photography'))
+
+
+class ShortAnswerGradingTests(AttemptAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.short = Question.objects.create(quiz=self.quiz, question_text='Capital of France?', question_type='SA', points=20, order=3, max_edit_distance=1)
+        Answer.objects.create(question=self.short, answer_text='Paris', is_correct=True)
+
+    def submit_text(self, attempt_id, text):
+        url = reverse('submit-answer', args=[attempt_id])
+        return self.client.post(url, {'question_id': self.short.id, 'text_answer': text}, format='json')
+
+    def test_short_answer_is_scored(self):
+        attempt_id = self.start()
+        self.assertEqual(self.submit_text(attempt_id, 'paris ').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.complete(attempt_id).data['score'], 20)
+
+    def test_accepted_answers_are_hidden(self):
+        response = self.client.get(reverse('quiz-detail', args=[self.quiz.id]))
+        short = [question for question in response.data['questions'] if question['id'] == self.short.id][0]
+        self.assertEqual(short['answers'], [])
+
+    def test_create_short_answer_question(self):
+        self.client.force_authenticate(self.creator)
+        url = reverse('question-create', args=[self.quiz.id])
+        data = {
+            'question_text': 'Value of pi?', 'question_type': 'SA', 'order': 4, 'numeric_tolerance': 0.01,
+            'answers': [{'answer_text': '3.14', 'is_correct': True}],
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        data['answers'] = [{'answer_text': '3.14', 'is_correct': False}]
+        data['order'] = 5
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_regrade_grades_short_answers(self):
+        attempt_id = self.start()
+        self.submit_text(attempt_id, 'Lyon')
+        self.complete(attempt_id)
+        Answer.objects.create(question=self.short, answer_text='Lyon', is_correct=True)
+
+        from .scoring import regrade_quiz
+        regrade_quiz(self.quiz)
+        self.assertEqual(QuizAttempt.objects.get(id=attempt_id).score, 20)
+
+
+class QuizSearchTests(AttemptAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.python = Quiz.objects.create(title='Python Basics', description='Lists and dicts', creator=self.creator)
+        self.history = Quiz.objects.create(title='World History', description='Empires', creator=self.creator)
+        Question.objects.create(quiz=self.history, question_text='Who wrote about Python generators?', order=1)
+        Quiz.objects.create(title='Python Internals', description='Hidden', creator=self.creator, is_active=False)
+
+    def search(self, term):
+        response = self.client.get(reverse('quiz-list-create'), {'search': term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [quiz['title'] for quiz in response.data['results']]
+
+    def test_search_ranks_title_matches_first(self):
+        self.assertEqual(self.search('python'), ['Python Basics', 'World History'])
+        self.assertEqual(self.search('NonExistent'), [])
+
+    def test_search_follows_edits_and_deletes(self):
+        self.python.title = 'Ruby Basics'
+        self.python.save()
+        self.assertEqual(self.search('ruby'), ['Ruby Basics'])
+
+        self.history.questions.all().delete()
+        self.assertEqual(self.search('generators'), [])
+
+    def test_search_is_paginated(self):
+        response = self.client.get(reverse('quiz-list-create'), {'search': 'python', 'page_size': 1})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_search_input_is_not_fts_syntax(self):
+        self.assertEqual(self.search('"python*('), ['Python Basics', 'World History'])
+
+
+class QuestionPoolTests(AttemptAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for order in range(3, 11):
+            question = Question.objects.create(quiz=self.quiz, question_text=f'Pool question {order}?', question_type='TF', points=order, order=order)
+            Answer.objects.create(question=question, answer_text='True', is_correct=True, order=1)
+            Answer.objects.create(question=question, answer_text='False', is_correct=False, order=2)
+        self.quiz.question_pool_size = 4
+        self.quiz.save()
+
+    def test_id_encoding_round_trip(self):
+        from .pools import decode_ids, encode_ids
+
+        ids = [3, 1, 300, 2 ** 40, 127, 128]
+        self.assertEqual(decode_ids(encode_ids(ids)), sorted(ids))
+        self.assertLess(len(encode_ids(range(1000, 1100))), 110)
+
+    def test_attempt_draws_pool(self):
+        response = self.client.post(reverse('start-quiz', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        drawn = {question['id'] for question in response.json()['quiz']['questions']}
+        self.assertEqual(len(drawn), 4)
+
+        attempt = QuizAttempt.objects.get(id=response.json()['attempt_id'])
+        self.assertEqual(set(attempt.drawn_question_ids), drawn)
+
+        other = self.quiz.questions.exclude(id__in=drawn).first()
+        submit = self.client.post(reverse('submit-answer', args=[attempt.id]), {'question_id': other.id, 'answer_id': other.answers.first().id}, format='json')
+        self.assertEqual(submit.status_code, status.HTTP_400_BAD_REQUEST)
+
+        expected_total = sum(Question.objects.filter(id__in=drawn).values_list('points', flat=True))
+        self.assertEqual(self.complete(attempt.id).data['total_points'], expected_total)
+
+    def test_cached_question_ids_follow_quiz_changes(self):
+        from .pools import question_ids
+
+        self.assertEqual(len(question_ids(self.quiz)), 10)
+        Question.objects.create(quiz=self.quiz, question_text='Added later?', order=11)
+        self.quiz.refresh_from_db()
+        self.assertEqual(len(question_ids(self.quiz)), 11)
+
+
+class AttemptShuffleTests(AttemptAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for order in range(3, 11):
+            question = Question.objects.create(quiz=self.quiz, question_text=f'Question {order}?', question_type='MC', points=1, order=order)
+            for answer_order in range(1, 5):
+                Answer.objects.create(question=question, answer_text=f'Option {answer_order}', is_correct=answer_order == 1, order=answer_order)
+        self.quiz.shuffle_questions = True
+        self.quiz.shuffle_answers = True
+        self.quiz.save()
+
+    def paper(self, attempt_id):
+        response = self.client.get(reverse('attempt-questions', args=[attempt_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['quiz']['questions']
+
+    def test_reloading_reproduces_order(self):
+        response = self.client.post(reverse('start-quiz', args=[self.quiz.id]))
+        started = response.json()['quiz']['questions']
+        self.assertEqual(self.paper(response.json()['attempt_id']), started)
+        self.assertEqual(sorted(question['id'] for question in started), list(self.quiz.questions.values_list('id', flat=True)))
+
+    def test_seed_determines_order(self):
+        attempt_id = self.start()
+        QuizAttempt.objects.filter(id=attempt_id).update(shuffle_seed=1)
+        first = self.paper(attempt_id)
+        QuizAttempt.objects.filter(id=attempt_id).update(shuffle_seed=2)
+        second = self.paper(attempt_id)
+
+        self.assertNotEqual([question['id'] for question in first], [question['id'] for question in second])
+        for question in first:
+            self.assertCountEqual([answer['id'] for answer in question['answers']], Answer.objects.filter(question_id=question['id']).values_list('id', flat=True))
+
+    def test_toggling_shuffle_keeps_started_papers(self):
+        attempt_id = self.start()
+        first = self.paper(attempt_id)
+        self.quiz.shuffle_questions = self.quiz.shuffle_answers = False
+        self.quiz.save()
+        self.assertEqual(self.paper(attempt_id), first)
+        self.complete(attempt_id)
+        self.assertEqual(self.paper(self.start()), [dict(question, answers=sorted(question['answers'], key=lambda answer: answer['order'])) for question in sorted(first, key=lambda question: question['order'])])
+
+    def test_unshuffled_quiz_keeps_order(self):
+        self.quiz.shuffle_questions = self.quiz.shuffle_answers = False
+        self.quiz.save()
+        attempt_id = self.start()
+        self.assertIsNone(QuizAttempt.objects.get(id=attempt_id).shuffle_seed)
+        self.assertEqual([question['id'] for question in self.paper(attempt_id)], list(self.quiz.questions.values_list('id', flat=True)))
+
+
+class TakeQuizTests(AttemptAPITestCase):
+
+    def test_take_quiz_hides_correct_answers(self):
+        response = self.client.get(reverse('quiz-take', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['total_questions'], 2)
+        self.assertEqual(data['total_points'], 15)
+        for question in data['questions']:
+            for answer in question['answers']:
+                self.assertNotIn('is_correct', answer)
+        self.assertEqual([answer['id'] for answer in data['questions'][0]['answers']], [self.wrong1.id, self.right1.id])
+
+    def test_paper_is_rendered_once_per_version(self):
+        url = reverse('quiz-take', args=[self.quiz.id])
+        first = self.client.get(url)
+        # One query to load the quiz, none to serialize it again
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).content, first.content)
+
+        self.question1.question_text = 'What is 2 + 3?'
+        self.question1.save()
+        self.assertIn(b'What is 2 + 3?', self.client.get(url).content)
+
+    def test_not_modified_when_etag_matches(self):
+        url = reverse('quiz-take', args=[self.quiz.id])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_start_serves_paper(self):
+        response = self.client.post(reverse('start-quiz', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.json()
+        self.assertIn('attempt_id', data)
+        self.assertEqual([question['id'] for question in data['quiz']['questions']], [self.question1.id, self.question2.id])
+
+
+class BatchSubmitTests(AttemptAPITestCase):
+
+    def test_submit_answers_in_one_request(self):
+        attempt_id = self.start()
+        url = reverse('submit-answers', args=[attempt_id])
+        data = {'answers': [
+            {'question_id': self.question1.id, 'answer_id': self.wrong1.id},
+            {'question_id': self.question2.id, 'answer_id': self.right2.id},
+            {'question_id': self.question1.id, 'answer_id': self.right1.id},
+        ]}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['submitted'], 2)
+        self.assertEqual(self.complete(attempt_id).data['score'], 15)
+
+    def test_invalid_item_rejects_batch(self):
+        attempt_id = self.start()
+        url = reverse('submit-answers', args=[attempt_id])
+        data = {'answers': [
+            {'question_id': self.question1.id, 'answer_id': self.right1.id},
+            {'question_id': self.question2.id, 'answer_id': self.right1.id},
+        ]}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UserResponse.objects.filter(attempt_id=attempt_id).exists())
+
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+@override_settings(REST_FRAMEWORK={
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer', 'quiz.renderers.MessagePackRenderer'],
+    'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser', 'quiz.renderers.MessagePackParser'],
+    'TEST_REQUEST_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer', 'quiz.renderers.MessagePackRenderer'],
+})
+class MessagePackTests(AttemptAPITestCase):
+
+    def setUp(self):
+        if msgpack is None:
+            self.skipTest('msgpack is not installed')
+        super().setUp()
+
+    def get_msgpack(self, url):
+        response = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        return msgpack.unpackb(response.content, raw=False)
+
+    def test_quiz_detail_as_msgpack(self):
+        data = self.get_msgpack(reverse('quiz-detail', args=[self.quiz.id]))
+        self.assertEqual(data['title'], 'Attempt Quiz')
+        self.assertEqual(len(data['questions']), 2)
+
+    def test_take_quiz_as_msgpack(self):
+        data = self.get_msgpack(reverse('quiz-take', args=[self.quiz.id]))
+        self.assertEqual(data['total_points'], 15)
+
+    @override_settings(QUIZ_CATALOG_BACKGROUND_REFRESH=False)
+    def test_catalog_etag_depends_on_the_format(self):
+        from . import catalog
+        catalog.reset()
+        self.addCleanup(catalog.reset)
+        self.client.force_authenticate(None)
+        etag = self.client.get(reverse('quiz-catalog'))['ETag']
+        response = self.client.get(reverse('quiz-catalog'), HTTP_ACCEPT='application/msgpack', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(msgpack.unpackb(response.content)['count'], 1)
+
+    def test_batch_answers_in_msgpack(self):
+        attempt_id = self.start()
+        body = msgpack.packb({'answers': [{'question_id': self.question1.id, 'answer_id': self.right1.id}]})
+        response = self.client.post(reverse('submit-answers', args=[attempt_id]), body, content_type='application/msgpack', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(msgpack.unpackb(response.content)['submitted'], 1)
+
+    def test_malformed_msgpack_is_bad_request(self):
+        attempt_id = self.start()
+        response = self.client.post(reverse('submit-answers', args=[attempt_id]), b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CompressionTests(AttemptAPITestCase):
+
+    def setUp(self):
+        from django.core.cache import cache
+        super().setUp()
+        cache.clear()
+        for order in range(3, 40):
+            Question.objects.create(quiz=self.quiz, question_text=f'Filler question number {order}?', question_type='TF', points=1, order=order)
+
+    def take(self, accept_encoding):
+        return self.client.get(reverse('quiz-take', args=[self.quiz.id]), HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    def test_large_response_is_gzipped(self):
+        import gzip
+        import json
+        response = self.take('gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['questions']), 39)
+
+    def test_refused_encoding_is_not_used(self):
+        response = self.take('gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json()['total_questions'], 39)
+
+    @override_settings(QUIZ_COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_response_is_not_compressed(self):
+        self.assertFalse(self.take('gzip').has_header('Content-Encoding'))
+
+    def test_compressed_paper_is_cached(self):
+        from .middleware import compression_stats
+        first = self.take('gzip')
+        second = self.take('gzip')
+        self.assertEqual(first.content, second.content)
+        self.assertIn('gzip cached', second['Server-Timing'])
+        self.assertGreaterEqual(compression_stats()['gzip']['cache_hits'], 1)
+
+    def test_cached_body_is_per_host(self):
+        import gzip
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .middleware import CompressionMiddleware
+
+        middleware = CompressionMiddleware(lambda request: HttpResponse(request.build_absolute_uri() * 200, content_type='application/json', headers={'ETag': '"same"'}))
+        factory = RequestFactory()
+        for host in ['a.example.com', 'b.example.com']:
+            with self.settings(ALLOWED_HOSTS=[host]):
+                response = middleware(factory.get('/api/catalog/', HTTP_HOST=host, HTTP_ACCEPT_ENCODING='gzip'))
+            self.assertEqual(gzip.decompress(response.content), f'http://{host}/api/catalog/'.encode() * 200)
+
+    def test_cached_body_is_per_url(self):
+        import gzip
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .middleware import CompressionMiddleware
+
+        # Different bodies under the same ETag, as two catalog pages of one snapshot once had
+        middleware = CompressionMiddleware(lambda request: HttpResponse(request.get_full_path() * 200, content_type='application/json', headers={'ETag': '"same"'}))
+        factory = RequestFactory()
+        for path in ['/api/catalog/?page=1', '/api/catalog/?page=2', '/api/catalog/?page=1']:
+            response = middleware(factory.get(path, HTTP_ACCEPT_ENCODING='gzip'))
+            self.assertEqual(gzip.decompress(response.content), path.encode() * 200)
+
+    def test_compression_metrics_are_staff_only(self):
+        self.take('gzip')
+        url = reverse('compression-metrics')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.creator.is_staff = True
+        self.creator.save()
+        self.client.force_authenticate(self.creator)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='identity')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(response.json()['gzip']['ratio'], 1)
+
+
+class AdminChangelistTests(AttemptAPITestCase):
+    changelists = ['quiz', 'question', 'answer', 'quizattempt', 'userresponse', 'job', 'quizversion', 'archivedattempt']
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='testpass123')
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        from .versions import publish
+        offset = Quiz.objects.count()
+        for n in range(offset, offset + count):
+            user = User.objects.create_user(username=f'admin-row-{n}')
+            quiz = Quiz.objects.create(title=f'Admin quiz {n}', creator=user)
+            question = Question.objects.create(quiz=quiz, question_text='Pick one', question_type='MC', points=2, order=1)
+            answer = Answer.objects.create(question=question, answer_text='Only', is_correct=True, order=1)
+            attempt = QuizAttempt.objects.create(user=user, quiz=quiz, version=publish(quiz))
+            UserResponse.objects.create(attempt=attempt, question=question, selected_answer=answer)
+
+    def changelist_queries(self, model):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:quiz_{model}_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_rows(2)
+        baseline = {model: self.changelist_queries(model) for model in self.changelists}
+        self.add_rows(10)
+        for model in self.changelists:
+            with self.subTest(model=model):
+                self.assertEqual(self.changelist_queries(model), baseline[model])
+
+    def test_quiz_totals_are_annotated(self):
+        response = self.client.get(reverse('admin:quiz_quiz_changelist'))
+        quiz = next(quiz for quiz in response.context['cl'].result_list if quiz.pk == self.quiz.pk)
+        self.assertEqual((quiz.question_count, quiz.point_total), (2, 15))
+
+    def test_filter_by_quiz_id_without_listing_quizzes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.add_rows(2)
+        url = reverse('admin:quiz_answer_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'question__quiz': self.quiz.id, 'is_correct__exact': 1})
+        self.assertNotIn('DISTINCT', ' '.join(query['sql'] for query in queries))
+        self.assertEqual([answer.pk for answer in response.context['cl'].result_list], [self.right2.pk, self.right1.pk])
+        self.assertContains(response, '<input type="hidden" name="is_correct__exact" value="1">', html=True)
+
+        response = self.client.get(url, {'question__quiz': 'x'})
+        self.assertRedirects(response, f'{url}?e=1', fetch_redirect_response=False)
+
+    def test_exact_count_below_estimate_limit(self):
+        from .pagination import EstimatedCountPaginator
+        self.assertEqual(EstimatedCountPaginator(Answer.objects.order_by('pk'), 20).count, 4)
+
+
+class ItemAnalysisTests(AttemptAPITestCase):
+
+    def setUp(self):
+        from .analysis import is_available
+        if not is_available():
+            self.skipTest('numpy is not installed')
+        super().setUp()
+        self.client.force_authenticate(self.creator)
+        self.picks = [(self.right1, self.right2), (self.right1, self.right2), (self.wrong1, self.wrong2), (self.right1, self.wrong2)]
+        for picks in self.picks:
+            self.add_attempt(picks)
+
+    def add_attempt(self, picks):
+        started = timezone.now() - timedelta(minutes=5)
+        attempt = QuizAttempt.objects.create(user=self.student, quiz=self.quiz, completed_at=timezone.now())
+        QuizAttempt.objects.filter(id=attempt.id).update(started_at=started)
+        for seconds, answer in zip((10, 25), picks):
+            UserResponse.objects.create(attempt=attempt, question=answer.question, selected_answer=answer, answered_at=started + timedelta(seconds=seconds))
+
+    def report(self):
+        response = self.client.get(reverse('quiz-analysis', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_item_statistics(self):
+        from statistics import correlation
+        report = self.report()
+        q1, q2 = report['questions']
+        self.assertEqual(report['attempts'], 4)
+        self.assertEqual((q1['difficulty'], q2['difficulty']), (0.75, 0.5))
+
+        c1 = [float(first.is_correct) for first, _ in self.picks]
+        c2 = [float(second.is_correct) for _, second in self.picks]
+        self.assertAlmostEqual(q1['discrimination'], correlation(c1, [5 * c for c in c2]), places=4)
+        self.assertAlmostEqual(q2['discrimination'], correlation(c2, [10 * c for c in c1]), places=4)
+
+    def test_distractors_and_time_to_answer(self):
+        q1, q2 = self.report()['questions']
+        counts = {answer['answer_id']: answer['count'] for answer in q1['answers']}
+        self.assertEqual(counts, {self.wrong1.id: 1, self.right1.id: 3})
+        self.assertEqual(q1['time_to_answer'], {'mean_seconds': 10.0, 'median_seconds': 10.0})
+        self.assertEqual(q2['time_to_answer'], {'mean_seconds': 15.0, 'median_seconds': 15.0})
+
+    def test_ungraded_answer_counts_as_incorrect(self):
+        self.add_attempt((self.right1, self.right2))
+        UserResponse.objects.filter(attempt=QuizAttempt.objects.latest('id'), question=self.question1).update(is_correct=None)
+        report = self.report()
+        q1, q2 = report['questions']
+        self.assertEqual((q1['difficulty'], q2['difficulty']), (0.6, 0.6))
+        self.assertIsNotNone(q1['discrimination'])
+        self.assertEqual(report['mean_score'], 9.0)
+
+    def test_report_is_cached_until_an_attempt_completes(self):
+        self.report()
+        QuizAttempt.objects.create(user=self.student, quiz=self.quiz)
+        self.assertEqual(self.report()['attempts'], 4)
+
+        self.add_attempt((self.wrong1, self.wrong2))
+        self.assertEqual(self.report()['attempts'], 5)
+
+    def test_only_creator_can_analyse(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get(reverse('quiz-analysis', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AttemptEventTests(AttemptAPITestCase):
+
+    def take_attempt(self):
+        attempt_id = self.start()
+        self.submit(attempt_id, self.question1, self.wrong1)
+        self.submit(attempt_id, self.question1, self.right1)
+        self.submit(attempt_id, self.question2, self.right2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.complete(attempt_id)
+        return attempt_id
+
+    def test_events_are_buffered_until_flushed(self):
+        from . import events
+        from .models import AttemptEvent
+        attempt_id = self.take_attempt()
+        self.assertFalse(AttemptEvent.objects.exists())
+
+        self.assertEqual(events.flush(), 5)
+        log = list(AttemptEvent.objects.filter(attempt_id=attempt_id).order_by('id'))
+        self.assertEqual([event.kind for event in log], [AttemptEvent.STARTED] + [AttemptEvent.ANSWERED] * 3 + [AttemptEvent.COMPLETED])
+        self.assertEqual(events.decode_started(log[0].payload), (self.quiz.id, self.student.id))
+        self.assertEqual(events.decode_answer(log[1].payload), (self.question1.id, self.wrong1.id, ''))
+
+    @override_settings(QUIZ_EVENT_BATCH_SIZE=2)
+    def test_full_batch_is_flushed_after_the_response(self):
+        from .models import AttemptEvent
+        attempt_id = self.start()
+        self.assertFalse(AttemptEvent.objects.exists())
+        self.submit(attempt_id, self.question1, self.right1)
+        self.assertEqual(AttemptEvent.objects.filter(attempt_id=attempt_id).count(), 2)
+
+    def test_answer_encoding(self):
+        from .events import decode_answer, encode_answer
+        payload = encode_answer(300, None, 'héllo')
+        self.assertEqual(len(payload), 9)
+        self.assertEqual(decode_answer(payload), (300, None, 'héllo'))
+        self.assertEqual(decode_answer(encode_answer(5, 2 ** 40)), (5, 2 ** 40, ''))
+
+    def test_replay_command(self):
+        import json
+        from io import StringIO
+        from django.core.management import call_command
+        from . import events
+        self.take_attempt()
+        events.flush()
+
+        out = StringIO()
+        call_command('replay_events', self.quiz.id, '--json', stdout=out)
+        stats = json.loads(out.getvalue())[str(self.quiz.id)]
+        self.assertEqual({key: stats[key] for key in ('started', 'completed', 'answers', 'changed_answers')},
+                         {'started': 1, 'completed': 1, 'answers': 3, 'changed_answers': 1})
+
+    def test_replay_follows_event_time_not_ids(self):
+        import json
+        from io import StringIO
+        from django.core.management import call_command
+        from . import events
+        from .models import AttemptEvent
+        attempt = QuizAttempt.objects.create(user=self.student, quiz=self.quiz)
+        started_at = timezone.now()
+        # The answer and completion were flushed by one worker before the start by another
+        AttemptEvent.objects.bulk_create([
+            AttemptEvent(attempt=attempt, kind=AttemptEvent.ANSWERED, payload=events.encode_answer(self.question1.id, self.right1.id), created_at=started_at + timedelta(seconds=5)),
+            AttemptEvent(attempt=attempt, kind=AttemptEvent.COMPLETED, created_at=started_at + timedelta(seconds=30)),
+            AttemptEvent(attempt=attempt, kind=AttemptEvent.STARTED, payload=events.encode_started(self.quiz.id, self.student.id), created_at=started_at),
+        ])
+
+        out = StringIO()
+        call_command('replay_events', self.quiz.id, '--json', stdout=out)
+        stats = json.loads(out.getvalue())[str(self.quiz.id)]
+        self.assertEqual({key: stats[key] for key in ('started', 'completed', 'answers', 'mean_duration_seconds')},
+                         {'started': 1, 'completed': 1, 'answers': 1, 'mean_duration_seconds': 30.0})
+
+    @override_settings(QUIZ_EVENT_BATCH_SIZE=2, QUIZ_EVENT_MAX_BUFFERED=2)
+    def test_failed_batch_is_kept_for_a_retry(self):
+        from unittest import mock
+        from django.db import OperationalError
+        from . import events
+        from .models import AttemptEvent
+        attempt_id = self.start()
+        locked = mock.patch.object(AttemptEvent.objects, 'bulk_create', side_effect=OperationalError('database is locked'))
+        with locked, self.assertLogs('quiz.events', 'ERROR'):
+            # The full batch fails after the response, without failing the request
+            self.assertEqual(self.submit(attempt_id, self.question1, self.right1).status_code, status.HTTP_201_CREATED)
+            self.assertEqual(events.pending(), 2)
+            # Not retried by the next request
+            self.assertEqual(self.submit(attempt_id, self.question2, self.right2).status_code, status.HTTP_201_CREATED)
+            self.assertEqual(events.pending(), 3)
+            # The oldest event is dropped over the limit
+            self.assertEqual(events.flush(), 0)
+            self.assertEqual(events.pending(), 2)
+
+        self.assertEqual(events.flush(), 2)
+        self.assertEqual(list(AttemptEvent.objects.values_list('kind', flat=True)), [AttemptEvent.ANSWERED] * 2)
+        self.assertEqual(events.pending(), 0)
+
+
+class JobQueueTests(AttemptAPITestCase):
+
+    def setUp(self):
+        from . import jobs
+        super().setUp()
+        self.calls = []
+
+        @jobs.task('test_flaky')
+        def flaky(job, fail_times=0):
+            self.calls.append(job.attempts)
+            if job.attempts <= fail_times:
+                raise ValueError('flaky failure')
+            job.report(1, 2, 'halfway')
+            return {'attempts': job.attempts}
+
+    def test_background_regrade_reports_status(self):
+        from . import jobs
+        self.client.force_authenticate(self.creator)
+        response = self.client.post(reverse('regrade-quiz', args=[self.quiz.id]) + '?background=1')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.json()['job_id']
+
+        self.assertEqual(self.client.get(reverse('job-detail', args=[job_id])).json()['status'], 'pending')
+        self.assertEqual(jobs.work(once=True), 1)
+
+        data = self.client.get(reverse('job-detail', args=[job_id])).json()
+        self.assertEqual((data['status'], data['progress']), ('succeeded', 1))
+        self.assertEqual(data['result'], {'responses_regraded': 0, 'attempts_rescored': 0})
+
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(reverse('job-detail', args=[job_id])).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_failed_job_is_retried_with_backoff(self):
+        from . import jobs
+        from .models import Job
+        job = jobs.enqueue('test_flaky', max_attempts=2, fail_times=1)
+
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn('flaky failure', job.error)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(jobs.work(once=True), 0)
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.progress_message), (Job.SUCCEEDED, {'attempts': 2}, 'halfway'))
+
+    def test_job_fails_after_max_attempts(self):
+        from . import jobs
+        from .models import Job
+        job = jobs.enqueue('test_flaky', max_attempts=1, fail_times=5)
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_claims_are_exclusive_until_stale(self):
+        from . import jobs
+        from .models import Job
+        job = jobs.enqueue('test_flaky')
+        self.assertEqual([claimed.id for claimed in jobs.claim('worker-a', limit=5)], [job.id])
+        self.assertEqual(jobs.claim('worker-b'), [])
+
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(days=1))
+        reclaimed = jobs.claim('worker-b')
+        self.assertEqual((reclaimed[0].locked_by, reclaimed[0].attempts), ('worker-b', 2))
+
+    def test_stale_job_fails_after_its_last_attempt(self):
+        from . import jobs
+        from .models import Job
+        job = jobs.enqueue('test_flaky', max_attempts=2)
+        for worker in ['worker-a', 'worker-b']:
+            # Each worker dies while running the job
+            self.assertEqual([claimed.id for claimed in jobs.claim(worker)], [job.id])
+            Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(jobs.claim('worker-c'), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.FAILED, 2, ''))
+        self.assertIsNotNone(job.finished_at)
+        self.assertIn('stopped responding', job.error)
+
+
+class AttemptStartConcurrencyTests(APITransactionTestCase):
+
+    def setUp(self):
+        from . import events
+        self.addCleanup(events.discard)
+        self.student = User.objects.create_user(username='student', password='testpass123')
+        creator = User.objects.create_user(username='creator', password='testpass123')
+        self.quiz = Quiz.objects.create(title='Race Quiz', creator=creator, max_attempts=3)
+        Question.objects.create(quiz=self.quiz, question_text='Ready?', question_type='TF', points=1, order=1)
+
+    def start_in_parallel(self, count):
+        import logging
+        import threading
+        import time
+        from unittest import mock
+        from django.db import connection
+        from rest_framework.test import APIClient
+
+        barrier = threading.Barrier(count)
+        codes = []
+
+        def start():
+            # The test client re-raises every exception signalled while its request runs, other
+            # threads' included, so errors are read from each request's own response instead
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(self.student)
+            barrier.wait()
+            try:
+                for _ in range(100):
+                    response = client.post(reverse('start-quiz', args=[self.quiz.id]))
+                    if response.status_code != status.HTTP_500_INTERNAL_SERVER_ERROR:
+                        codes.append(response.status_code)
+                        break
+                    # The in-memory SQLite test database reports lock contention instead of waiting
+                    time.sleep(0.01)
+            finally:
+                connection.close()
+
+        with mock.patch.object(logging.getLogger('django.request'), 'disabled', True):
+
+            threads = [threading.Thread(target=start) for _ in range(count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return codes
+
+    def test_parallel_starts_create_one_attempt(self):
+        codes = self.start_in_parallel(8)
+        self.assertEqual(len(codes), 8)
+        self.assertLessEqual(set(codes), {status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST})
+        self.assertEqual(codes.count(status.HTTP_201_CREATED), 1)
+        self.assertEqual(QuizAttempt.objects.count(), 1)
+        self.assertEqual(QuizAttempt.objects.filter(user=self.student, quiz=self.quiz, completed_at__isnull=True).count(), 1)
+
+    def test_duplicate_open_attempt_is_rejected_by_the_database(self):
+        from django.db import IntegrityError
+        QuizAttempt.objects.create(user=self.student, quiz=self.quiz)
+        with self.assertRaises(IntegrityError):
+            QuizAttempt.objects.create(user=self.student, quiz=self.quiz)
+
+
+class UserQuizProgressTests(AttemptAPITestCase):
+
+    def progress(self):
+        from .models import UserQuizProgress
+        return UserQuizProgress.objects.get(user=self.student, quiz=self.quiz)
+
+    def test_start_and_complete_update_progress(self):
+        attempt_id = self.start()
+        self.assertEqual(self.progress().in_progress_id, attempt_id)
+
+        self.submit(attempt_id, self.question1, self.right1)
+        self.complete(attempt_id)
+        progress = self.progress()
+        self.assertEqual((progress.attempts_completed, progress.in_progress_id), (1, None))
+        self.assertEqual((progress.best_score, progress.best_percentage), (10, 66.67))
+        self.assertIsNotNone(progress.last_completed_at)
+
+        attempt_id = self.start()
+        self.complete(attempt_id)
+        progress = self.progress()
+        self.assertEqual((progress.attempts_completed, progress.best_score), (2, 10))
+
+    def test_attempt_limit_comes_from_progress(self):
+        from .models import UserQuizProgress
+        UserQuizProgress.objects.create(user=self.student, quiz=self.quiz, attempts_completed=3)
+        response = self.client.post(reverse('start-quiz', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('maximum attempts', response.json()['error'])
+
+    def test_expired_attempts_count_towards_progress(self):
+        from .scoring import expire_attempts
+        attempt_id = self.start()
+        QuizAttempt.objects.filter(id=attempt_id).update(deadline=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(expire_attempts(), 1)
+        self.assertEqual((self.progress().attempts_completed, self.progress().in_progress_id), (1, None))
+
+    def test_regrade_rebuilds_best_score(self):
+        attempt_id = self.start()
+        self.submit(attempt_id, self.question1, self.wrong1)
+        self.complete(attempt_id)
+        self.assertEqual(self.progress().best_score, 0)
+
+        Answer.objects.filter(id=self.wrong1.id).update(is_correct=True)
+        self.client.force_authenticate(self.creator)
+        self.client.post(reverse('regrade-quiz', args=[self.quiz.id]))
+        self.assertEqual((self.progress().best_score, self.progress().attempts_completed), (10, 1))
+
+    def test_my_progress_listing(self):
+        self.complete(self.start())
+        response = self.client.get(reverse('my-progress'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [row] = response.json()['results']
+        self.assertEqual((row['quiz'], row['attempts_completed'], row['attempts_left'], row['best_score']), (self.quiz.id, 1, 2, 0))
+class ProvisioningTests(AttemptAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.creator.is_staff = True
+        self.creator.save()
+        fast_hasher = override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+        fast_hasher.enable()
+        self.addCleanup(fast_hasher.disable)
+
+    def provision(self, rows):
+        self.client.force_authenticate(self.creator)
+        return self.client.post(reverse('bulk-provision-users'), {'users': rows}, format='json')
+
+    def test_provisioning_is_staff_only(self):
+        response = self.client.post(reverse('bulk-provision-users'), {'users': [{'username': 'pupil'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(User.objects.filter(username='pupil').exists())
+
+    def test_results_per_row(self):
+        from rest_framework.authtoken.models import Token
+        response = self.provision([
+            {'username': 'pupil1', 'email': 'pupil1@example.com', 'password': 'secret-pass-1', 'first_name': 'Ada'},
+            {'username': 'pupil2'},
+            {'username': 'pupil1'},
+            {'username': self.student.username},
+            {'username': 'pupil3', 'email': 'not-an-email'},
+            {'username': 'bad name!'},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (2, 4))
+        results = data['results']
+        self.assertEqual([result['row'] for result in results], list(range(6)))
+        self.assertEqual([result['status'] for result in results], ['created', 'created', 'error', 'error', 'error', 'error'])
+        self.assertIn('Duplicate', results[2]['errors']['username'][0])
+        self.assertIn('already exists', results[3]['errors']['username'][0])
+        self.assertIn('email', results[4]['errors'])
+        self.assertIn('username', results[5]['errors'])
+
+        pupil1 = User.objects.get(username='pupil1')
+        self.assertEqual((pupil1.id, pupil1.first_name, pupil1.email), (results[0]['id'], 'Ada', 'pupil1@example.com'))
+        self.assertTrue(pupil1.check_password('secret-pass-1'))
+        self.assertNotIn('password', results[0])
+        self.assertEqual(Token.objects.get(user=pupil1).key, results[0]['token'])
+        self.assertEqual(len(results[0]['token']), 40)
+        self.assertTrue(User.objects.get(username='pupil2').check_password(results[1]['password']))
+
+    def test_rows_are_type_checked(self):
+        response = self.provision([
+            {'username': 123},
+            {'username': 'pupil1', 'email': 5},
+            {'username': 'pupil2', 'first_name': {'given': 'Ada'}},
+            {'username': 'pupil3', 'password': ['a']},
+            {'username': 'pupil4', 'last_name': 'x' * 151},
+            {'username': 'pupil5', 'first_name': None},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['error'] * 6)
+        self.assertEqual([list(result['errors']) for result in results], [['username'], ['email'], ['first_name'], ['password'], ['last_name'], ['first_name']])
+        self.assertFalse(User.objects.filter(username__startswith='pupil').exists())
+
+    def test_rejects_bad_payloads(self):
+        self.assertEqual(self.provision([]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.provision(['pupil']).status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(QUIZ_PROVISION_MAX_ROWS=1):
+            response = self.provision([{'username': 'pupil1'}, {'username': 'pupil2'}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.provision([{'username': self.student.username}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['failed'], 1)
+
+    @override_settings(QUIZ_PROVISION_POOL_THRESHOLD=2)
+    def test_large_batches_are_queued(self):
+        from . import jobs
+        from .models import Job
+        response = self.provision([{'username': 'pupil1', 'password': 'secret-pass-1'}, {'username': 'pupil2'}])
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(User.objects.filter(username__startswith='pupil').exists())
+
+        jobs.work(once=True)
+        job = Job.objects.get(id=response.data['job_id'])
+        self.assertEqual((job.status, job.kwargs, job.result['created']), (Job.SUCCEEDED, {}, 2))
+        self.assertTrue(User.objects.get(username='pupil1').check_password('secret-pass-1'))
+        self.assertEqual(self.client.get(response.data['status_url']).json()['result']['results'][1]['username'], 'pupil2')
+
+    @override_settings(QUIZ_PROVISION_POOL_THRESHOLD=0)
+    def test_passwords_hashed_in_process_pool(self):
+        from django.conf import global_settings
+        from .provisioning import provision_users
+        results = provision_users([{'username': f'pooled{i}', 'password': f'pass-{i}'} for i in range(4)], workers=2)
+        self.assertEqual([result['status'] for result in results], ['created'] * 4)
+        # Spawned workers load the project's settings, so they hash with its hashers rather than the fast one
+        with self.settings(PASSWORD_HASHERS=global_settings.PASSWORD_HASHERS):
+            for i, user in enumerate(User.objects.filter(username__startswith='pooled').order_by('id')):
+                self.assertTrue(user.check_password(f'pass-{i}'))
+
+    def test_provision_users_command(self):
+        import csv
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as directory:
+            source, output = os.path.join(directory, 'pupils.csv'), os.path.join(directory, 'results.csv')
+            with open(source, 'w', newline='') as f:
+                f.write('username,email,password,first_name,last_name\n')
+                f.write('pupil1,pupil1@example.com,,Ada,Lovelace\n')
+                f.write(f'{self.student.username},,,,\n')
+            stdout, stderr = StringIO(), StringIO()
+            call_command('provision_users', source, '--output', output, '--workers', '1', stdout=stdout, stderr=stderr)
+            with open(output, newline='') as f:
+                rows = list(csv.DictReader(f))
+
+        self.assertIn('Created 1 users, 1 rows failed', stdout.getvalue())
+        self.assertIn('Row 3', stderr.getvalue())
+        self.assertEqual([row['status'] for row in rows], ['created', 'error'])
+        pupil = User.objects.get(username='pupil1')
+        self.assertEqual(pupil.last_name, 'Lovelace')
+        self.assertTrue(pupil.check_password(rows[0]['password']))
+        self.assertEqual(len(rows[0]['token']), 40)
+
+
+class QuizVersionTests(AttemptAPITestCase):
+
+    def edit_quiz(self):
+        # Rewords a question, swaps the answer key and adds a question
+        self.question1.question_text = 'What is 2 + 1?'
+        self.question1.save()
+        self.right1.is_correct = False
+        self.right1.save()
+        self.wrong1.is_correct = True
+        self.wrong1.save()
+        extra = Question.objects.create(quiz=self.quiz, question_text='Added later', question_type='TF', points=7, order=3)
+        return extra, Answer.objects.create(question=extra, answer_text='True', is_correct=True, order=1)
+
+    def test_attempt_is_pinned_to_its_version(self):
+        response = self.client.post(reverse('start-quiz', args=[self.quiz.id]))
+        attempt_id, version = response.json()['attempt_id'], response.json()['version']
+        self.assertEqual(version, 1)
+        extra, extra_answer = self.edit_quiz()
+
+        paper = self.client.get(reverse('attempt-questions', args=[attempt_id])).json()['quiz']
+        self.assertEqual([question['question_text'] for question in paper['questions']], ['What is 2 + 2?', 'The sky is blue?'])
+        self.assertEqual(self.submit(attempt_id, extra, extra_answer).status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Graded against the key the attempt started with
+        self.assertEqual(self.submit(attempt_id, self.question1, self.right1).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.submit(attempt_id, self.question2, self.right2).status_code, status.HTTP_201_CREATED)
+        result = self.complete(attempt_id).json()
+        self.assertEqual((result['score'], result['total_points']), (15, 15))
+
+        response = self.client.post(reverse('start-quiz', args=[self.quiz.id]))
+        self.assertEqual(response.json()['version'], 2)
+        self.assertEqual(response.json()['quiz']['total_points'], 22)
+
+    def test_publish(self):
+        url = reverse('publish-quiz', args=[self.quiz.id])
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.creator)
+        first = self.client.post(url)
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first.json()['version'], 1)
+
+        # Saving without changes is not a new version
+        self.quiz.save()
+        again = self.client.post(url)
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+        self.assertEqual(again.json()['digest'], first.json()['digest'])
+
+        self.edit_quiz()
+        self.assertEqual(self.client.post(url).json()['version'], 2)
+
+    def test_version_content_is_immutable(self):
+        live = self.client.get(reverse('quiz-take', args=[self.quiz.id])).json()
+        self.client.force_authenticate(self.creator)
+        published = self.client.post(reverse('publish-quiz', args=[self.quiz.id])).json()
+        self.edit_quiz()
+
+        response = self.client.get(published['url'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['ETag'], f'"{published["digest"]}"')
+        self.assertEqual(response.json(), live)
+        self.assertNotIn('is_correct', response.content.decode())
+
+        response = self.client.get(published['url'], HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(reverse('quiz-version', args=[self.quiz.id, 9])).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_grading_does_not_read_live_questions(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        attempt_id = self.start()
+        self.submit(attempt_id, self.question1, self.right1)
+        with CaptureQueriesContext(connection) as queries:
+            self.complete(attempt_id)
+        self.assertFalse([query for query in queries if 'quiz_question' in query['sql'] or 'quiz_answer' in query['sql']])
+
+    def test_regrade_moves_attempts_to_current_version(self):
+        attempt_id = self.start()
+        self.submit(attempt_id, self.question1, self.right1)
+        self.complete(attempt_id)
+        self.edit_quiz()
+
+        self.client.force_authenticate(self.creator)
+        self.client.post(reverse('regrade-quiz', args=[self.quiz.id]))
+        attempt = QuizAttempt.objects.select_related('version').get(id=attempt_id)
+        self.assertEqual(attempt.version.number, 2)
+        self.assertEqual((attempt.score, attempt.total_points), (0, 22))
+
+    def test_quiz_with_versions_can_be_deleted(self):
+        self.complete(self.start())
+        self.quiz.delete()
+        self.assertFalse(QuizAttempt.objects.exists())
+
+
+class ArchiveTests(AttemptAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        import tempfile
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive_root = override_settings(QUIZ_ARCHIVE_ROOT=directory.name)
+        archive_root.enable()
+        self.addCleanup(archive_root.disable)
+
+    def old_attempt(self, answer=None, days=400):
+        attempt_id = self.start()
+        self.submit(attempt_id, self.question1, answer or self.right1)
+        self.complete(attempt_id)
+        QuizAttempt.objects.filter(id=attempt_id).update(completed_at=timezone.now() - timedelta(days=days))
+        return attempt_id
+
+    def archive(self, **kwargs):
+        from .archive import archive_attempts
+        return archive_attempts(timezone.now() - timedelta(days=365), **kwargs)
+
+    def test_old_attempts_are_archived(self):
+        from .archive import root
+        from .models import ArchivedAttempt
+        old = self.old_attempt()
+        recent = self.old_attempt(days=10)
+
+        self.assertEqual(self.archive(), 1)
+        self.assertEqual(list(QuizAttempt.objects.values_list('id', flat=True)), [recent])
+        self.assertFalse(UserResponse.objects.filter(attempt_id=old).exists())
+        summary = ArchivedAttempt.objects.get()
+        self.assertEqual((summary.id, summary.user, summary.score, summary.total_points), (old, self.student, 10, 15))
+        self.assertTrue((root() / summary.archive).exists())
+        self.assertTrue(summary.archive.startswith(f'quiz-{self.quiz.id}/'))
+
+    def test_archived_attempt_is_fetched_lazily(self):
+        attempt_ids = [self.old_attempt(answer) for answer in [self.right1, self.wrong1, self.right1]]
+        # One gzip member per chunk, all in the same monthly file
+        self.assertEqual(self.archive(chunk_size=1), 3)
+        self.question1.question_text = 'Reworded later'
+        self.question1.save()
+
+        listing = self.client.get(reverse('my-attempts'), {'archived': 1}).json()
+        self.assertEqual(sorted(row['id'] for row in listing), attempt_ids)
+        self.assertTrue(all(row['archived'] for row in listing))
+        self.assertEqual(self.client.get(reverse('my-attempts')).json(), [])
+
+        response = self.client.get(reverse('attempt-detail', args=[attempt_ids[1]]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual((data['id'], data['score'], data['archived']), (attempt_ids[1], 0, True))
+        [answer] = data['responses']
+        self.assertEqual((answer['question']['question_text'], answer['selected_answer']['id'], answer['is_correct']), ('What is 2 + 2?', self.wrong1.id, False))
+
+        self.client.force_authenticate(self.creator)
+        self.assertEqual(self.client.get(reverse('attempt-detail', args=[attempt_ids[1]])).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_restore_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import ArchivedAttempt
+        attempt_id = self.old_attempt()
+        started_at = QuizAttempt.objects.get(id=attempt_id).started_at
+        call_command('archive_attempts', '--days', '365', stdout=StringIO())
+        self.assertFalse(QuizAttempt.objects.exists())
+
+        out = StringIO()
+        call_command('restore_attempts', '--quiz', str(self.quiz.id), stdout=out)
+        self.assertIn('Restored 1 attempts', out.getvalue())
+        self.assertFalse(ArchivedAttempt.objects.exists())
+        attempt = QuizAttempt.objects.get(id=attempt_id)
+        self.assertEqual((attempt.score, attempt.total_points, attempt.started_at), (10, 15, started_at))
+        response = attempt.responses.get()
+        self.assertEqual((response.question_id, response.selected_answer_id, response.is_correct), (self.question1.id, self.right1.id, True))
+
+    def test_progress_counts_archived_attempts(self):
+        from .models import UserQuizProgress
+        self.old_attempt()
+        self.archive()
+        self.client.force_authenticate(self.creator)
+        self.client.post(reverse('regrade-quiz', args=[self.quiz.id]))
+        progress = UserQuizProgress.objects.get(user=self.student, quiz=self.quiz)
+        self.assertEqual((progress.attempts_completed, progress.best_score), (1, 10))
+
+    def test_concurrent_appends_get_their_own_members(self):
+        import threading
+        from .archive import _append, _read_member
+        barrier = threading.Barrier(8)
+        offsets = {}
+
+        def append(writer):
+            records = [{'id': writer, 'row': row, 'padding': 'x' * 1000} for row in range(200)]
+            barrier.wait()
+            for chunk in range(5):
+                offsets[writer, chunk] = _append('quiz-1/2020-01.ndjson.gz', records)
+
+        threads = [threading.Thread(target=append, args=[writer]) for writer in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(offsets.values())), 40)
+        for (writer, _), offset in offsets.items():
+            records = _read_member('quiz-1/2020-01.ndjson.gz', offset)
+            self.assertEqual({record['id'] for record in records}, {writer})
+            self.assertEqual(len(records), 200)
+
+
+@override_settings(QUIZ_CATALOG_BACKGROUND_REFRESH=False)
+class CatalogTests(AttemptAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        from . import catalog
+        catalog.reset()
+        self.addCleanup(catalog.reset)
+        Quiz.objects.create(title='Algebra basics', description='Equations', creator=self.creator, time_limit=10)
+        Quiz.objects.create(title='Hidden', creator=self.creator, is_active=False)
+        self.client.force_authenticate(None)
+
+    def get(self, **params):
+        return self.client.get(reverse('quiz-catalog'), params)
+
+    def test_catalog_is_public_and_cacheable(self):
+        response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Cache-Control'].startswith('public'))
+        data = response.json()
+        self.assertEqual([quiz['title'] for quiz in data['results']], ['Algebra basics', 'Attempt Quiz'])
+        attempt_quiz = data['results'][1]
+        self.assertEqual((attempt_quiz['creator'], attempt_quiz['total_questions'], attempt_quiz['total_points']), ('creator', 2, 15))
+        self.assertNotIn('creator@example.com', response.content.decode())
+
+        response = self.client.get(reverse('quiz-catalog'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cache_varies_on_accept(self):
+        from django.utils.cache import has_vary_header
+        first = self.get()
+        not_modified = self.client.get(reverse('quiz-catalog'), HTTP_IF_NONE_MATCH=first['ETag'])
+        for response in [first, not_modified, self.get(page='x')]:
+            self.assertTrue(has_vary_header(response, 'Accept'))
+
+    def test_etag_depends_on_the_query(self):
+        first = self.get(page_size=1)
+        self.assertEqual(self.client.get(reverse('quiz-catalog'), {'page_size': 1}, HTTP_IF_NONE_MATCH=first['ETag']).status_code, status.HTTP_304_NOT_MODIFIED)
+        second = self.client.get(reverse('quiz-catalog'), {'page_size': 1, 'page': 2}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual([quiz['title'] for quiz in second.json()['results']], ['Attempt Quiz'])
+        self.assertNotEqual(self.get(search='algebra')['ETag'], self.get(search='attempt')['ETag'])
+
+    def test_served_without_queries(self):
+        self.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(search='algebra').status_code, status.HTTP_200_OK)
+
+    def test_filters_ordering_and_pages(self):
+        self.assertEqual([quiz['title'] for quiz in self.get(search='EQUATION').json()['results']], ['Algebra basics'])
+        self.assertEqual(self.get(creator='student').json()['count'], 0)
+        self.assertEqual([quiz['title'] for quiz in self.get(max_time_limit=15).json()['results']], ['Algebra basics'])
+        self.assertEqual([quiz['title'] for quiz in self.get(ordering='-title').json()['results']], ['Attempt Quiz', 'Algebra basics'])
+
+        first = self.get(page_size=1).json()
+        self.assertEqual((first['count'], first['previous']), (2, None))
+        second = self.client.get(first['next']).json()
+        self.assertEqual([quiz['title'] for quiz in second['results']], ['Attempt Quiz'])
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.get(page=3, page_size=1).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.get(ordering='creator').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_quiz_changes_refresh_the_snapshot(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Quiz.objects.create(title='New quiz', creator=self.creator)
+            Question.objects.create(quiz=self.quiz, question_text='Another', question_type='TF', points=5, order=3)
+        data = self.get().json()
+        self.assertEqual(data['results'][0]['title'], 'New quiz')
+        self.assertEqual(data['results'][2]['total_points'], 20)
+
+    @override_settings(QUIZ_CATALOG_BACKGROUND_REFRESH=True)
+    def test_stale_snapshot_is_served_while_refreshing(self):
+        from unittest import mock
+        from . import catalog
+        self.get()
+        catalog.invalidate()
+        with mock.patch.object(catalog.threading, 'Thread') as thread:
+            self.assertEqual(self.get().json()['count'], 2)
+        thread.return_value.start.assert_called_once()
+
+
+class LoadTestCommandTests(APITransactionTestCase):
+
+    def setUp(self):
+        fast_hasher = override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+        fast_hasher.enable()
+        self.addCleanup(fast_hasher.disable)
+        from . import versions
+        self.addCleanup(versions.clear_cache)
+
+    def run_loadtest(self, **options):
+        import json
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        # One journey at a time, as the in-memory SQLite test database can't wait for locks
+        call_command('loadtest', users=2, concurrency=1, questions=3, think_time=0, json=True, stdout=out, stderr=StringIO(), **options)
+        return json.loads(out.getvalue())
+
+    def test_journeys_are_reported_per_stage(self):
+        report = self.run_loadtest()
+        self.assertEqual(report['completed'], 2)
+        stages = {row['stage']: row for row in report['stages']}
+        self.assertEqual(list(stages), ['register', 'start', 'answer', 'complete'])
+        self.assertEqual(stages['answer']['requests'], 6)
+        self.assertTrue(all(row['errors'] == 0 and row['lock_errors'] == 0 for row in stages.values()))
+        self.assertEqual(report['failures'], [])
+
+    def test_generated_data_is_deleted(self):
+        report = self.run_loadtest(login=True)
+        self.assertEqual([row['stage'] for row in report['stages']], ['login', 'start', 'answer', 'complete'])
+        self.assertFalse(User.objects.filter(username__startswith='loadtest-').exists())
+        self.assertFalse(Quiz.objects.exists())
+        self.assertFalse(QuizAttempt.objects.exists())
+
+
+# Each test sends far more requests than the default rates allow
+@override_settings(QUIZ_THROTTLE_RATES={})
+class QueryCountTests(APITestCase):
+    """
+    Every endpoint in quiz/urls.py runs the same number of queries at 1, 10
+    and 100 questions, quizzes, attempts or answers, so per-row queries fail here.
+    """
+    SIZES = [1, 10, 100]
+
+    def setUp(self):
+        from . import catalog, events, papers, versions
+        fast_hasher = override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+        fast_hasher.enable()
+        self.addCleanup(fast_hasher.disable)
+        self.creator = User.objects.create_user(username='creator', password='testpass123')
+        self.student = User.objects.create_user(username='student', password='testpass123')
+        self.admin = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_authenticate(self.student)
+        self.caches = [events.discard, versions.clear_cache, papers.clear_cache, catalog.reset]
+        for clear in self.caches:
+            self.addCleanup(clear)
+
+    def clear_caches(self):
+        from django.core.cache import cache
+        cache.clear()
+        for clear in self.caches:
+            clear()
+
+    @staticmethod
+    def template(sql):
+        import re
+        # Literals, savepoint names, IN lists and multi-row VALUES vary between runs of the same statement
+        sql = re.sub(r'"s\d+_x\d+"', '"savepoint"', sql)
+        sql = re.sub(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b", '?', sql)
+        sql = re.sub(r'\(\?(?:, \?)*\)', '(...)', sql)
+        return re.sub(r'VALUES (\([^()]*\))(?:, \([^()]*\))*', r'VALUES \1, ...', sql)
+
+    def assertConstantQueries(self, setup, request, sizes=None):
+        """
+        Call ``request(setup(size))`` at each size, in a savepoint rolled back
+        afterwards, and fail with the statements that repeat more at larger sizes.
+        """
+        from collections import Counter
+        from django.db import connection, transaction
+        from django.test.utils import CaptureQueriesContext
+
+        sizes = sizes or self.SIZES
+        queries = {}
+        # The first run warms up per-process state such as the content type cache
+        for size in sizes[:1] + sizes:
+            self.clear_caches()
+            with transaction.atomic():
+                data = setup(size)
+                with CaptureQueriesContext(connection) as captured:
+                    response = request(data)
+                self.assertLess(response.status_code, 400, getattr(response, 'data', None))
+                transaction.set_rollback(True)
+            queries[size] = [query['sql'] for query in captured.captured_queries]
+
+        counts = {size: len(sqls) for size, sqls in queries.items()}
+        if len(set(counts.values())) > 1:
+            smallest, largest = Counter(map(self.template, queries[sizes[0]])), Counter(map(self.template, queries[sizes[-1]]))
+            repeated = [f'  {smallest[sql]} -> {count}: {sql}' for sql, count in largest.most_common() if count > smallest[sql]]
+            self.fail(f'Queries grow with size {counts}; repeated statements:\n' + '\n'.join(repeated))
+
+    # Data builders
+
+    def quiz(self, questions=2, creator=None, **fields):
+        quiz = Quiz.objects.create(title=f'Quiz with {questions} questions', creator=creator or self.creator, max_attempts=1000, **fields)
+        questions = Question.objects.bulk_create(
+            Question(quiz=quiz, question_text=f'Question {order}', question_type='MC', points=1, order=order)
+            for order in range(1, questions + 1)
+        )
+        Answer.objects.bulk_create(
+            Answer(question=question, answer_text=text, is_correct=text == 'Right', order=order)
+            for question in questions
+            for order, text in enumerate(['Right', 'Wrong'], 1)
+        )
+        quiz.refresh_from_db()
+        return quiz
+
+    def quizzes(self, count, creator=None):
+        return [self.quiz(creator=creator) for _ in range(count)]
+
+    def start(self, quiz):
+        response = self.client.post(reverse('start-quiz', args=[quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return QuizAttempt.objects.get(pk=response.json()['attempt_id'])
+
+    def answer_all(self, attempt):
+        responses = [
+            UserResponse(attempt=attempt, question=question, selected_answer=question.answers.all()[0], is_correct=True)
+            for question in Question.objects.filter(quiz_id=attempt.quiz_id).prefetch_related('answers')
+        ]
+        UserResponse.objects.bulk_create(responses)
+        return attempt
+
+    def answered_attempt(self, questions):
+        return self.answer_all(self.start(self.quiz(questions)))
+
+    def completed_attempts(self, count):
+        attempts = []
+        for quiz in self.quizzes(count):
+            attempt = self.answered_attempt_on(quiz)
+            self.client.post(reverse('complete-quiz', args=[attempt.id]))
+            attempts.append(attempt)
+        return attempts
+
+    def answered_attempt_on(self, quiz):
+        return self.answer_all(self.start(quiz))
+
+    def users(self, count):
+        User.objects.bulk_create(User(username=f'user{index}', password='!') for index in range(count))
+
+    # Authentication
+
+    def test_register(self):
+        self.client.force_authenticate(None)
+        self.assertConstantQueries(self.users, lambda _: self.client.post(reverse('register'), {'username': 'new', 'email': 'new@example.com', 'password': 'pass'}, format='json'))
+
+    def test_login(self):
+        self.client.force_authenticate(None)
+        self.assertConstantQueries(self.users, lambda _: self.client.post(reverse('login'), {'username': 'student', 'password': 'testpass123'}, format='json'))
+
+    def test_logout(self):
+        from rest_framework.authtoken.models import Token
+
+        def setup(size):
+            self.users(size)
+            return Token.objects.create(user=self.student)
+        self.client.force_authenticate(None)
+        self.assertConstantQueries(setup, lambda token: self.client.post(reverse('logout'), HTTP_AUTHORIZATION=f'Token {token.key}'))
+
+    @override_settings(QUIZ_PROVISION_POOL_THRESHOLD=100)
+    def test_bulk_provision_users(self):
+        # Created during the request; larger batches are queued as a job
+        self.client.force_authenticate(self.admin)
+        self.assertConstantQueries(
+            lambda size: [{'username': f'pupil{index}', 'password': 'pass'} for index in range(size)],
+            lambda rows: self.client.post(reverse('bulk-provision-users'), {'users': rows}, format='json'),
+            # SQLite caps the parameters per statement, which bulk_create splits 100 users over two INSERTs
+            sizes=[1, 10, 50],
+        )
+
+    # Quizzes
+
+    def test_quiz_list(self):
+        self.assertConstantQueries(self.quizzes, lambda _: self.client.get(reverse('quiz-list-create'), {'page_size': 100}))
+
+    def test_quiz_search(self):
+        self.assertConstantQueries(self.quizzes, lambda _: self.client.get(reverse('quiz-list-create'), {'search': 'questions', 'page_size': 100}))
+
+    def test_quiz_create(self):
+        self.client.force_authenticate(self.creator)
+        self.assertConstantQueries(self.quizzes, lambda _: self.client.post(reverse('quiz-list-create'), {'title': 'New quiz'}, format='json'))
+
+    def test_catalog(self):
+        self.assertConstantQueries(self.quizzes, lambda _: self.client.get(reverse('quiz-catalog'), {'page_size': 100}))
+
+    def test_quiz_detail(self):
+        self.assertConstantQueries(self.quiz, lambda quiz: self.client.get(reverse('quiz-detail', args=[quiz.id])))
+
+    def test_quiz_update(self):
+        self.client.force_authenticate(self.creator)
+        self.assertConstantQueries(self.quiz, lambda quiz: self.client.patch(reverse('quiz-detail', args=[quiz.id]), {'title': 'Renamed'}, format='json'))
+
+    def test_quiz_delete(self):
+        def setup(size):
+            quiz = self.quiz(size)
+            self.client.force_authenticate(self.student)
+            self.answered_attempt_on(quiz)
+            self.client.force_authenticate(self.creator)
+            return quiz
+        # Django deletes cascaded rows 100 per statement, so stay within one batch of answers
+        self.assertConstantQueries(setup, lambda quiz: self.client.delete(reverse('quiz-detail', args=[quiz.id])), sizes=[1, 10, 50])
+
+    def test_my_quizzes(self):
+        self.client.force_authenticate(self.creator)
+        self.assertConstantQueries(self.quizzes, lambda _: self.client.get(reverse('my-quizzes')))
+
+    def test_take_quiz(self):
+        self.assertConstantQueries(self.quiz, lambda quiz: self.client.get(reverse('quiz-take', args=[quiz.id])))
+
+    # Questions
+
+    def test_question_create(self):
+        self.client.force_authenticate(self.creator)
+
+        def setup(size):
+            # Multiple choice questions need two answers
+            answers = [{'answer_text': f'Answer {order}', 'is_correct': order == 1, 'order': order} for order in range(1, max(size, 2) + 1)]
+            return self.quiz(), {'question_text': 'New question', 'question_type': 'MC', 'points': 1, 'order': 3, 'answers': answers}
+        self.assertConstantQueries(setup, lambda data: self.client.post(reverse('question-create', args=[data[0].id]), data[1], format='json'))
+
+    def test_regrade(self):
+        def setup(size):
+            attempts = self.completed_attempts(1)
+            quiz = attempts[0].quiz
+            for _ in range(size - 1):
+                self.client.post(reverse('complete-quiz', args=[self.answered_attempt_on(quiz).id]))
+            self.client.force_authenticate(self.creator)
+            return quiz
+        self.addCleanup(self.client.force_authenticate, self.student)
+        self.assertConstantQueries(setup, lambda quiz: self.client.post(reverse('regrade-quiz', args=[quiz.id])))
+
+    def test_item_analysis(self):
+        from . import analysis
+        if not analysis.is_available():
+            self.skipTest('numpy is not installed')
+
+        def setup(size):
+            self.client.force_authenticate(self.student)
+            quiz = self.quiz(size)
+            self.client.post(reverse('complete-quiz', args=[self.answered_attempt_on(quiz).id]))
+            self.client.force_authenticate(self.creator)
+            return quiz
+        self.assertConstantQueries(setup, lambda quiz: self.client.get(reverse('quiz-analysis', args=[quiz.id])))
+
+    def test_publish(self):
+        self.client.force_authenticate(self.creator)
+        self.assertConstantQueries(self.quiz, lambda quiz: self.client.post(reverse('publish-quiz', args=[quiz.id])))
+
+    def test_quiz_version(self):
+        from . import versions
+
+        def setup(size):
+            quiz = self.quiz(size)
+            versions.publish(quiz)
+            return quiz
+        self.assertConstantQueries(setup, lambda quiz: self.client.get(reverse('quiz-version', args=[quiz.id, 1])))
+
+    # Attempts
+
+    def test_start(self):
+        self.assertConstantQueries(self.quiz, lambda quiz: self.client.post(reverse('start-quiz', args=[quiz.id])))
+
+    def test_attempt_questions(self):
+        self.assertConstantQueries(lambda size: self.start(self.quiz(size)), lambda attempt: self.client.get(reverse('attempt-questions', args=[attempt.id])))
+
+    def test_submit_answer(self):
+        def setup(size):
+            attempt = self.start(self.quiz(size))
+            question = Question.objects.filter(quiz_id=attempt.quiz_id).last()
+            return attempt, {'question_id': question.id, 'answer_id': question.answers.first().id}
+        self.assertConstantQueries(setup, lambda data: self.client.post(reverse('submit-answer', args=[data[0].id]), data[1], format='json'))
+
+    def test_submit_answers(self):
+        def setup(size):
+            attempt = self.start(self.quiz(size))
+            answers = [
+                {'question_id': question.id, 'answer_id': question.answers.all()[0].id}
+                for question in Question.objects.filter(quiz_id=attempt.quiz_id).prefetch_related('answers')
+            ]
+            return attempt, {'answers': answers}
+        self.assertConstantQueries(setup, lambda data: self.client.post(reverse('submit-answers', args=[data[0].id]), data[1], format='json'))
+
+    def test_complete(self):
+        self.assertConstantQueries(self.answered_attempt, lambda attempt: self.client.post(reverse('complete-quiz', args=[attempt.id])))
+
+    def test_attempt_detail(self):
+        self.assertConstantQueries(self.answered_attempt, lambda attempt: self.client.get(reverse('attempt-detail', args=[attempt.id])))
+
+    def test_my_attempts(self):
+        self.assertConstantQueries(self.completed_attempts, lambda _: self.client.get(reverse('my-attempts')))
+
+    def test_my_progress(self):
+        self.assertConstantQueries(self.completed_attempts, lambda _: self.client.get(reverse('my-progress'), {'page_size': 100}))
+
+    # Jobs and metrics
+
+    def test_job_detail(self):
+        from .models import Job
+
+        def setup(size):
+            Job.objects.bulk_create(Job(task='regrade_quiz', created_by=self.student) for _ in range(size))
+            return Job.objects.filter(created_by=self.student).last()
+        self.assertConstantQueries(setup, lambda job: self.client.get(reverse('job-detail', args=[job.id])))
+
+    def test_compression_metrics(self):
+        self.client.force_authenticate(self.admin)
+        self.assertConstantQueries(self.quizzes, lambda _: self.client.get(reverse('compression-metrics')))
+
+class LiveResultsTests(AttemptAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        import asyncio
+        from unittest import mock
+        from . import live
+        live.reset()
+        self.addCleanup(live.reset)
+        # The tests publish by calling publish_changes() themselves
+        publisher = mock.patch('quiz.live._start_publisher')
+        self.start_publisher = publisher.start()
+        self.addCleanup(publisher.stop)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def subscribe(self):
+        from . import live
+
+        async def subscribe():
+            return live.subscribe(self.quiz.id)
+        return self.loop.run_until_complete(subscribe())
+
+    def receive(self, subscription):
+        import asyncio
+        return self.loop.run_until_complete(asyncio.wait_for(subscription.get(), 1))
+
+    def test_results(self):
+        from . import live
+        attempt_id = self.start()
+        self.submit(attempt_id, self.question1, self.right1)
+        with self.assertNumQueries(3):
+            data = live.results(self.quiz.id)
+        self.assertEqual((data['started'], data['in_progress'], data['completed'], data['answers']), (1, 1, 0, 1))
+
+        self.complete(attempt_id)
+        data = live.results(self.quiz.id)
+        self.assertEqual((data['in_progress'], data['completed'], data['answers'], data['average_percentage']), (0, 1, 0, 66.67))
+        self.assertEqual(data['recent'][0]['user'], 'student')
+
+    def test_notified_changes_are_published_to_every_watcher(self):
+        from . import live
+        first, second = self.subscribe(), self.subscribe()
+        self.start_publisher.assert_called_once()
+        live.publish_changes()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            attempt_id = self.start()
+        with self.assertNumQueries(4):
+            self.assertEqual(live.publish_changes(), {self.quiz.id})
+        data = self.receive(first)
+        self.assertEqual(data['started'], 1)
+        # Computed once for every watcher
+        self.assertIs(self.receive(second), data)
+
+        live.unsubscribe(first)
+        live.unsubscribe(second)
+        self.assertFalse(live.is_watched(self.quiz.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.complete(attempt_id)
+        self.assertEqual(live.publish_changes(), set())
+
+    def test_changes_from_other_processes_are_polled(self):
+        from . import events, live, scoring
+        subscription = self.subscribe()
+        attempt_id = self.start()
+        events.flush()
+        # The first round only places the cursor
+        self.assertEqual(live.publish_changes(), set())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            scoring.complete_attempts([attempt_id])
+        events.flush()
+        self.assertEqual(live.publish_changes(), {self.quiz.id})
+        self.assertEqual(self.receive(subscription)['completed'], 1)
+        self.assertEqual(live.publish_changes(), set())
+
+    def test_stream_needs_asgi(self):
+        self.client.force_authenticate(self.creator)
+        response = self.client.get(reverse('quiz-live-results', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    async def test_stream(self):
+        import json
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+        from rest_framework.authtoken.models import Token
+        url = reverse('quiz-live-results', args=[self.quiz.id])
+        creator_token = await sync_to_async(Token.objects.create)(user=self.creator)
+        student_token = await sync_to_async(Token.objects.create)(user=self.student)
+        client = AsyncClient()
+
+        self.assertEqual((await client.get(url)).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual((await client.get(url, {'token': student_token.key})).status_code, status.HTTP_403_FORBIDDEN)
+        response = await client.get(url, headers={'Authorization': f'Token {creator_token.key}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        event = await anext(aiter(response.streaming_content))
+        self.assertTrue(event.startswith(b'event: results\ndata: '))
+        self.assertEqual(json.loads(event.split(b'data: ')[1])['quiz'], self.quiz.id)
+
+
+
+class APIWorkerProfileTests(AttemptAPITestCase):
+    """The API served with the middleware, URLs and renderers of ``QuizRaveAPI.settings_api``."""
+
+    def setUp(self):
+        super().setUp()
+        from rest_framework.authtoken.models import Token
+        from QuizRaveAPI import settings_api
+        profile = override_settings(
+            MIDDLEWARE=settings_api.MIDDLEWARE,
+            ROOT_URLCONF=settings_api.ROOT_URLCONF,
+            REST_FRAMEWORK=settings_api.REST_FRAMEWORK,
+            TEMPLATES=settings_api.TEMPLATES,
+        )
+        profile.enable()
+        self.addCleanup(profile.disable)
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.student).key}')
+
+    def test_token_authenticated_attempt(self):
+        attempt_id = self.start()
+        response = self.submit(attempt_id, self.question1, self.right1)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.complete(attempt_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['score'], 10)
+        # No session or CSRF cookies
+        self.assertFalse(response.cookies)
+
+    def test_admin_is_not_served(self):
+        self.assertEqual(self.client.get('/admin/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_benchmark_settings_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('benchmark_settings', runs=1, requests=5, stdout=out)
+        rows = {line.split()[0]: line.split()[1:] for line in out.getvalue().splitlines()[1:3]}
+        self.assertEqual(rows['QuizRaveAPI.settings'][:2], ['10', '8'])
+        self.assertEqual(rows['QuizRaveAPI.settings_api'][:2], ['6', '3'])
+        self.assertIn('QuizRaveAPI.settings_api: startup', out.getvalue())
+
+
+
+class SlidingWindowTests(TestCase):
+
+    def test_previous_window_slides_out(self):
+        from .throttling import SlidingWindow
+        window = SlidingWindow('10/min')
+        self.assertEqual([window.hit('a', now=0) for _ in range(10)], [0] * 10)
+        wait = window.hit('a', now=0)
+        self.assertAlmostEqual(wait, 66)
+        # 90% of the previous window's 10 requests still overlap the period
+        self.assertTrue(window.hit('a', now=65.9))
+        self.assertEqual(window.hit('a', now=wait), 0)
+        self.assertEqual(window.hit('b', now=0), 0)
+
+    def test_idle_clients_are_evicted(self):
+        from .throttling import SlidingWindow
+        window = SlidingWindow('1/min', max_keys=4)
+        for client in range(4):
+            window.hit(client, now=0)
+        window.hit('new', now=0)
+        self.assertLessEqual(len(window._counts), 4)
+        self.assertIn('new', window._counts)
+        window.hit('later', now=180)
+        self.assertEqual(list(window._counts), ['later'])
+
+
+@override_settings(QUIZ_THROTTLE_RATES={'submit_answer': {'user': '2/min', 'ip': '3/min'}, 'login': {'ip': '2/min'}})
+class ThrottlingTests(AttemptAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        from rest_framework.authtoken.models import Token
+        self.client.force_authenticate(None)
+        self.student_token = Token.objects.create(user=self.student).key
+        self.creator_token = Token.objects.create(user=self.creator).key
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.student_token}')
+
+    def assertThrottled(self, request):
+        with self.assertNumQueries(0):
+            response = request()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertIn('throttled', response.json()['detail'])
+
+    def test_user_and_ip_limits(self):
+        attempt_id = self.start()
+        self.assertEqual(self.submit(attempt_id, self.question1, self.right1).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.submit(attempt_id, self.question2, self.right2).status_code, status.HTTP_201_CREATED)
+        self.assertThrottled(lambda: self.submit(attempt_id, self.question2, self.wrong2))
+
+        # Another user on the same address has their own limit, but shares the address's
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.creator_token}')
+        self.assertEqual(self.submit(attempt_id, self.question1, self.right1).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertThrottled(lambda: self.submit(attempt_id, self.question1, self.right1))
+
+    def test_credential_spelling_shares_the_user_limit(self):
+        attempt_id = self.start()
+        self.client.credentials(HTTP_AUTHORIZATION=f'token {self.student_token}')
+        self.assertEqual(self.submit(attempt_id, self.question1, self.right1).status_code, status.HTTP_201_CREATED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'TOKEN  {self.student_token} ')
+        self.assertEqual(self.submit(attempt_id, self.question2, self.right2).status_code, status.HTTP_201_CREATED)
+        self.assertThrottled(lambda: self.submit(attempt_id, self.question2, self.wrong2))
+
+    def test_batch_answers_share_the_answer_limit(self):
+        attempt_id = self.start()
+        self.assertEqual(self.submit(attempt_id, self.question1, self.right1).status_code, status.HTTP_201_CREATED)
+        url = reverse('submit-answers', args=[attempt_id])
+        answers = {'answers': [{'question_id': self.question2.id, 'answer_id': self.right2.id}]}
+        self.assertEqual(self.client.post(url, answers, format='json').status_code, status.HTTP_201_CREATED)
+        self.assertThrottled(lambda: self.client.post(url, answers, format='json'))
+
+    def test_login_is_limited_per_address(self):
+        def login():
+            return self.client.post(reverse('login'), {'username': 'student', 'password': 'wrong'}, format='json')
+        self.client.credentials()
+        self.assertEqual(login().status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(login().status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertThrottled(login)
+
+    @override_settings(QUIZ_THROTTLE_NUM_PROXIES=1)
+    def test_addresses_behind_a_proxy(self):
+        def login(address):
+            return self.client.post(reverse('login'), {'username': 'student', 'password': 'wrong'}, format='json', HTTP_X_FORWARDED_FOR=f'10.0.0.9, {address}')
+        self.client.credentials()
+        for _ in range(2):
+            self.assertEqual(login('10.0.0.1').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertThrottled(lambda: login('10.0.0.1'))
+        self.assertEqual(login('10.0.0.2').status_code, status.HTTP_401_UNAUTHORIZED)
+
     
 if __name__ == '__main__':
     # Run specific test
@@ -0,0 +1,183 @@
+"""
+In-process sliding-window throttling of the login, registration, start and
+answer endpoints.
+
+Each throttled view has a scope, named after the view, with optional
+``user`` and ``ip`` rates in ``QUIZ_THROTTLE_RATES`` (``'120/min'``, as in
+DRF). Every rate is a ``SlidingWindow``: a dict from client to
+``[window, count, previous count]``, kept per process. The number of
+requests in the last period is estimated as the current window's count plus
+the previous window's, weighted by how much of it still overlaps the period.
+
+``throttle()`` checks a request before DRF sees it. A rejected request is
+answered with 429 and ``Retry-After`` after a dict lookup and no database
+work, authentication included. The user limit therefore identifies users by
+the credential in their ``Authorization`` header, read the way DRF's
+authentication reads it, and applies only to requests that send one.
+
+Each process counts separately, so with N workers a client may make up to N
+times the configured rate.
+"""
+import contextlib
+import functools
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+_exempt = set()
+_lock = threading.Lock()
+_rates = None
+_windows = {}
+
+
+def parse_rate(rate):
+    """Return ``(requests, seconds)`` for a rate such as ``'10/min'``."""
+    requests, _, period = rate.partition('/')
+    return int(requests), PERIODS[period[0]]
+
+
+class SlidingWindow:
+    """Requests per client over a rolling period, with O(1) memory per client."""
+    __slots__ = ['limit', 'period', 'max_keys', '_counts', '_lock']
+
+    def __init__(self, rate, max_keys=100000):
+        self.limit, self.period = parse_rate(rate)
+        self.max_keys = max_keys
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, now=None):
+        """Count a request from ``key``; returns 0, or the seconds to wait when it is over the limit."""
+        now = time.monotonic() if now is None else now
+        window = int(now // self.period)
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is None:
+                if len(self._counts) >= self.max_keys:
+                    self._evict(window)
+                entry = self._counts[key] = [window, 0, 0]
+            elif entry[0] != window:
+                entry[2] = entry[1] if entry[0] == window - 1 else 0
+                entry[0], entry[1] = window, 0
+            elapsed = now - window * self.period
+            _, count, previous = entry
+            if previous * (1 - elapsed / self.period) + count + 1 <= self.limit:
+                entry[1] += 1
+                return 0
+        return max(self._wait(count, previous, elapsed), 0.001)
+
+    def _wait(self, count, previous, elapsed):
+        # Rejected requests are not counted, so the estimate only decays from here
+        allowed = self.limit - 1
+        if count <= allowed:
+            # Once enough of the previous window has slid out of the period
+            return (1 - (allowed - count) / previous) * self.period - elapsed
+        # Once enough of this window has slid out of the next one's period
+        return self.period - elapsed + (1 - allowed / count) * self.period
+
+    def _evict(self, window):
+        """Drop clients idle for two windows, then the oldest ones if that is not enough."""
+        for key in [key for key, entry in self._counts.items() if entry[0] < window - 1]:
+            del self._counts[key]
+        excess = len(self._counts) - self.max_keys * 9 // 10
+        if excess > 0:
+            for key in list(self._counts)[:excess]:
+                del self._counts[key]
+
+
+def _window(scope, kind):
+    global _rates
+    rates = getattr(settings, 'QUIZ_THROTTLE_RATES', None)
+    if rates is not _rates:
+        # Rebuilt when the setting is replaced, as in tests
+        with _lock:
+            _windows.clear()
+            _rates = rates
+    key = (scope, kind)
+    try:
+        return _windows[key]
+    except KeyError:
+        rate = (rates or {}).get(scope, {}).get(kind)
+        window = SlidingWindow(rate, getattr(settings, 'QUIZ_THROTTLE_MAX_CLIENTS', 100000)) if rate else None
+        with _lock:
+            return _windows.setdefault(key, window)
+
+
+def client_ip(request):
+    """The client's address, read from ``X-Forwarded-For`` behind ``QUIZ_THROTTLE_NUM_PROXIES`` proxies."""
+    proxies = getattr(settings, 'QUIZ_THROTTLE_NUM_PROXIES', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        addresses = forwarded.split(',')
+        return addresses[-min(proxies, len(addresses))].strip()
+    return request.META.get('REMOTE_ADDR')
+
+
+def credential(request):
+    """The ``Authorization`` header as authentication reads it: ``(keyword, key)``, or ``None`` without one."""
+    # Split on any whitespace with a case-insensitive keyword, as DRF's authentication classes do,
+    # so 'token abc' and 'Token  abc' share a limit
+    parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if not parts:
+        return None
+    return parts[0].lower(), ' '.join(parts[1:])
+
+
+def check(scope, request):
+    """Count ``request`` against the limits of ``scope``; returns the seconds to wait, or 0 when it may proceed."""
+    wait = 0
+    key = credential(request)
+    if key:
+        window = _window(scope, 'user')
+        if window is not None:
+            # Hashed, so tokens are not kept in memory
+            wait = window.hit(hash(key))
+    if not wait:
+        window = _window(scope, 'ip')
+        ip = client_ip(request)
+        if window is not None and ip not in _exempt:
+            wait = window.hit(ip)
+    return wait
+
+
+def throttled(wait):
+    seconds = max(math.ceil(wait), 1)
+    response = JsonResponse({'detail': f'Request was throttled. Expected available in {seconds} seconds.'}, status=429)
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+def throttle(scope):
+    """Reject requests to the decorated view over the rates of ``scope``; apply it above ``@api_view``."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            wait = check(scope, request)
+            if wait:
+                return throttled(wait)
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
+
+
+@contextlib.contextmanager
+def exempt(*addresses):
+    """Lift the per-IP limits for ``addresses`` inside the block, e.g. for a local load test."""
+    added = set(addresses) - _exempt
+    _exempt.update(added)
+    try:
+        yield
+    finally:
+        _exempt.difference_update(added)
+
+
+def reset():
+    global _rates
+    with _lock:
+        _windows.clear()
+        _rates = None
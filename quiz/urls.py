@@ -6,20 +6,37 @@ urlpatterns = [
     path('auth/register/', views.register, name='register'),
     path('auth/login/', views.login, name='login'),
     path('auth/logout/', views.logout, name='logout'),
+    path('users/bulk/', views.bulk_provision_users, name='bulk-provision-users'),
 
     # Quiz URLs
     path('quizzes/', views.QuizListCreateView.as_view(), name='quiz-list-create'),
+    path('catalog/', views.quiz_catalog, name='quiz-catalog'),
     path('quizzes/<int:pk>/', views.QuizDetailView.as_view(), name='quiz-detail'),
     path('quizzes/my-quizzes/', views.MyQuizzesView.as_view(), name='my-quizzes'),
+    path('quizzes/<int:pk>/take/', views.take_quiz, name='quiz-take'),
     
     # Question URLs
     path('quizzes/<int:quiz_id>/questions/', views.QuestionCreateView.as_view(), name='question-create'),
+    path('quizzes/<int:quiz_id>/regrade/', views.regrade_quiz, name='regrade-quiz'),
+    path('quizzes/<int:quiz_id>/analysis/', views.quiz_item_analysis, name='quiz-analysis'),
+    path('quizzes/<int:quiz_id>/publish/', views.publish_quiz, name='publish-quiz'),
+    path('quizzes/<int:quiz_id>/versions/<int:number>/', views.quiz_version, name='quiz-version'),
 
     # Quiz Attempt URLs
     path('quizzes/<int:quiz_id>/start/', views.start_quiz_attempt, name='start-quiz'),
+    path('attempts/<int:attempt_id>/questions/', views.attempt_questions, name='attempt-questions'),
     path('attempts/<int:attempt_id>/submit-answer/', views.submit_answer, name='submit-answer'),
+    path('attempts/<int:attempt_id>/submit-answers/', views.submit_answers, name='submit-answers'),
     path('attempts/<int:attempt_id>/complete/', views.complete_quiz_attempt, name='complete-quiz'),
     path('attempts/<int:pk>/', views.QuizAttemptDetailView.as_view(), name='attempt-detail'),
     path('my-attempts/', views.MyAttemptsView.as_view(), name='my-attempts'),
+    path('my-progress/', views.MyProgressView.as_view(), name='my-progress'),
+    path('quizzes/<int:quiz_id>/live/', views.quiz_live_results, name='quiz-live-results'),
+
+    # Background jobs
+    path('jobs/<int:pk>/', views.JobDetailView.as_view(), name='job-detail'),
+
+    # Metrics
+    path('metrics/compression/', views.compression_metrics, name='compression-metrics'),
 
 ]
\ No newline at end of file
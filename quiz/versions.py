@@ -0,0 +1,156 @@
+"""
+Immutable published versions of a quiz's content.
+
+Publishing snapshots the quiz header, its questions, their answers and their
+grading rules into a ``QuizVersion``: a JSON tree, zlib-compressed, with its
+SHA-256 digest. Attempts reference the version they started on, so they are
+shown and graded against that snapshot however the quiz is edited later, and
+nothing derived from a version ever needs invalidating: its paper is cached
+by digest and served with immutable HTTP caching headers.
+
+Starting an attempt publishes the quiz's current content if it changed since
+the last version, so creators never have to publish explicitly.
+"""
+import hashlib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from .grading import compile_matcher
+from .models import Answer, Question, Quiz, QuizVersion
+
+QUIZ_FIELDS = ['id', 'title', 'description', 'time_limit', 'max_attempts', 'question_pool_size', 'shuffle_questions', 'shuffle_answers']
+QUESTION_FIELDS = [
+    'id', 'question_text', 'question_type', 'points', 'order',
+    'case_sensitive', 'ignore_punctuation', 'numeric_tolerance', 'max_edit_distance',
+]
+ANSWER_FIELDS = ['id', 'answer_text', 'is_correct', 'order']
+
+_loaded = OrderedDict()
+_lock = threading.Lock()
+
+
+def snapshot(quiz):
+    """Return the content of ``quiz`` as a JSON-serialisable tree, in two queries."""
+    questions = list(Question.objects.filter(quiz=quiz).order_by('order', 'id').values(*QUESTION_FIELDS))
+    answers = {question['id']: [] for question in questions}
+    for answer in Answer.objects.filter(question__quiz=quiz).order_by('order', 'id').values('question_id', *ANSWER_FIELDS):
+        answers[answer.pop('question_id')].append(answer)
+    for question in questions:
+        question['answers'] = answers[question['id']]
+    return {'quiz': {field: getattr(quiz, field) for field in QUIZ_FIELDS}, 'questions': questions}
+
+
+def encode(tree):
+    """Return ``(compressed content, digest)`` for a snapshot tree."""
+    data = json.dumps(tree, sort_keys=True, separators=(',', ':')).encode()
+    return zlib.compress(data, 9), hashlib.sha256(data).hexdigest()
+
+
+def publish(quiz):
+    """
+    Snapshot the current content of ``quiz`` and return its newest version.
+
+    The content is always read afresh, so edits made with ``update()``, which
+    leave ``content_version`` alone, are picked up too. No new version is
+    created when the content equals the last version's, so publishing is
+    idempotent.
+    """
+    with transaction.atomic():
+        # Serialises publishers so version numbers never collide
+        locked = Quiz.objects.select_for_update().get(pk=quiz.pk)
+        latest = locked.versions.order_by('-number').first()
+        content, digest = encode(snapshot(locked))
+        if latest is not None and latest.digest == digest:
+            if latest.content_version != locked.content_version:
+                # Touched but not changed, e.g. saved without edits
+                latest.content_version = locked.content_version
+                QuizVersion.objects.filter(pk=latest.pk).update(content_version=latest.content_version)
+        else:
+            latest = QuizVersion.objects.create(
+                quiz=locked, number=latest.number + 1 if latest else 1, content_version=locked.content_version, digest=digest, content=content,
+            )
+        if locked.published_version_id != latest.pk:
+            # update() leaves updated_at, and so content_version, alone
+            Quiz.objects.filter(pk=quiz.pk).update(published_version=latest)
+    quiz.published_version = latest
+    return latest
+
+
+def current(quiz):
+    """Return the version matching the quiz's current content, publishing it if needed."""
+    version = quiz.published_version
+    if version is not None and version.content_version == quiz.content_version:
+        return version
+    return publish(quiz)
+
+
+class Snapshot:
+    """A loaded ``QuizVersion``, with lookups for grading."""
+    __slots__ = ['version_id', 'number', 'digest', 'quiz', 'questions', '_answers', '_matchers']
+
+    def __init__(self, version):
+        tree = json.loads(zlib.decompress(bytes(version.content)))
+        self.version_id = version.pk
+        self.number = version.number
+        self.digest = version.digest
+        self.quiz = tree['quiz']
+        # In quiz order
+        self.questions = {question['id']: question for question in tree['questions']}
+        self._answers = {answer['id']: (question['id'], answer['is_correct']) for question in tree['questions'] for answer in question['answers']}
+        self._matchers = {}
+
+    def points(self, question_ids=None):
+        """Total points of ``question_ids``, or of every question."""
+        if question_ids is None:
+            return sum(question['points'] for question in self.questions.values())
+        return sum(self.questions[question_id]['points'] for question_id in question_ids if question_id in self.questions)
+
+    def _matcher(self, question):
+        if question['id'] not in self._matchers:
+            self._matchers[question['id']] = compile_matcher(
+                [answer['answer_text'] for answer in question['answers'] if answer['is_correct']],
+                question['case_sensitive'],
+                question['ignore_punctuation'],
+                question['numeric_tolerance'],
+                question['max_edit_distance'],
+            )
+        return self._matchers[question['id']]
+
+    def grade(self, question_id, answer_id=None, text_answer=''):
+        """Return whether the answer is correct, or ``None`` when there is nothing to grade."""
+        question = self.questions.get(question_id)
+        if question is None:
+            return None
+        if question['question_type'] in ['MC', 'TF']:
+            if answer_id is None:
+                return None
+            owner, is_correct = self._answers.get(answer_id, (None, False))
+            return owner == question_id and is_correct
+        if question['question_type'] == 'SA':
+            matcher = self._matcher(question)
+            return None if matcher is None else matcher.matches(text_answer)
+        return None
+
+
+def load(version_id):
+    """Return the ``Snapshot`` of a version, kept in memory since versions never change."""
+    snapshot = _loaded.get(version_id)
+    if snapshot is not None:
+        return snapshot
+
+    snapshot = Snapshot(QuizVersion.objects.get(pk=version_id))
+    with _lock:
+        _loaded[version_id] = snapshot
+        while len(_loaded) > getattr(settings, 'QUIZ_VERSION_CACHE_SIZE', 256):
+            _loaded.popitem(last=False)
+    return snapshot
+
+
+def clear_cache():
+    with _lock:
+        _loaded.clear()
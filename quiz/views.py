@@ -1,6 +1,12 @@
+import asyncio
+import hashlib
+import json
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
@@ -10,10 +16,25 @@ from django.shortcuts import get_object_or_404
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
-from django.http import HttpResponse
-from .models import Quiz, Question, Answer, QuizAttempt, UserResponse
-from .serializers import  (QuizListSerializer, QuizDetailSerializer, QuizCreateSerializer,QuestionSerializer, QuestionCreateSerializer,QuizAttemptSerializer, SubmitAnswerSerializer, UserSerializer)
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.vary import vary_on_headers
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .models import Quiz, Question, Answer, QuizAttempt, UserResponse, Job, UserQuizProgress, QuizVersion, ArchivedAttempt
+from .serializers import  (QuizListSerializer, QuizDetailSerializer, QuizCreateSerializer,QuestionSerializer, QuestionCreateSerializer,QuizAttemptSerializer, SubmitAnswerSerializer, UserSerializer, JobSerializer, UserQuizProgressSerializer, ArchivedAttemptSerializer)
 from .permissions import IsCreatorOrReadOnly, CanTakeQuiz, IsAttemptOwner
+from . import analysis, answer_buffer, archive, catalog, events, jobs, live, papers, pools, provisioning, scoring, versions
+from . import progress as user_progress
+from .pagination import QuizPagination
+from .search import search_quizzes
+from .middleware import compression_stats
+from .throttling import throttle
 
 
 def home(request):
@@ -28,11 +49,13 @@ def api_root(request, format=None):
             'logout': reverse('logout', request=request, format=format),
         },
         'quizzes': reverse('quiz-list-create', request=request, format=format),
+        'catalog': reverse('quiz-catalog', request=request, format=format),
         'my-quizzes': reverse('my-quizzes', request=request, format=format),
         'my-attempts': reverse('my-attempts', request=request, format=format),
     })
 
 # Authentication Views
+@throttle('register')
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def register(request):
@@ -52,6 +75,7 @@ def register(request):
     return Response({'token': token.key,'user': UserSerializer(user).data}, status=status.HTTP_201_CREATED)
 
 
+@throttle('login')
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def login(request):
@@ -73,28 +97,111 @@ def logout(request):
         return Response({'message': 'Successfully logged out'})
     except:
         return Response({'error': 'Error logging out'}, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def bulk_provision_users(request):
+    rows = request.data.get('users') if isinstance(request.data, dict) else None
+    if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+        return Response({'error': 'users must be a non-empty list of objects'}, status=status.HTTP_400_BAD_REQUEST)
+    max_rows = getattr(settings, 'QUIZ_PROVISION_MAX_ROWS', 10000)
+    if len(rows) > max_rows:
+        return Response({'error': f'At most {max_rows} users can be provisioned per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if len(rows) >= getattr(settings, 'QUIZ_PROVISION_POOL_THRESHOLD', 32):
+        # Hashed in a worker's process pool; never forked from a web process
+        job = jobs.enqueue('provision_users', user=request.user, max_attempts=1, rows=rows)
+        return Response({'message': 'Provisioning queued','job_id': job.id,'status_url': reverse('job-detail', args=[job.id], request=request)}, status=status.HTTP_202_ACCEPTED)
+
+    results = provisioning.provision_users(rows, workers=1)
+    created = sum(result['status'] == 'created' for result in results)
+    return Response(
+        {'created': created, 'failed': len(results) - created, 'results': results},
+        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+    )
     
 # Quiz Views
 class QuizListCreateView(generics.ListCreateAPIView):
-    queryset = Quiz.objects.filter(is_active=True)
+    queryset = Quiz.objects.filter(is_active=True).select_related('creator').with_totals()
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = QuizPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        search = self.request.query_params.get('search')
+        if search and self.request.method == 'GET':
+            # Ranked by relevance, using the full-text index
+            return search_quizzes(search, queryset)
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return QuizCreateSerializer
         return QuizListSerializer
 
+# Served as JSON or msgpack, so shared caches must keep one copy per Accept header
+@vary_on_headers('Accept')
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def quiz_catalog(request):
+    # Public and the same for everyone, so shared caches may store it; never touches the database
+    params = request.query_params
+    try:
+        page = int(params.get('page', 1))
+        page_size = min(int(params.get('page_size', QuizPagination.page_size)), QuizPagination.max_page_size)
+        max_time_limit = int(params['max_time_limit']) if params.get('max_time_limit') else None
+    except ValueError:
+        return Response({'error': 'page, page_size and max_time_limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    ordering = params.get('ordering', '-created_at')
+    if ordering not in catalog.ORDERINGS:
+        return Response({'error': f"ordering must be one of {', '.join(catalog.ORDERINGS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    snapshot = catalog.get()
+    # Per page, filter and format too, so a cached page is never revalidated as another
+    query = urlencode(sorted(params.lists()), doseq=True)
+    etag = hashlib.sha1(f'{snapshot.etag}?{query}:{request.accepted_renderer.format}'.encode()).hexdigest()
+    headers = {'ETag': f'"catalog-{etag}"', 'Cache-Control': f"public, max-age={getattr(settings, 'QUIZ_CATALOG_MAX_AGE', 60)}"}
+    if headers['ETag'] in request.headers.get('If-None-Match', ''):
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    entries = snapshot.select(params.get('search'), params.get('creator'), max_time_limit, ordering)
+    page_count = max((len(entries) + page_size - 1) // page_size, 1) if page_size > 0 else 0
+    if page_size < 1 or not 1 <= page <= page_count:
+        return Response({'detail': 'Invalid page.'}, status=status.HTTP_404_NOT_FOUND)
+
+    url = request.build_absolute_uri()
+    previous_url = None
+    if page > 1:
+        previous_url = replace_query_param(url, 'page', page - 1) if page > 2 else remove_query_param(url, 'page')
+    body = b'{"count":%d,"next":%s,"previous":%s,"results":[%s]}' % (
+        len(entries),
+        json.dumps(replace_query_param(url, 'page', page + 1) if page < page_count else None).encode(),
+        json.dumps(previous_url).encode(),
+        b','.join(entry.body for entry in entries[(page - 1) * page_size:page * page_size]),
+    )
+    response = _paper_response(request, None, body)
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
 class QuizDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Quiz.objects.all()
+    # Questions' answers are rendered with Answer.__str__, which reads the question and its quiz
+    queryset = Quiz.objects.select_related('creator').with_totals().prefetch_related('questions__answers')
     serializer_class = QuizDetailSerializer
     permission_classes = [permissions.IsAuthenticated, IsCreatorOrReadOnly]
 
+    def perform_update(self, serializer):
+        serializer.save()
+        # DRF drops the updated instance's prefetched questions, which would then be loaded one by one
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
 class MyQuizzesView(generics.ListAPIView):
     serializer_class = QuizListSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Quiz.objects.filter(creator=self.request.user)
+        return Quiz.objects.filter(creator=self.request.user).select_related('creator').with_totals()
     
 # Question Views
 class QuestionCreateView(generics.CreateAPIView):
@@ -110,43 +217,157 @@ class QuestionCreateView(generics.CreateAPIView):
         
         serializer.save(quiz=quiz)
 
+@api_view(['POST'])
+def regrade_quiz(request, quiz_id):
+    quiz = get_object_or_404(Quiz, id=quiz_id)
+
+    if quiz.creator != request.user:
+        return Response({'error': 'You can only regrade your own quizzes'}, status=status.HTTP_403_FORBIDDEN)
+
+    if request.query_params.get('background'):
+        job = jobs.enqueue('regrade_quiz', user=request.user, quiz_id=quiz.id)
+        return Response({'message': 'Regrade queued','job_id': job.id,'status_url': reverse('job-detail', args=[job.id], request=request)}, status=status.HTTP_202_ACCEPTED)
+
+    responses_regraded, attempts_rescored = scoring.regrade_quiz(quiz)
+    live.notify(quiz.id)
+    return Response({'message': 'Quiz regraded successfully','responses_regraded': responses_regraded,'attempts_rescored': attempts_rescored})
+
+@api_view(['GET'])
+def quiz_item_analysis(request, quiz_id):
+    quiz = get_object_or_404(Quiz, id=quiz_id)
+
+    if quiz.creator != request.user:
+        return Response({'error': 'You can only analyse your own quizzes'}, status=status.HTTP_403_FORBIDDEN)
+    if not analysis.is_available():
+        return Response({'error': 'Item analysis is not available on this server'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    return Response(analysis.item_analysis(quiz))
+
 # Quiz Attempt Views
+@throttle('start_quiz_attempt')
 @api_view(['POST'])
 def start_quiz_attempt(request, quiz_id):
-    quiz = get_object_or_404(Quiz, id=quiz_id)
+    quiz = get_object_or_404(Quiz.objects.select_related('published_version').defer('published_version__content'), id=quiz_id)
+    # The attempt is shown and graded against this snapshot, whatever edits follow
+    version = versions.current(quiz)
+    snapshot = versions.load(version.id)
     
-    # Check if user has incomplete attempts
-    incomplete_attempt = QuizAttempt.objects.filter(
-        user=request.user, 
-        quiz=quiz, 
-        completed_at__isnull=True
-    ).first()
-    
-    if incomplete_attempt:
-        return Response({'error': 'You have an incomplete attempt for this quiz'}, status=status.HTTP_400_BAD_REQUEST)
-    # Check attempt limits
-    completed_attempts = QuizAttempt.objects.filter(user=request.user,quiz=quiz,completed_at__isnull=False).count()
-    if completed_attempts >= quiz.max_attempts:
-        return Response({'error': 'You have exceeded the maximum attempts for this quiz'},status=status.HTTP_400_BAD_REQUEST)
-    
-    # Create new attempt
-    attempt = QuizAttempt.objects.create(user=request.user, quiz=quiz)
+    shuffle_seed = papers.new_seed() if quiz.shuffle_questions or quiz.shuffle_answers else None
+    attempt = None
+    # Bounded, in case the conflicting attempt can neither be found nor closed
+    for _ in range(3):
+        with transaction.atomic():
+            # Check attempt limits against the user's progress row, which also serialises their starts
+            progress = user_progress.lock(request.user, quiz)
+            if progress.attempts_completed >= quiz.max_attempts:
+                return Response({'error': 'You have exceeded the maximum attempts for this quiz'},status=status.HTTP_400_BAD_REQUEST)
+
+            # Create new attempt; the quiz_attempt_one_open constraint rejects it if one is already
+            # in progress, including one created by a concurrent request that passed the check above
+            try:
+                with transaction.atomic():
+                    attempt = QuizAttempt.objects.create(user=request.user, quiz=quiz, version=version, question_ids=pools.draw(quiz, ids=list(snapshot.questions)), shuffle_seed=shuffle_seed)
+            except IntegrityError:
+                incomplete_attempt = QuizAttempt.objects.filter(user=request.user, quiz=quiz, completed_at__isnull=True).first()
+            else:
+                progress.in_progress = attempt
+                progress.save(update_fields=['in_progress', 'updated_at'])
+
+        if attempt is not None:
+            break
+        if incomplete_attempt and not incomplete_attempt.is_expired:
+            return Response({'error': 'You have an incomplete attempt for this quiz'}, status=status.HTTP_400_BAD_REQUEST)
+        if incomplete_attempt:
+            # Out of time, so close it instead of blocking new attempts forever
+            scoring.complete_attempts([incomplete_attempt.id])
+    else:
+        return Response({'error': 'The attempt could not be started, please try again'}, status=status.HTTP_409_CONFLICT)
+
+    events.started(attempt)
+    live.notify(quiz.id)
     
-    return Response({'attempt_id': attempt.id,'quiz': QuizDetailSerializer(quiz).data,'started_at': attempt.started_at}, status=status.HTTP_201_CREATED)
+    data = {'attempt_id': attempt.id,'started_at': attempt.started_at,'deadline': attempt.deadline,'version': version.number}
+    return _paper_response(request, data, papers.render(quiz, attempt, snapshot), status_code=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+def attempt_questions(request, attempt_id):
+    # The attempt's questions in the same drawn and shuffled order as when it started
+    attempt = get_object_or_404(QuizAttempt.objects.select_related('quiz'), id=attempt_id, user=request.user)
+    data = {'attempt_id': attempt.id,'started_at': attempt.started_at,'deadline': attempt.deadline}
+    return _paper_response(request, data, papers.render(attempt.quiz, attempt))
+
+
+@api_view(['GET'])
+def take_quiz(request, pk):
+    quiz = get_object_or_404(Quiz, id=pk)
+    etag = f'"quiz-{quiz.pk}-{quiz.content_version}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    response = _paper_response(request, None, papers.render(quiz))
+    response['ETag'] = etag
+    return response
+
+
+@api_view(['POST'])
+def publish_quiz(request, quiz_id):
+    quiz = get_object_or_404(Quiz, id=quiz_id)
+
+    if quiz.creator != request.user:
+        return Response({'error': 'You can only publish your own quizzes'}, status=status.HTTP_403_FORBIDDEN)
+
+    previous = quiz.versions.order_by('-number').values_list('id', flat=True).first()
+    version = versions.publish(quiz)
+    data = {'version': version.number,'digest': version.digest,'url': reverse('quiz-version', args=[quiz.id, version.number], request=request)}
+    return Response(data, status=status.HTTP_200_OK if version.id == previous else status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+def quiz_version(request, quiz_id, number):
+    # A version's content never changes, so clients and caches may keep it for good
+    version = get_object_or_404(QuizVersion.objects.only('id', 'digest'), quiz_id=quiz_id, number=number)
+    headers = {'ETag': f'"{version.digest}"', 'Cache-Control': getattr(settings, 'QUIZ_VERSION_CACHE_CONTROL', 'private, max-age=31536000, immutable')}
+    if headers['ETag'] in request.headers.get('If-None-Match', ''):
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
+    response = _paper_response(request, None, papers.render(None, snapshot=versions.load(version.id)))
+    for header, value in headers.items():
+        response[header] = value
+    return response
 
+
+def _paper_response(request, data, paper, status_code=status.HTTP_200_OK):
+    # Papers are pre-rendered JSON, so JSON clients get the cached bytes as they are
+    if request.accepted_renderer.format == 'json':
+        content = paper if data is None else papers.envelope(data, paper)
+        return HttpResponse(content, status=status_code, content_type='application/json')
+
+    paper = json.loads(paper)
+    return Response(paper if data is None else {**data, 'quiz': paper}, status=status_code)
+
+
+@throttle('submit_answer')
 @api_view(['POST'])
 def submit_answer(request, attempt_id):
     attempt = get_object_or_404(QuizAttempt, id=attempt_id, user=request.user)
     
     if attempt.completed_at:
         return Response({'error': 'This quiz attempt is already completed'}, status=status.HTTP_400_BAD_REQUEST)
+    if attempt.is_expired:
+        scoring.complete_attempts([attempt.id])
+        return Response({'error': 'Time limit exceeded'}, status=status.HTTP_400_BAD_REQUEST)
     serializer = SubmitAnswerSerializer(data=request.data)
     if serializer.is_valid():
         question = serializer.validated_data['question']
         # Ensure question belongs to the quiz
-        if question.quiz != attempt.quiz:
+        if question.quiz_id != attempt.quiz_id:
             return Response({'error': 'Question does not belong to this quiz'}, status=status.HTTP_400_BAD_REQUEST)
+        drawn = attempt.drawn_question_ids
+        if drawn is not None and question.id not in drawn:
+            return Response({'error': 'Question is not part of this attempt'}, status=status.HTTP_400_BAD_REQUEST)
+        if attempt.version_id and question.id not in versions.load(attempt.version_id).questions:
+            return Response({'error': 'Question is not part of this attempt'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Create or update response
         response_data = {'attempt': attempt,'question': question}
@@ -155,6 +376,12 @@ def submit_answer(request, attempt_id):
             response_data['selected_answer'] = serializer.validated_data['answer']
         else:
             response_data['text_answer'] = serializer.validated_data['text_answer']
+
+        events.answered(**response_data)
+        live.notify(attempt.quiz_id)
+        if answer_buffer.is_enabled():
+            answer_buffer.buffer_answer(**response_data)
+            return Response({'message': 'Answer submitted successfully','response_id': None}, status=status.HTTP_201_CREATED)
         
         user_response, created = UserResponse.objects.update_or_create(attempt=attempt,question=question,defaults=response_data)
 
@@ -164,6 +391,63 @@ def submit_answer(request, attempt_id):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@throttle('submit_answer')
+@api_view(['POST'])
+def submit_answers(request, attempt_id):
+    # Batch version of submit_answer: {"answers": [{"question_id": ..., "answer_id": ...}, ...]}
+    attempt = get_object_or_404(QuizAttempt, id=attempt_id, user=request.user)
+
+    if attempt.completed_at:
+        return Response({'error': 'This quiz attempt is already completed'}, status=status.HTTP_400_BAD_REQUEST)
+    if attempt.is_expired:
+        scoring.complete_attempts([attempt.id])
+        return Response({'error': 'Time limit exceeded'}, status=status.HTTP_400_BAD_REQUEST)
+
+    answers = request.data.get('answers') if hasattr(request.data, 'get') else None
+    if not isinstance(answers, list) or not answers:
+        return Response({'error': 'answers must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+
+    questions = Question.objects.filter(quiz_id=attempt.quiz_id).prefetch_related('answers')
+    drawn = attempt.drawn_question_ids
+    if drawn is not None:
+        questions = questions.filter(id__in=drawn)
+    if attempt.version_id:
+        questions = questions.filter(id__in=list(versions.load(attempt.version_id).questions))
+    serializer = SubmitAnswerSerializer(data=answers, many=True, context={'questions': questions.in_bulk()})
+    if not serializer.is_valid():
+        return Response({'answers': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    # The last answer to a question wins, as with repeated submit_answer calls
+    responses = {}
+    for item in serializer.validated_data:
+        question = item['question']
+        response = UserResponse(attempt=attempt, question=question)
+        if question.question_type in ['MC', 'TF']:
+            response.selected_answer = item['answer']
+        else:
+            response.text_answer = item['text_answer']
+        responses[question.id] = response
+
+    for response in responses.values():
+        events.answered(attempt, response.question, response.selected_answer, response.text_answer)
+    live.notify(attempt.quiz_id)
+
+    if answer_buffer.is_enabled():
+        for response in responses.values():
+            answer_buffer.buffer_answer(attempt, response.question, response.selected_answer, response.text_answer)
+    else:
+        for response in responses.values():
+            response.grade()
+        UserResponse.objects.bulk_create(
+            list(responses.values()),
+            update_conflicts=True,
+            unique_fields=['attempt', 'question'],
+            update_fields=['selected_answer', 'text_answer', 'is_correct'],
+        )
+
+    return Response({'message': 'Answers submitted successfully','submitted': len(responses)}, status=status.HTTP_201_CREATED)
+
+
 @api_view(['POST'])
 def complete_quiz_attempt(request, attempt_id):
     attempt = get_object_or_404(QuizAttempt, id=attempt_id, user=request.user)
@@ -171,47 +455,130 @@ def complete_quiz_attempt(request, attempt_id):
     if attempt.completed_at:
         return Response({'error': 'This quiz attempt is already completed'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Calculate score
-    total_points = 0
-    earned_points = 0
-    
-    for question in attempt.quiz.questions.all():
-        total_points += question.points
-
-
-        try:
-            response = UserResponse.objects.get(attempt=attempt, question=question)
-            if response.is_correct:
-                earned_points += question.points
-        except UserResponse.DoesNotExist:
-            # Question not answered
-            pass
+    # Answers stop counting at the deadline, even if the attempt is completed later
+    completed_at = attempt.deadline if attempt.is_expired else timezone.now()
+    if not scoring.complete_attempts([attempt.id], completed_at=completed_at):
+        return Response({'error': 'This quiz attempt is already completed'}, status=status.HTTP_400_BAD_REQUEST)
+    attempt.refresh_from_db(fields=['completed_at', 'score', 'total_points'])
+    live.notify(attempt.quiz_id)
 
-        # Update attempt
-    attempt.completed_at = timezone.now()
-    attempt.score = earned_points
-    attempt.total_points = total_points
-    attempt.save()
+    return Response({'message': 'Quiz completed successfully','score': attempt.score,'total_points': attempt.total_points,'percentage': attempt.percentage_score,'completed_at': attempt.completed_at})
 
-    return Response({'message': 'Quiz completed successfully','score': earned_points,'total_points': total_points,'percentage': attempt.percentage_score,'completed_at': attempt.completed_at})
+def _attempts_for_serializer(user):
+    # Everything QuizAttemptSerializer reads, in a fixed number of queries however many attempts and responses
+    return QuizAttempt.objects.filter(user=user).select_related('user').prefetch_related(
+        Prefetch('quiz', queryset=Quiz.objects.select_related('creator').with_totals()),
+        Prefetch('responses', queryset=UserResponse.objects.select_related('question__quiz', 'selected_answer').prefetch_related('question__answers')),
+    )
 
 class QuizAttemptDetailView(generics.RetrieveAPIView):
     serializer_class = QuizAttemptSerializer
     permission_classes = [permissions.IsAuthenticated, IsAttemptOwner]
     
     def get_queryset(self):
-        return QuizAttempt.objects.filter(user=self.request.user)
+        return _attempts_for_serializer(self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        if QuizAttempt.objects.filter(pk=kwargs['pk'], user=request.user).exists():
+            return super().retrieve(request, *args, **kwargs)
+        # Old attempts are read back from their archive file on demand
+        summary = get_object_or_404(ArchivedAttempt, pk=kwargs['pk'], user=request.user)
+        return Response(archive.representation(archive.load(summary)))
     
+class JobDetailView(generics.RetrieveAPIView):
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return Job.objects.all()
+        return Job.objects.filter(created_by=self.request.user)
+
 class MyAttemptsView(generics.ListAPIView):
     serializer_class = QuizAttemptSerializer
     permission_classes = [permissions.IsAuthenticated]
+
+    def archived(self):
+        return bool(self.request.query_params.get('archived'))
+
+    def get_serializer_class(self):
+        return ArchivedAttemptSerializer if self.archived() else QuizAttemptSerializer
     
     def get_queryset(self):
-        return QuizAttempt.objects.filter(user=self.request.user)
+        if self.archived():
+            # Summaries only; attempts/<id>/ loads the full attempt from its archive
+            return ArchivedAttempt.objects.filter(user=self.request.user).select_related('quiz')
+        return _attempts_for_serializer(self.request.user)
 
-    
-    
 
+class MyProgressView(generics.ListAPIView):
+    serializer_class = UserQuizProgressSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = QuizPagination
+
+    def get_queryset(self):
+        return UserQuizProgress.objects.filter(user=self.request.user).select_related('quiz').order_by('-updated_at')
+
+
+# Live results
+def _stream_user(request):
+    # EventSource can't send headers, so browsers pass their API token as ?token=
+    key = request.GET.get('token')
+    if key:
+        token = Token.objects.select_related('user').filter(key=key).first()
+        return token.user if token and token.user.is_active else None
+    drf_request = Request(request, authenticators=[authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        return drf_request.user if drf_request.user.is_authenticated else None
+    except APIException:
+        return None
+
+
+def _sse(data):
+    return f'event: results\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'.encode()
 
 
+async def _results_stream(quiz_id):
+    subscription = live.subscribe(quiz_id)
+    try:
+        yield _sse(await sync_to_async(live.results)(quiz_id))
+        keepalive = getattr(settings, 'QUIZ_LIVE_KEEPALIVE', 15)
+        while True:
+            try:
+                data = await asyncio.wait_for(subscription.get(), keepalive)
+            except asyncio.TimeoutError:
+                # A comment line, so proxies don't close an idle stream
+                yield b': keepalive\n\n'
+                continue
+            yield _sse(data)
+    finally:
+        live.unsubscribe(subscription)
+
+
+async def quiz_live_results(request, quiz_id):
+    # An async view so watchers hold no worker thread under ASGI; not a DRF view, as DRF views are sync only
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    if not isinstance(request, ASGIRequest):
+        # WSGI would buffer the endless stream instead of sending it
+        return JsonResponse({'error': 'Live results are only served by the ASGI application'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+    creator_id = await Quiz.objects.filter(pk=quiz_id).values_list('creator_id', flat=True).afirst()
+    if creator_id is None:
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    if creator_id != user.id:
+        return JsonResponse({'error': 'You can only watch your own quizzes'}, status=status.HTTP_403_FORBIDDEN)
 
+    response = StreamingHttpResponse(_results_stream(quiz_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def compression_metrics(request):
+    return Response(compression_stats())